@@ -0,0 +1,59 @@
+"""
+Access-log ingest benchmark: single-row POST vs the bulk endpoint.
+
+Runs the backend in-process against DATABASE_URL (a throwaway SQLite file
+by default) and prints events/sec for each path.
+
+Usage: python bench_access_logs.py --events 5000 --batch-size 500
+"""
+import argparse
+import os
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+import logging
+logging.disable(logging.INFO)
+
+from fastapi.testclient import TestClient
+from main import app
+
+
+def event(door_id, i):
+    return {
+        "door_id": door_id,
+        "status": "success" if i % 5 else "failed",
+        "confidence_score": 0.9,
+        "notes": "benchmark"
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    
+    client = TestClient(app)
+    door = client.post("/api/doors/", json={"name": "Bench", "device_id": f"bench-{time.time()}"}).json()
+    
+    started = time.perf_counter()
+    for i in range(args.events):
+        client.post("/api/access-logs/", json=event(door["id"], i))
+    single = args.events / (time.perf_counter() - started)
+    
+    started = time.perf_counter()
+    for offset in range(0, args.events, args.batch_size):
+        batch = [event(door["id"], i) for i in range(offset, min(offset + args.batch_size, args.events))]
+        client.post("/api/access-logs/bulk", json=batch)
+    bulk = args.events / (time.perf_counter() - started)
+    
+    print(f"Database: {os.environ['DATABASE_URL']}")
+    print(f"single-row endpoint: {single:10.0f} events/sec")
+    print(f"bulk endpoint:       {bulk:10.0f} events/sec  (batch {args.batch_size}, {bulk / single:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Sync vs async database engine under concurrent load.
+
+Runs each mode in a fresh subprocess (DB_ASYNC_ENABLED decides which
+access-log routes are registered) against its own throwaway SQLite file,
+drives the app in-process through httpx's ASGI transport with
+--concurrency parallel clients and prints requests/sec and latency
+percentiles for access-log creates and list queries.
+
+Usage: python bench_db.py --requests 2000 --concurrency 32
+       python bench_db.py --mode async   (one mode, in this process)
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+async def drive(client, make_request, count, concurrency):
+    latencies = []
+    next_index = iter(range(count))
+    
+    async def worker():
+        for i in next_index:
+            started = time.perf_counter()
+            response = await make_request(i)
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests_per_s": round(count / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+async def run_mode(args):
+    import httpx
+    from main import app
+    
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        door = (await client.post("/api/doors/", json={"name": "Bench", "device_id": f"bench-{time.time()}"})).json()
+        
+        def create(i):
+            return client.post("/api/access-logs/", json={
+                "door_id": door["id"],
+                "status": "success" if i % 5 else "failed",
+                "confidence_score": 0.9,
+                "notes": "db benchmark"
+            })
+        
+        def list_logs(i):
+            return client.get("/api/access-logs/", params={"door_id": door["id"], "limit": args.page_size})
+        
+        results["create"] = await drive(client, create, args.requests, args.concurrency)
+        results["list"] = await drive(client, list_logs, args.requests, args.concurrency)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--mode", choices=["sync", "async"])
+    args = parser.parse_args()
+    
+    if args.mode:
+        import logging
+        logging.disable(logging.INFO)
+        print(json.dumps(asyncio.run(run_mode(args))))
+        return
+    
+    for mode in ("sync", "async"):
+        env = dict(os.environ)
+        env["DB_ASYNC_ENABLED"] = "true" if mode == "async" else "false"
+        env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+        output = subprocess.run(
+            [sys.executable, __file__, "--mode", mode,
+             "--requests", str(args.requests),
+             "--concurrency", str(args.concurrency),
+             "--page-size", str(args.page_size)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        for route, numbers in json.loads(output.strip().splitlines()[-1]).items():
+            print(f"{mode:>5} {route:<6} {numbers['requests_per_s']:>8} req/s  "
+                  f"p50 {numbers['p50_ms']} ms  p95 {numbers['p95_ms']} ms  p99 {numbers['p99_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
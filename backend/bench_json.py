@@ -0,0 +1,102 @@
+"""
+List-response serialisation benchmark: ORM + response_model vs the
+column-tuple fast path (fast_json).
+
+Seeds --rows access logs for today and --rows users into a throwaway SQLite
+file, mounts the previous ORM implementations of /api/access-logs/today and
+/api/users/ next to the real routes and reports CPU time and wall time per
+request for both, after checking the two bodies decode to the same JSON.
+
+Usage: python bench_json.py --rows 10000 --repeat 20
+"""
+import argparse
+import os
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+import logging
+logging.disable(logging.INFO)
+
+from datetime import datetime
+from typing import List
+
+from fastapi import Depends
+from fastapi.testclient import TestClient
+from sqlalchemy import desc, insert
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, get_db
+from main import app
+from models import AccessLog, Door, User
+from schemas import AccessLogResponse, UserResponse
+
+
+@app.get("/bench/legacy/access-logs/today", response_model=List[AccessLogResponse])
+def legacy_today_logs(limit: int = 1000, db: Session = Depends(get_db)):
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    query = db.query(AccessLog).filter(AccessLog.timestamp >= today)
+    return query.order_by(desc(AccessLog.timestamp), desc(AccessLog.id)).limit(limit).all()
+
+
+@app.get("/bench/legacy/users", response_model=List[UserResponse])
+def legacy_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    return db.query(User).order_by(User.id).offset(skip).limit(limit).all()
+
+
+def seed(rows):
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        door = Door(name="Bench", device_id=f"bench-{time.time()}")
+        db.add(door)
+        db.flush()
+        db.execute(insert(User), [
+            {"name": f"User {i}", "email": f"user{i}@bench.local", "employee_id": f"E{i}", "status": i % 7 != 0}
+            for i in range(rows)
+        ])
+        db.execute(insert(AccessLog), [
+            {"door_id": door.id, "timestamp": now.replace(microsecond=i % 1000000),
+             "status": "success" if i % 5 else "failed", "confidence_score": 0.9, "notes": "benchmark"}
+            for i in range(rows)
+        ])
+        db.commit()
+
+
+def measure(client, url, params, repeat):
+    client.get(url, params=params)
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    for _ in range(repeat):
+        client.get(url, params=params)
+    return (
+        (time.process_time() - cpu_started) / repeat * 1000,
+        (time.perf_counter() - wall_started) / repeat * 1000,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    
+    seed(args.rows)
+    client = TestClient(app)
+    cases = [
+        ("access-logs/today", "/bench/legacy/access-logs/today", "/api/access-logs/today"),
+        ("users", "/bench/legacy/users", "/api/users/"),
+    ]
+    params = {"limit": args.rows}
+    for name, legacy_url, fast_url in cases:
+        assert client.get(legacy_url, params=params).json() == client.get(fast_url, params=params).json()
+        legacy_cpu, legacy_wall = measure(client, legacy_url, params, args.repeat)
+        fast_cpu, fast_wall = measure(client, fast_url, params, args.repeat)
+        print(f"{name} ({args.rows} rows)")
+        print(f"  ORM + response_model:   {legacy_cpu:7.1f} ms CPU  {legacy_wall:7.1f} ms wall")
+        print(f"  column tuples + orjson: {fast_cpu:7.1f} ms CPU  {fast_wall:7.1f} ms wall")
+        print(f"  CPU saved per request: {legacy_cpu - fast_cpu:.1f} ms ({legacy_cpu / fast_cpu:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
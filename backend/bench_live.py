@@ -0,0 +1,138 @@
+"""
+Live push load test: many consoles subscribed while access logs are posted.
+
+Starts the backend with uvicorn on a local port (throwaway SQLite unless
+DATABASE_URL is set), opens --consoles WebSocket subscribers spread over
+--doors door filters, posts --events access logs and reports delivery
+latency plus SQL statements per posted event with and without consoles
+attached. Fan-out never touches the database, so both numbers match.
+
+Usage: python bench_live.py --consoles 500 --doors 10 --events 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+import logging
+logging.disable(logging.INFO)
+
+import httpx
+import uvicorn
+import websockets
+from sqlalchemy import event
+from database import engine
+from hub import hub
+from main import app
+
+statements = 0
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def count_statement(*args):
+    global statements
+    statements += 1
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+async def post_events(client, door_ids, count, sent_at):
+    """Post access logs one by one; returns SQL statements per event."""
+    before = statements
+    for i in range(count):
+        posted = time.perf_counter()
+        log = (await client.post("/api/access-logs/", json={
+            "door_id": door_ids[i % len(door_ids)],
+            "status": "success",
+            "confidence_score": 0.9,
+            "notes": "live benchmark"
+        })).json()
+        sent_at[log["id"]] = posted
+    return (statements - before) / count
+
+
+async def console(url, door_id, expected, sent_at, latencies, ready):
+    async with websockets.connect(f"{url}?door_ids={door_id}", max_queue=None) as ws:
+        ready.release()
+        for _ in range(expected):
+            message = json.loads(await ws.recv())
+            assert message["door_id"] == door_id
+            # sent_at is filled when the POST returns, which can be after delivery
+            while message["id"] not in sent_at:
+                await asyncio.sleep(0.001)
+            latencies.append(time.perf_counter() - sent_at[message["id"]])
+
+
+async def run(args, base_url):
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        door_ids = []
+        for i in range(args.doors):
+            door = (await client.post("/api/doors/", json={"name": f"Live {i}", "device_id": f"live-{time.time()}-{i}"})).json()
+            door_ids.append(door["id"])
+        
+        sent_at = {}
+        idle = await post_events(client, door_ids, args.events, sent_at)
+        
+        per_door = args.events // args.doors
+        latencies, ready = [], asyncio.Semaphore(0)
+        url = base_url.replace("http", "ws") + "/api/live/access-logs"
+        consoles = [
+            asyncio.create_task(console(url, door_ids[i % args.doors], per_door, sent_at, latencies, ready))
+            for i in range(args.consoles)
+        ]
+        for _ in consoles:
+            await ready.acquire()
+        
+        started = time.perf_counter()
+        loaded = await post_events(client, door_ids, per_door * args.doors, sent_at)
+        await asyncio.wait_for(asyncio.gather(*consoles), 60)
+        elapsed = time.perf_counter() - started
+    
+    print(f"Database: {os.environ['DATABASE_URL']}")
+    print(f"consoles:             {args.consoles} over {args.doors} doors")
+    print(f"SQL per event, idle:  {idle:.2f}")
+    print(f"SQL per event, live:  {loaded:.2f}")
+    print(f"messages delivered:   {len(latencies)} in {elapsed:.2f}s ({len(latencies) / elapsed:.0f}/s)")
+    print(f"delivery latency:     p50 {percentile(latencies, 50) * 1000:.1f} ms, "
+          f"p99 {percentile(latencies, 99) * 1000:.1f} ms")
+    print(f"hub: {hub.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--consoles", type=int, default=500)
+    parser.add_argument("--doors", type=int, default=10)
+    parser.add_argument("--events", type=int, default=500)
+    args = parser.parse_args()
+    
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", ws_max_queue=1))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    try:
+        asyncio.run(run(args, f"http://127.0.0.1:{port}"))
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Reproducible load benchmark for the access-log paths, optionally together
+with the face service.
+
+Seeds a throwaway SQLite file (or DATABASE_URL, e.g. a local PostgreSQL)
+with --users users and --logs access logs from today, then drives the
+backend in-process through httpx's ASGI transport and reports throughput
+and p50/p95/p99 latency at every --concurrency level for:
+
+  create_access_log   POST /api/access-logs/
+  list_access_logs    GET  /api/access-logs/?door_id=...
+  list_today          GET  /api/access-logs/today
+  list_users          GET  /api/users/
+
+--face also runs face_recognition_service/bench_suite.py (recognize and
+detect-faces) in a subprocess and merges its report. The JSON report can
+be saved with --output and compared with an earlier one with --compare.
+
+Usage: python bench_suite.py --logs 100000 --concurrency 1 8 32 --output run.json
+       python bench_suite.py --face --compare run.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+import logging
+logging.disable(logging.WARNING)
+
+import httpx
+from sqlalchemy import insert
+
+from config import settings
+from database import SessionLocal, engine
+from main import app
+from models import AccessLog, Door, User
+
+FACE_SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "face_recognition_service")
+SEED_BATCH = 10000
+
+
+def percentile_ms(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000 if values else 0.0
+
+
+async def drive(make_request, count, concurrency):
+    """Issue ``count`` requests from ``concurrency`` callers; non-2xx count as errors."""
+    latencies, errors = [], 0
+    next_index = iter(range(count))
+
+    async def caller():
+        nonlocal errors
+        for i in next_index:
+            started = time.perf_counter()
+            response = await make_request(i)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": count,
+        "concurrency": concurrency,
+        "errors": errors,
+        "requests_per_s": round(count / elapsed, 1),
+        "p50_ms": round(percentile_ms(latencies, 50), 2),
+        "p95_ms": round(percentile_ms(latencies, 95), 2),
+        "p99_ms": round(percentile_ms(latencies, 99), 2),
+    }
+
+
+def seed(users, doors, logs, rng):
+    """Bulk-insert the synthetic data set; returns (user_ids, door_ids)."""
+    now = datetime.utcnow()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    with SessionLocal() as db:
+        tag = int(time.time())
+        door_ids = db.execute(insert(Door).returning(Door.id), [
+            {"name": f"Door {i}", "device_id": f"bench-{tag}-{i}"} for i in range(doors)
+        ]).scalars().all()
+        user_ids = []
+        for start in range(0, users, SEED_BATCH):
+            user_ids += db.execute(insert(User).returning(User.id), [
+                {"name": f"User {i}", "email": f"bench-{tag}-{i}@example.com", "employee_id": f"E{i}"}
+                for i in range(start, min(users, start + SEED_BATCH))
+            ]).scalars().all()
+        seconds_today = max(1, int((now - today).total_seconds()))
+        for start in range(0, logs, SEED_BATCH):
+            db.execute(insert(AccessLog), [
+                {
+                    "door_id": rng.choice(door_ids),
+                    "user_id": rng.choice(user_ids) if user_ids and i % 10 else None,
+                    "timestamp": today + timedelta(seconds=rng.randrange(seconds_today)),
+                    "status": "success" if i % 10 else "failed",
+                    "confidence_score": round(rng.uniform(0.6, 1.0), 3),
+                    "notes": "benchmark",
+                }
+                for i in range(start, min(logs, start + SEED_BATCH))
+            ])
+        db.commit()
+    return user_ids, door_ids
+
+
+async def run_backend(args):
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    user_ids, door_ids = seed(args.users, args.doors, args.logs, rng)
+    seed_s = time.perf_counter() - started
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+
+        def create_access_log(i):
+            return client.post("/api/access-logs/", json={
+                "door_id": door_ids[i % len(door_ids)],
+                "user_id": user_ids[i % len(user_ids)] if user_ids else None,
+                "status": "success",
+                "confidence_score": 0.9,
+                "notes": "benchmark"
+            })
+
+        def list_access_logs(i):
+            return client.get("/api/access-logs/", params={
+                "door_id": door_ids[i % len(door_ids)], "limit": args.page_size
+            })
+
+        def list_today(i):
+            return client.get("/api/access-logs/today", params={"limit": args.page_size})
+
+        def list_users(i):
+            return client.get("/api/users/", params={"limit": args.page_size})
+
+        scenarios = {
+            "create_access_log": create_access_log,
+            "list_access_logs": list_access_logs,
+            "list_today": list_today,
+            "list_users": list_users,
+        }
+        results = {name: [] for name in scenarios}
+        for concurrency in args.concurrency:
+            for name, make_request in scenarios.items():
+                results[name].append(await drive(make_request, args.requests, concurrency))
+
+    return {
+        "config": {
+            "database": engine.dialect.name,
+            "async_routes": settings.DB_ASYNC_ENABLED,
+            "users": args.users,
+            "doors": args.doors,
+            "logs": args.logs,
+            "page_size": args.page_size,
+            "requests": args.requests,
+            "seed": args.seed,
+            "seed_s": round(seed_s, 2),
+        },
+        "results": results,
+    }
+
+
+def run_face(args):
+    command = [
+        sys.executable, "bench_suite.py",
+        "--gallery", str(args.gallery),
+        "--requests", str(args.face_requests),
+        "--seed", str(args.seed),
+        "--concurrency", *[str(c) for c in args.concurrency],
+    ]
+    output = subprocess.run(command, cwd=FACE_SERVICE_DIR, capture_output=True, text=True, check=True).stdout
+    # The report is the last JSON document on stdout
+    return json.loads(output[output.index("{\n"):])
+
+
+def compare(report, previous):
+    """Print requests/sec and p95 changes against an earlier report."""
+    for section in ("backend", "face"):
+        for name, runs in report.get(section, {}).get("results", {}).items():
+            before = {run["concurrency"]: run for run in previous.get(section, {}).get("results", {}).get(name, [])}
+            for run in runs:
+                old = before.get(run["concurrency"])
+                if old is None:
+                    continue
+                rps = (run["requests_per_s"] - old["requests_per_s"]) / old["requests_per_s"] * 100
+                p95 = (run["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0.0
+                print(f"{section}/{name} c={run['concurrency']}: "
+                      f"{old['requests_per_s']} -> {run['requests_per_s']} req/s ({rps:+.1f}%), "
+                      f"p95 {old['p95_ms']} -> {run['p95_ms']} ms ({p95:+.1f}%)", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--doors", type=int, default=20)
+    parser.add_argument("--logs", type=int, default=50000, help="Access logs seeded before measuring")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per scenario and concurrency")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--face", action="store_true", help="Also benchmark the face service")
+    parser.add_argument("--gallery", type=int, default=10000, help="Face gallery templates (--face)")
+    parser.add_argument("--face-requests", type=int, default=300, help="Face requests per endpoint (--face)")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--compare", help="Earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    report = {
+        "started_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": asyncio.run(run_backend(args)),
+    }
+    if args.face:
+        report["face"] = run_face(args)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Commit-ordered ids for the change feeds (gallery_changes, policy_changes).
+
+A serial id is drawn from its sequence when the row is inserted, not when
+the transaction commits, so a change that commits late can land below a
+watermark a consumer has already passed and is then never seen. The feeds
+take their ids from a per-feed counter row instead: the UPDATE that bumps
+it keeps the row locked until the transaction ends, so writers of one feed
+are serialised, ids become visible in increasing order, and a rollback
+hands its ids back. Feeds must always be bumped in the same order within a
+transaction (gallery before policy) so two writers cannot deadlock.
+"""
+from sqlalchemy import func, literal, select, true, update
+from sqlalchemy.orm import Session
+
+from database import engine
+from models import ChangeCounter
+
+
+def _seed_statement(table):
+    """Create the counter at the feed's highest existing id, if it is missing."""
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(ChangeCounter).from_select(
+        ["name", "value"],
+        # WHERE true: SQLite cannot otherwise tell ON CONFLICT from a join clause
+        select(literal(table.name), func.coalesce(func.max(table.c.id), 0)).where(true())
+    ).on_conflict_do_nothing(index_elements=["name"])
+
+
+def next_ids(db: Session, model, count: int = 1) -> int:
+    """Reserve ``count`` consecutive ids of ``model``'s feed; returns the first."""
+    table = model.__table__
+    bump = (
+        update(ChangeCounter)
+        .where(ChangeCounter.name == table.name)
+        .values(value=ChangeCounter.value + count)
+        .returning(ChangeCounter.value)
+    )
+    last = db.execute(bump).scalar()
+    if last is None:
+        db.execute(_seed_statement(table))
+        last = db.execute(bump).scalar()
+    return last - count + 1
+
+
+def current(db: Session, model) -> int:
+    """Highest committed id of ``model``'s feed."""
+    value = db.execute(
+        select(ChangeCounter.value).where(ChangeCounter.name == model.__table__.name)
+    ).scalar()
+    if value is None:
+        # Not bumped since the counters were introduced; serial ids still apply
+        value = db.query(func.max(model.id)).scalar()
+    return value or 0
@@ -1,15 +1,93 @@
-from sqlalchemy import create_engine
+import logging
+import time
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 from config import settings
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
-    echo=True
-)
+slow_query_logger = logging.getLogger("database.slow_query")
+
+
+def engine_options(url):
+    """Pool and logging options from settings; SQLite keeps its default pool."""
+    options = {
+        "echo": settings.DB_ECHO,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+def log_slow_queries(sync_engine, threshold_ms):
+    """Log statements slower than threshold_ms instead of echoing every one."""
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+    
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def check_duration(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["query_started"].pop()) * 1000
+        if elapsed_ms >= threshold_ms:
+            slow_query_logger.warning(f"Slow query ({elapsed_ms:.1f} ms): {statement}")
+
+
+def pool_stats(sync_engine):
+    """Connection pool gauges, or None for pools that do not track them (e.g. NullPool)."""
+    pool = sync_engine.pool
+    if not hasattr(pool, "checkedout"):
+        return None
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+
+
+def async_url(url):
+    """Async driver URL for DATABASE_URL: asyncpg for PostgreSQL, aiosqlite for SQLite."""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    scheme, rest = url.split("://", 1)
+    if scheme.startswith("postgresql"):
+        return f"postgresql+asyncpg://{rest}"
+    if scheme.startswith("sqlite"):
+        return f"sqlite+aiosqlite://{rest}"
+    raise ValueError(f"No async driver known for {scheme}")
+
+
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+if settings.DB_SLOW_QUERY_MS > 0:
+    log_slow_queries(engine, settings.DB_SLOW_QUERY_MS)
+
+# Monthly range partitions for access_logs need PostgreSQL; elsewhere a plain
+# table with the same indexes is used.
+ACCESS_LOG_PARTITIONED = settings.ACCESS_LOG_PARTITIONING and engine.dialect.name == "postgresql"
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional async engine for the async access-log routes
+async_engine = None
+AsyncSessionLocal = None
+if settings.DB_ASYNC_ENABLED:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    
+    async_database_url = async_url(settings.DATABASE_URL)
+    async_options = engine_options(async_database_url)
+    async_options.pop("connect_args", None)
+    async_engine = create_async_engine(async_database_url, **async_options)
+    if settings.DB_SLOW_QUERY_MS > 0:
+        log_slow_queries(async_engine.sync_engine, settings.DB_SLOW_QUERY_MS)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -18,3 +96,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
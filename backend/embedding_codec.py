@@ -0,0 +1,108 @@
+"""
+Binary storage format for face embeddings.
+
+Each blob is a fixed 12-byte header followed by ``dim`` values:
+
+    magic  4s   b"FEMB"
+    version B   FORMAT_VERSION
+    dtype  B   0 = float32, 1 = float16, 2 = int8 (symmetric, per-row scale)
+    dim    H   number of values
+    scale  f   int8 dequantisation scale (1.0 for float types)
+
+All blobs in a gallery share dtype and dim, so a whole table can be turned
+into one NumPy matrix with a single frombuffer over the concatenated bytes.
+"""
+import struct
+import numpy as np
+
+MAGIC = b"FEMB"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sBBHf")
+
+DTYPES = {
+    "float32": (0, np.float32),
+    "float16": (1, np.float16),
+    "int8": (2, np.int8),
+}
+DTYPE_BY_CODE = {code: (name, np_dtype) for name, (code, np_dtype) in DTYPES.items()}
+
+
+class EmbeddingFormatError(ValueError):
+    pass
+
+
+def encode(vector, dtype: str = "float32") -> bytes:
+    if dtype not in DTYPES:
+        raise EmbeddingFormatError(f"Unsupported embedding dtype: {dtype}")
+    code, np_dtype = DTYPES[dtype]
+    values = np.asarray(vector, dtype=np.float32).reshape(-1)
+    scale = 1.0
+    if np_dtype is np.int8:
+        peak = float(np.abs(values).max()) if values.size else 0.0
+        scale = peak / 127.0 if peak > 0 else 1.0
+        payload = np.clip(np.round(values / scale), -127, 127).astype(np.int8)
+    else:
+        payload = values.astype(np_dtype)
+    return HEADER.pack(MAGIC, FORMAT_VERSION, code, values.shape[0], scale) + payload.tobytes()
+
+
+def decode_header(blob: bytes):
+    """Returns (dtype name, dim, scale)."""
+    if len(blob) < HEADER.size:
+        raise EmbeddingFormatError("Embedding blob is shorter than its header")
+    magic, version, code, dim, scale = HEADER.unpack_from(blob)
+    if magic != MAGIC or version != FORMAT_VERSION or code not in DTYPE_BY_CODE:
+        raise EmbeddingFormatError("Unrecognised embedding blob header")
+    return DTYPE_BY_CODE[code][0], dim, scale
+
+
+def decode(blob: bytes) -> np.ndarray:
+    dtype, dim, scale = decode_header(blob)
+    values = np.frombuffer(blob, dtype=DTYPES[dtype][1], count=dim, offset=HEADER.size)
+    return values.astype(np.float32) * np.float32(scale)
+
+
+def decode_many(blobs) -> np.ndarray:
+    """
+    Decode equally shaped blobs into an (N, dim) float32 matrix.
+
+    The blobs are concatenated once and viewed as fixed-width records; only
+    the first header is parsed in Python, the rest are compared in bulk.
+    """
+    if not blobs:
+        return np.empty((0, 0), dtype=np.float32)
+    dtype, dim, _ = decode_header(blobs[0])
+    np_dtype = DTYPES[dtype][1]
+    record = np.dtype([
+        ("prefix", "V8"),
+        ("scale", "<f4"),
+        ("values", np_dtype, (dim,)),
+    ])
+    buffer = b"".join(blobs)
+    if len(buffer) != record.itemsize * len(blobs):
+        raise EmbeddingFormatError("Embeddings in the gallery do not share one dtype and dimension")
+    records = np.frombuffer(buffer, dtype=record)
+    if not (records["prefix"] == records["prefix"][0]).all():
+        raise EmbeddingFormatError("Embeddings in the gallery do not share one dtype and dimension")
+    matrix = records["values"].astype(np.float32)
+    if np_dtype is np.int8:
+        matrix *= records["scale"][:, None]
+    return matrix
+
+
+# Gallery transfer frame served to the face recognition service:
+# header, then embedding ids (int64), user ids (int64), float32 matrix.
+GALLERY_MAGIC = b"FGAL"
+GALLERY_HEADER = struct.Struct("<4sBIIQ")
+
+
+def pack_gallery(embedding_ids, user_ids, matrix, watermark: int) -> bytes:
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    count = matrix.shape[0]
+    dim = matrix.shape[1] if count else 0
+    return b"".join([
+        GALLERY_HEADER.pack(GALLERY_MAGIC, FORMAT_VERSION, dim, count, watermark),
+        np.asarray(embedding_ids, dtype="<i8").tobytes(),
+        np.asarray(user_ids, dtype="<i8").tobytes(),
+        matrix.astype("<f4").tobytes(),
+    ])
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from executor import QueueFullError
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent requests into batches.
+
+    Callers ``await submit(item)``; a background task collects items until
+    ``max_batch`` are waiting or ``max_wait_ms`` has passed since the first
+    one arrived, runs ``fn(items)`` once on a dedicated thread and hands
+    each caller its own result. While one batch runs the next one fills up,
+    so under load batches grow on their own and an idle request waits at
+    most ``max_wait_ms``.
+    """
+
+    def __init__(self, fn, max_batch=16, max_wait_ms=2.0, max_queue=1024, name="batcher"):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue = max_queue
+        self.name = name
+        self._queue = None
+        self._task = None
+        self._thread = None
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self.last_batch_ms = 0.0
+        self._batch_total_ms = 0.0
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix=self.name)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._thread is not None:
+            self._thread.shutdown(wait=True)
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((item, future))
+        except asyncio.QueueFull:
+            raise QueueFullError(f"{self.name} queue is full")
+        return await future
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            # Callers that gave up (cancelled) do not need work done
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self._thread, self.fn, [item for item, _ in batch])
+            except Exception as e:
+                logger.error(f"{self.name} batch of {len(batch)} failed: {str(e)}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.batches += 1
+            self.items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self.last_batch_ms = elapsed_ms
+            self._batch_total_ms += elapsed_ms
+
+    def stats(self):
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "last_batch_ms": round(self.last_batch_ms, 3),
+            "avg_batch_ms": round(self._batch_total_ms / self.batches, 3) if self.batches else 0.0,
+        }
+
+
+def embed_and_match(embedder, matcher):
+    """
+    Batch function for face crops: one batched embedding pass and one
+    batched gallery search. Returns (embedding, user_id, score) per crop.
+    """
+    def run(crops):
+        embeddings = embedder.embed_crops(crops)
+        matches = matcher.match_many(embeddings)
+        return [
+            (embedding, user_id, score)
+            for embedding, (user_id, score) in zip(embeddings, matches)
+        ]
+    return run
@@ -0,0 +1,100 @@
+"""
+Throughput benchmark: per-request vs micro-batched embedding + matching.
+
+Simulates --concurrency callers each submitting face crops back to back.
+The per-request baseline embeds and matches every crop on its own in a
+thread pool of --workers threads; the batched runs go through MicroBatcher
+with each --max-batch setting.
+
+Usage: python bench_batching.py --templates 50000 --concurrency 64 --requests 4000
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from batcher import MicroBatcher, embed_and_match
+from bench_index import percentile_ms, synthetic_gallery
+from embeddings import FaceEmbedder
+from matcher import FaceMatcher
+
+
+async def drive(call, crops, concurrency):
+    """Run all crops through ``call`` with a fixed number of concurrent callers."""
+    timings = []
+    position = 0
+
+    async def caller():
+        nonlocal position
+        while position < len(crops):
+            crop = crops[position]
+            position += 1
+            started = time.perf_counter()
+            await call(crop)
+            timings.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    return len(crops) / (time.perf_counter() - started), timings
+
+
+async def per_request(embedder, matcher, crops, concurrency, workers):
+    pool = ThreadPoolExecutor(max_workers=workers)
+    loop = asyncio.get_running_loop()
+
+    def single(crop):
+        embedding = embedder.embed_crop(crop)
+        return embedding, *matcher.match(embedding)
+
+    try:
+        return await drive(lambda crop: loop.run_in_executor(pool, single, crop), crops, concurrency)
+    finally:
+        pool.shutdown()
+
+
+async def batched(embedder, matcher, crops, concurrency, max_batch, max_wait_ms):
+    batcher = MicroBatcher(embed_and_match(embedder, matcher), max_batch=max_batch,
+                           max_wait_ms=max_wait_ms, max_queue=concurrency * 2)
+    await batcher.start()
+    try:
+        throughput, timings = await drive(batcher.submit, crops, concurrency)
+    finally:
+        await batcher.stop()
+    return throughput, timings, batcher.stats()["avg_batch"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--templates", type=int, default=50000)
+    parser.add_argument("--model", default="", help="SFace ONNX model; grey-patch fallback when empty")
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-batch", type=int, nargs="+", default=[8, 16, 32, 64])
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    embedder = FaceEmbedder(args.model)
+    vectors, labels, _ = synthetic_gallery(args.templates, embedder.dim, 4)
+    matcher = FaceMatcher()
+    matcher.load(labels, vectors)
+    rng = np.random.default_rng(2)
+    crops = [rng.integers(0, 255, (140, 120, 3), dtype=np.uint8) for _ in range(args.requests)]
+
+    print(f"gallery {args.templates} x {embedder.dim}, {args.requests} requests, concurrency {args.concurrency}")
+    print(f"{'mode':<24}{'req/s':>10}{'avg batch':>11}{'p50 ms':>10}{'p99 ms':>10}")
+    throughput, timings = asyncio.run(per_request(embedder, matcher, crops, args.concurrency, args.workers))
+    print(f"{f'per-request ({args.workers} thr)':<24}{throughput:>10.0f}{1:>11.1f}"
+          f"{percentile_ms(timings, 50):>10.2f}{percentile_ms(timings, 99):>10.2f}")
+    for max_batch in args.max_batch:
+        throughput, timings, avg_batch = asyncio.run(
+            batched(embedder, matcher, crops, args.concurrency, max_batch, args.max_wait_ms)
+        )
+        print(f"{f'batched (max {max_batch})':<24}{throughput:>10.0f}{avg_batch:>11.1f}"
+              f"{percentile_ms(timings, 50):>10.2f}{percentile_ms(timings, 99):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
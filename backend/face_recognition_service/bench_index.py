@@ -0,0 +1,79 @@
+"""
+Recall/latency benchmark: exact vs IVF gallery index.
+
+Usage: python bench_index.py --templates 200000 --dim 128 --queries 500
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from index import ExactIndex, IVFIndex, normalize_rows
+from snapshot import open_snapshot, write_snapshot
+
+
+def synthetic_gallery(templates, dim, per_user, seed=0):
+    """Clustered data: each user has a few noisy templates around an identity vector."""
+    rng = np.random.default_rng(seed)
+    users = templates // per_user
+    identities = normalize_rows(rng.standard_normal((users, dim)))
+    labels = np.repeat(np.arange(users), per_user)
+    vectors = identities[labels] + 0.25 * rng.standard_normal((labels.shape[0], dim)) / np.sqrt(dim)
+    return normalize_rows(vectors), labels, identities
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q) * 1000)
+
+
+def run(index, queries):
+    timings, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        results.append(index.search(query)[0])
+        timings.append(time.perf_counter() - started)
+    return results, timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--templates", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--per-user", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--nlist", type=int, default=0)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    args = parser.parse_args()
+
+    vectors, labels, identities = synthetic_gallery(args.templates, args.dim, args.per_user)
+    rng = np.random.default_rng(1)
+    picked = rng.choice(identities.shape[0], args.queries)
+    queries = normalize_rows(
+        identities[picked] + 0.25 * rng.standard_normal((args.queries, args.dim)) / np.sqrt(args.dim)
+    )
+
+    exact = ExactIndex().build(vectors, labels)
+    truth, timings = run(exact, queries)
+    print(f"{'index':<16}{'recall@1':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    print(f"{'exact':<16}{1.0:>10.3f}{percentile_ms(timings, 50):>10.3f}{percentile_ms(timings, 99):>10.3f}")
+
+    started = time.perf_counter()
+    ivf = IVFIndex(nlist=args.nlist).build(vectors, labels)
+    build_seconds = time.perf_counter() - started
+    for nprobe in args.nprobe:
+        ivf.nprobe = nprobe
+        found, timings = run(ivf, queries)
+        recall = float(np.mean(np.asarray(found) == np.asarray(truth)))
+        name = f"ivf nprobe={nprobe}"
+        print(f"{name:<16}{recall:>10.3f}{percentile_ms(timings, 50):>10.3f}{percentile_ms(timings, 99):>10.3f}")
+
+    directory = tempfile.mkdtemp()
+    write_snapshot(ivf, directory, watermark=0)
+    started = time.perf_counter()
+    open_snapshot(directory)
+    print(f"\nIVF build: {build_seconds * 1000:.0f} ms, snapshot map: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
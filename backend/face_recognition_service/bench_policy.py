@@ -0,0 +1,159 @@
+"""
+Decision latency and compile time of the access policy engine.
+
+Builds a synthetic policy (users spread over user groups, doors over door
+groups, rules with and without time windows), then times:
+
+  - a full compile and incremental recompiles after one membership or
+    rule change,
+  - PolicyEngine.check() against a direct scan of the rules (the cost of
+    deciding without compiling), both checked to agree.
+
+Usage: python bench_policy.py --users 100000 --user-groups 200 --doors 500 --rules 2000
+"""
+import argparse
+import copy
+import random
+import time
+
+import numpy as np
+
+from policy import PolicyEngine, window_intervals
+
+
+def synthetic_policy(args, rng):
+    user_groups = {str(g): [] for g in range(1, args.user_groups + 1)}
+    for user_id in range(1, args.users + 1):
+        for g in rng.sample(range(1, args.user_groups + 1), args.groups_per_user):
+            user_groups[str(g)].append(user_id)
+    door_groups = {str(g): [] for g in range(1, args.door_groups + 1)}
+    for door_id in range(1, args.doors + 1):
+        door_groups[str(rng.randint(1, args.door_groups))].append(door_id)
+    rules = []
+    for rule_id in range(1, args.rules + 1):
+        timed = rng.random() < args.timed
+        start = rng.randrange(0, 1440, 30) if timed else 0
+        rules.append({
+            "id": rule_id,
+            "user_group_id": rng.randint(1, args.user_groups),
+            "door_group_id": rng.randint(1, args.door_groups),
+            "days": rng.choice([31, 96, 127]) if timed else 127,
+            "start_minute": start,
+            "end_minute": (start + rng.randrange(60, 720, 30)) % 1440 if timed else 1440,
+        })
+    return {
+        "version": 1,
+        "changed": True,
+        "inactive_user_ids": rng.sample(range(1, args.users + 1), args.users // 100),
+        "inactive_door_ids": rng.sample(range(1, args.doors + 1), args.doors // 50),
+        "user_groups": user_groups,
+        "door_groups": door_groups,
+        "rules": rules,
+    }
+
+
+class RuleScan:
+    """The uncompiled decision: walk every rule for every request."""
+
+    def __init__(self, snapshot):
+        self.members = {int(g): set(ids) for g, ids in snapshot["user_groups"].items()}
+        self.doors = {int(g): set(ids) for g, ids in snapshot["door_groups"].items()}
+        self.rules = [
+            (rule["user_group_id"], rule["door_group_id"],
+             window_intervals(rule["days"], rule["start_minute"], rule["end_minute"]))
+            for rule in snapshot["rules"]
+        ]
+        self.inactive_users = set(snapshot["inactive_user_ids"])
+        self.inactive_doors = set(snapshot["inactive_door_ids"])
+
+    def allowed(self, user_id, door_id, minute):
+        if user_id in self.inactive_users or door_id in self.inactive_doors:
+            return False
+        return any(
+            door_id in self.doors.get(door_group_id, ()) and user_id in self.members.get(user_group_id, ())
+            and any(start <= minute < end for start, end in intervals)
+            for user_group_id, door_group_id, intervals in self.rules
+        )
+
+
+def timed(fn):
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+
+def latency(decide, queries):
+    samples = np.empty(len(queries))
+    for i, (user_id, door_id, minute) in enumerate(queries):
+        started = time.perf_counter_ns()
+        decide(user_id, door_id, minute)
+        samples[i] = time.perf_counter_ns() - started
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--user-groups", type=int, default=200)
+    parser.add_argument("--groups-per-user", type=int, default=3)
+    parser.add_argument("--doors", type=int, default=500)
+    parser.add_argument("--door-groups", type=int, default=50)
+    parser.add_argument("--rules", type=int, default=2000)
+    parser.add_argument("--timed", type=float, default=0.5, help="Fraction of rules with a time window")
+    parser.add_argument("--queries", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    snapshot = synthetic_policy(args, rng)
+    engine = PolicyEngine()
+    full_ms = timed(lambda: engine.load(snapshot))
+    stats = engine.stats()
+    print(f"full compile: {full_ms:.1f} ms, {stats['doors']} doors, {stats['week_segments']} week segments, "
+          f"{stats['bitset_bytes'] / 1024:.0f} KiB of bitsets")
+
+    def move_door(s):
+        for ids in s["door_groups"].values():
+            if 1 in ids:
+                ids.remove(1)
+        s["door_groups"][str(args.door_groups)].append(1)
+
+    changes = {
+        "add user to group": lambda s: s["user_groups"]["1"].append(args.users + 1),
+        "edit rule window": lambda s: s["rules"][0].update(start_minute=(s["rules"][0]["start_minute"] + 30) % 1440),
+        "move door to group": move_door,
+        "deactivate door": lambda s: s["inactive_door_ids"].append(1),
+    }
+    for name, change in changes.items():
+        changed = copy.deepcopy(snapshot)
+        change(changed)
+        changed["version"] += 1
+        rebuilt = engine.load(changed)
+        ms = engine.last_compile_ms
+        engine.load(snapshot)
+        print(f"incremental ({name}): {ms:.2f} ms, {rebuilt} doors rebuilt")
+
+    scan = RuleScan(snapshot)
+    queries = [
+        (rng.randint(1, args.users), rng.randint(1, args.doors), rng.randrange(0, 10080))
+        for _ in range(args.queries)
+    ]
+    mismatches = sum(
+        (engine.check(user_id, door_id, minute) is None) != scan.allowed(user_id, door_id, minute)
+        for user_id, door_id, minute in queries[:2000]
+    )
+    granted = sum(engine.check(*query) is None for query in queries)
+
+    compiled = latency(engine.check, queries)
+    scanned = latency(scan.allowed, queries[:max(1, args.queries // 20)])
+    print(f"\n{'decision':<16}{'p50 us':>10}{'p99 us':>10}{'mean us':>10}")
+    for name, samples in (("compiled", compiled), ("rule scan", scanned)):
+        print(f"{name:<16}{np.percentile(samples, 50) / 1000:>10.2f}{np.percentile(samples, 99) / 1000:>10.2f}"
+              f"{samples.mean() / 1000:>10.2f}")
+    now = timed(lambda: [engine.check(user_id, door_id) for user_id, door_id, _ in queries[:10000]]) / 10000
+    print(f"\ncompiled with local clock: {now * 1000:.2f} us/decision")
+    print(f"granted {granted / len(queries) * 100:.1f}% of queries, {mismatches} mismatches with the rule scan")
+
+
+if __name__ == "__main__":
+    main()
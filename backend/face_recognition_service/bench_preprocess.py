@@ -0,0 +1,68 @@
+"""
+Decode + detection latency per upload resolution: full-resolution decode
+(the old path) vs reduced-resolution JPEG decode, with and without a door
+ROI covering the centre quarter of the frame.
+
+Usage: python bench_preprocess.py --runs 30 --target-side 640
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+import inference
+from bench_index import percentile_ms
+from preprocess import PreprocessOptions, prepare_upload
+
+RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080), (2560, 1440), (3840, 2160)]
+
+
+def synthetic_jpeg(width, height, seed=0):
+    """Textured frame so the JPEG decoder does realistic work."""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 255, (height // 16, width // 16, 3), dtype=np.uint8)
+    image = cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+    image = cv2.add(image, rng.integers(0, 20, image.shape, dtype=np.uint8))
+    return cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+def time_path(fn, runs):
+    fn()
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--target-side", type=int, default=640)
+    args = parser.parse_args()
+
+    inference.init_worker(1, 0, 0.5)
+    fast = PreprocessOptions(args.target_side)
+    fast_roi = PreprocessOptions(args.target_side, (0.25, 0.25, 0.5, 0.5))
+
+    def full_path(contents):
+        image = inference.decode_image(contents)
+        return inference.detect(image)
+
+    def prepared_path(contents, options):
+        return inference.detect_prepared(prepare_upload(contents, options), None)
+
+    print(f"{'resolution':<12}{'full p50':>10}{'reduced p50':>13}{'+roi p50':>10}{'speedup':>9}  (ms)")
+    for width, height in RESOLUTIONS:
+        contents = synthetic_jpeg(width, height)
+        baseline = percentile_ms(time_path(lambda: full_path(contents), args.runs), 50)
+        reduced = percentile_ms(time_path(lambda: prepared_path(contents, fast), args.runs), 50)
+        roi = percentile_ms(time_path(lambda: prepared_path(contents, fast_roi), args.runs), 50)
+        print(f"{f'{width}x{height}':<12}{baseline:>10.2f}{reduced:>13.2f}{roi:>10.2f}{baseline / roi:>8.1f}x")
+    inference.close_worker()
+
+
+if __name__ == "__main__":
+    main()
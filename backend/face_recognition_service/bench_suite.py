@@ -0,0 +1,201 @@
+"""
+Face service load benchmark: /api/recognize and /api/detect-faces.
+
+Runs the app in-process through httpx's ASGI transport, with no backend:
+the gallery is built from synthetic drawn faces (enrolled through the real
+detection + embedding path) padded with random templates up to --gallery,
+and access logs stay queued in memory instead of being shipped. Every
+setting in config.py can still be changed through the environment, e.g.
+INFERENCE_BATCHING=true or INFERENCE_EXECUTOR=process.
+
+Prints one JSON document with throughput and p50/p95/p99 latency per
+endpoint and concurrency level. backend/bench_suite.py runs this script
+too when given --face.
+
+Usage: python bench_suite.py --gallery 10000 --requests 500 --concurrency 1 8 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+
+# Standalone: no backend to ship logs to or sync the gallery from
+os.environ.setdefault("BACKEND_API_URL", "http://127.0.0.1:9")
+os.environ.setdefault("ACCESS_LOG_SPOOL_PATH", os.path.join(tempfile.mkdtemp(), "spool.jsonl"))
+os.environ.setdefault("ACCESS_LOG_QUEUE_SIZE", "1000000")
+os.environ.setdefault("GALLERY_SNAPSHOT_DIR", "")
+# Measure the full recognition path even without an embedding model
+os.environ.setdefault("FACE_EMBEDDING_FALLBACK", "true")
+
+import logging
+logging.disable(logging.WARNING)
+
+import cv2
+import httpx
+import numpy as np
+
+import inference
+import main as service
+from config import settings
+
+
+def synthetic_face(seed, width=640, height=480):
+    """A drawn face (skin ellipse, eyes, brows, nose, mouth) the detector accepts."""
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width, 3), rng.integers(60, 200, 3), np.uint8)
+    cx = width // 2 + int(rng.integers(-40, 40))
+    cy = height // 2 + int(rng.integers(-30, 30))
+    fw = int(rng.integers(90, 130) * height / 480)
+    fh = int(fw * 1.3)
+    skin = tuple(int(c) for c in rng.integers([90, 120, 160], [150, 180, 230]))
+    cv2.ellipse(image, (cx, cy), (fw, fh), 0, 0, 360, skin, -1)
+    eye_y, eye_x = cy - fh // 4, fw // 2
+    for side in (-1, 1):
+        x = cx + side * eye_x
+        cv2.ellipse(image, (x, eye_y), (fw // 5, fw // 10), 0, 0, 360, (255, 255, 255), -1)
+        cv2.circle(image, (x, eye_y), fw // 12, (40, 30, 20), -1)
+        cv2.line(image, (x - fw // 5, eye_y - fw // 5), (x + fw // 5, eye_y - fw // 4), (30, 30, 30), 4)
+    shade = tuple(int(c * 0.7) for c in skin)
+    cv2.line(image, (cx, eye_y + 10), (cx - 8, cy + fh // 6), shade, 3)
+    cv2.ellipse(image, (cx, cy + fh // 2 - 10), (fw // 3, fw // 8), 0, 0, 180, (60, 60, 160), -1)
+    return cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+def percentile_ms(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000 if values else 0.0
+
+
+async def drive(make_request, count, concurrency, outcome=None):
+    """
+    Issue ``count`` requests from ``concurrency`` callers; non-2xx count as
+    errors. ``outcome`` maps a successful response to a key to count.
+    """
+    latencies, errors, outcomes = [], 0, Counter()
+    next_index = iter(range(count))
+
+    async def caller():
+        nonlocal errors
+        for i in next_index:
+            started = time.perf_counter()
+            response = await make_request(i)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+            elif outcome is not None:
+                outcomes[outcome(response)] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    report = {
+        "requests": count,
+        "concurrency": concurrency,
+        "errors": errors,
+        "requests_per_s": round(count / elapsed, 1),
+        "p50_ms": round(percentile_ms(latencies, 50), 2),
+        "p95_ms": round(percentile_ms(latencies, 95), 2),
+        "p99_ms": round(percentile_ms(latencies, 99), 2),
+    }
+    if outcome is not None:
+        report["outcomes"] = dict(outcomes)
+    return report
+
+
+async def enroll(faces, gallery, seed):
+    """Embed the synthetic faces through the service and pad with random templates."""
+    options = service.preprocess_options()
+    embeddings = []
+    for contents in faces:
+        result = await service.run_inference(
+            inference.decode_detect_embed, contents, settings.DETECTOR_ACQUIRE_TIMEOUT, options
+        )
+        if result["embedding"] is None:
+            raise RuntimeError("Synthetic face was not detected")
+        embeddings.append(result["embedding"])
+    rng = np.random.default_rng(seed)
+    dim = len(embeddings[0])
+    padding = rng.standard_normal((max(0, gallery - len(embeddings)), dim)).astype(np.float32)
+    matrix = np.vstack([np.asarray(embeddings, dtype=np.float32), padding])
+    # Enrolled faces get user ids 1..N, padding ids follow
+    user_ids = np.arange(1, len(matrix) + 1)
+    service.face_matcher.load(user_ids, matrix, list(range(1, len(matrix) + 1)))
+
+
+async def run(args):
+    width, height = args.image_size
+    known = [synthetic_face(args.seed + i, width, height) for i in range(args.identities)]
+    unknown = [synthetic_face(args.seed + 100000 + i, width, height) for i in range(args.identities)]
+
+    service.inference_executor.start()
+    if settings.INFERENCE_BATCHING:
+        await service.embedding_batcher.start()
+    try:
+        await enroll(known, args.gallery, args.seed)
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+
+            def detect(i):
+                files = {"file": ("face.jpg", known[i % len(known)], "image/jpeg")}
+                return client.post("/api/detect-faces", files=files)
+
+            def recognize(i):
+                # Alternate enrolled and unenrolled faces. Without FACE_EMBEDDING_MODEL the
+                # grey-patch embedder barely tells drawn faces apart, so most are granted.
+                contents = (known if i % 2 == 0 else unknown)[(i // 2) % len(known)]
+                files = {"file": ("face.jpg", contents, "image/jpeg")}
+                return client.post("/api/recognize", params={"door_id": 1}, files=files)
+
+            results = {"detect_faces": [], "recognize": []}
+            for concurrency in args.concurrency:
+                await drive(detect, min(args.requests, concurrency * 2), concurrency)
+                results["detect_faces"].append(await drive(detect, args.requests, concurrency))
+                results["recognize"].append(
+                    await drive(recognize, args.requests, concurrency, lambda r: r.json().get("status", "no_face"))
+                )
+    finally:
+        if settings.INFERENCE_BATCHING:
+            await service.embedding_batcher.stop()
+        service.inference_executor.shutdown()
+        inference.close_worker()
+
+    return {
+        "config": {
+            "gallery": args.gallery,
+            "identities": args.identities,
+            "image_size": f"{width}x{height}",
+            "requests": args.requests,
+            "seed": args.seed,
+            "executor": settings.INFERENCE_EXECUTOR,
+            "workers": settings.INFERENCE_WORKERS,
+            "batching": settings.INFERENCE_BATCHING,
+            "index": settings.FACE_INDEX_BACKEND,
+            "embedding_dim": service.face_matcher.stats().get("dim"),
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--gallery", type=int, default=10000, help="Templates in the gallery")
+    parser.add_argument("--identities", type=int, default=8, help="Distinct synthetic faces enrolled")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint and concurrency")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--image-size", type=int, nargs=2, default=[640, 480], metavar=("W", "H"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = json.dumps(asyncio.run(run(args)), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
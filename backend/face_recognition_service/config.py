@@ -0,0 +1,98 @@
+from pydantic_settings import BaseSettings
+
+class Settings(BaseSettings):
+    # Backend API
+    BACKEND_API_URL: str = "http://localhost:8000"
+    
+    # Face Detection
+    DETECTOR_MODEL_SELECTION: int = 0
+    DETECTOR_MIN_CONFIDENCE: float = 0.5
+    DETECTOR_ACQUIRE_TIMEOUT: float = 5.0
+    # Deprecated: the pool now follows INFERENCE_WORKERS; when set (> 0) it
+    # still overrides the thread-mode pool size
+    DETECTOR_POOL_SIZE: int = 0
+    MIN_FACE_SCORE: float = 0.7
+    
+    # Pre-processing: JPEGs are decoded at 1/2, 1/4 or 1/8 scale while the
+    # long side stays >= this many pixels (0 always decodes full resolution)
+    PREPROCESS_TARGET_SIDE: int = 640
+    DOOR_CONFIG_REFRESH_INTERVAL: float = 30.0
+    
+    # Access policy (user/door groups and time windows from the backend).
+    # Off: every recognised active user is granted at every door.
+    ACCESS_POLICY_ENABLED: bool = False
+    ACCESS_POLICY_REFRESH_INTERVAL: float = 5.0
+    
+    # Face Recognition
+    FACE_EMBEDDING_MODEL: str = ""
+    # Development only: identify with grey-patch embeddings when no model is
+    # set. Off, recognition without a model denies everyone.
+    FACE_EMBEDDING_FALLBACK: bool = False
+    FACE_MATCH_THRESHOLD: float = 0.6
+    GALLERY_LOAD_TIMEOUT: float = 10.0
+    GALLERY_SYNC_INTERVAL: float = 0.5
+    GALLERY_COMPACT_TOMBSTONES: int = 256
+    GALLERY_COMPACT_INTERVAL: float = 300.0
+    GALLERY_SNAPSHOT_DIR: str = ""
+    
+    # Gallery index ("exact" or "ivf")
+    FACE_INDEX_BACKEND: str = "exact"
+    FACE_INDEX_NLIST: int = 0
+    FACE_INDEX_NPROBE: int = 8
+    
+    # Edge mode: gallery snapshot + changes, policy and door config kept in
+    # EDGE_DATA_DIR and access events journaled there, so doors keep
+    # deciding and logging while the backend is unreachable
+    EDGE_MODE: bool = False
+    EDGE_DATA_DIR: str = "edge_data"
+    EDGE_JOURNAL_RETENTION_HOURS: float = 24.0  # uploaded events kept locally this long
+    
+    # Access log shipping
+    ACCESS_LOG_BATCH_SIZE: int = 50
+    ACCESS_LOG_FLUSH_INTERVAL: float = 0.5
+    ACCESS_LOG_QUEUE_SIZE: int = 10000
+    ACCESS_LOG_MAX_RETRIES: int = 3
+    ACCESS_LOG_SPOOL_PATH: str = "access_log_spool.jsonl"
+    ACCESS_LOG_SPOOL_MAX_BYTES: int = 50 * 1024 * 1024
+    
+    # Face tracking on camera streams (one access log per person per door;
+    # every frame is still recognised and decided)
+    FACE_TRACKING: bool = True
+    TRACK_TTL: float = 2.0  # seconds without a detection before a track ends
+    TRACK_IOU_THRESHOLD: float = 0.3
+    TRACK_SIMILARITY_THRESHOLD: float = 0.6
+    TRACK_LOG_WINDOW: float = 30.0  # re-log an unchanged track at most this often
+    
+    # Camera streams (doors with a camera_url)
+    STREAMS_ENABLED: bool = False
+    STREAM_SOURCES: str = ""  # "door_id=url,..." overrides the backend door list
+    STREAM_SAMPLE_FPS: float = 5.0
+    STREAM_MOTION_THRESHOLD: int = 25
+    STREAM_MOTION_MIN_AREA: float = 0.01  # fraction of pixels that must change
+    STREAM_RECONNECT_DELAY: float = 2.0
+    STREAM_REFRESH_INTERVAL: float = 30.0
+    
+    # Inference executor ("thread" or "process")
+    INFERENCE_EXECUTOR: str = "thread"
+    INFERENCE_WORKERS: int = 4
+    INFERENCE_QUEUE_SIZE: int = 16
+    INFERENCE_TIMEOUT: float = 2.0
+    
+    # Bulk enrolment (enroll_bulk.py) quality checks
+    ENROLL_MIN_FACE_SCORE: float = 0.8
+    ENROLL_MIN_FACE_SIZE: int = 80  # pixels, shorter side of the face crop
+    ENROLL_MIN_SHARPNESS: float = 30.0  # variance of the Laplacian of the crop
+    # A face this similar to another person's template would be confused with them
+    ENROLL_DUPLICATE_THRESHOLD: float = 0.6
+    
+    # Sampling profiler, started and stopped at runtime via /api/profiler/*
+    PROFILER_ENABLED: bool = False
+    PROFILER_MAX_SECONDS: float = 60.0
+    
+    # Micro-batched embedding + matching across concurrent requests
+    INFERENCE_BATCHING: bool = False
+    BATCH_MAX_SIZE: int = 16
+    BATCH_MAX_WAIT_MS: float = 2.0
+    BATCH_QUEUE_SIZE: int = 256
+
+settings = Settings()
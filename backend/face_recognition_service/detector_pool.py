@@ -0,0 +1,103 @@
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import mediapipe as mp
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+mp_face_detection = mp.solutions.face_detection
+
+
+class DetectorBusyError(Exception):
+    pass
+
+
+class DetectorPool:
+    """
+    Pool of warm MediaPipe FaceDetection instances.
+
+    A FaceDetection graph must not be used by two threads at once, so every
+    caller checks out its own instance and returns it when done. Instances
+    are built and warmed once at startup instead of on every request.
+    """
+
+    def __init__(self, size, model_selection=0, min_detection_confidence=0.5):
+        self.size = max(1, size)
+        self.model_selection = model_selection
+        self.min_detection_confidence = min_detection_confidence
+        self.init_seconds = 0.0
+        self._pool = queue.Queue()
+        self._lock = threading.Lock()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def start(self):
+        started = time.perf_counter()
+        dummy = np.zeros((128, 128, 3), dtype=np.uint8)
+        for _ in range(self.size):
+            detector = mp_face_detection.FaceDetection(
+                model_selection=self.model_selection,
+                min_detection_confidence=self.min_detection_confidence
+            )
+            # First process() call builds the graph; do it before traffic arrives
+            detector.process(dummy)
+            self._pool.put(detector)
+        self.init_seconds = time.perf_counter() - started
+        logger.info(
+            f"Detector pool ready: {self.size} instances in {self.init_seconds * 1000:.0f} ms"
+        )
+
+    def close(self):
+        while True:
+            try:
+                detector = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            detector.close()
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        started = time.perf_counter()
+        try:
+            detector = self._pool.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self._timeouts += 1
+            raise DetectorBusyError("No face detector free within the acquire timeout")
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        try:
+            yield detector
+        finally:
+            self._pool.put(detector)
+
+    def process(self, rgb_image, timeout=None):
+        with self.acquire(timeout=timeout) as detector:
+            return detector.process(rgb_image)
+
+    def stats(self):
+        with self._lock:
+            checkouts = self._checkouts
+            wait_total = self._wait_total
+            wait_max = self._wait_max
+            timeouts = self._timeouts
+        return {
+            "pool_size": self.size,
+            "available": self._pool.qsize(),
+            "model_selection": self.model_selection,
+            "min_detection_confidence": self.min_detection_confidence,
+            "init_ms": round(self.init_seconds * 1000, 2),
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "wait_avg_ms": round(wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+            "wait_max_ms": round(wait_max * 1000, 3),
+        }
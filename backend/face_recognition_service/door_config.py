@@ -0,0 +1,102 @@
+import logging
+import threading
+import time
+
+import requests
+
+from config import settings
+from edge_store import DOORS
+
+logger = logging.getLogger(__name__)
+
+
+class DoorConfig:
+    """
+    Door settings the face service needs (camera URL, detection ROI), cached
+    from the backend and refreshed in the background so recognition never
+    waits on a backend round trip. With an EdgeStore the last door list is
+    kept locally and used until the backend answers.
+    """
+
+    def __init__(self, interval=30.0, store=None):
+        self.interval = interval
+        self.store = store
+        self._stored = None
+        self._doors = {}
+        self.refreshes = 0
+        self.errors = 0
+        self.last_refresh = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # A stored door list is good enough to start with; the backend is
+        # then asked from the background thread instead of delaying startup
+        stored = self.store is not None and self._load_stored()
+        if not stored:
+            self._try_refresh()
+        self._thread = threading.Thread(target=self._run, args=(stored,), name="door-config", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def refresh(self):
+        response = requests.get(f"{settings.BACKEND_API_URL}/api/doors/", timeout=settings.GALLERY_LOAD_TIMEOUT)
+        response.raise_for_status()
+        doors = response.json()
+        # Swap the whole dict so readers never see a half-built one
+        self._doors = {door["id"]: door for door in doors}
+        self.refreshes += 1
+        self.last_refresh = time.time()
+        if self.store is not None and doors != self._stored:
+            self.store.put(DOORS, 0, doors)
+            self._stored = doors
+
+    def _load_stored(self):
+        stored = self.store.get(DOORS)
+        if stored is None:
+            return False
+        self._doors = {door["id"]: door for door in stored[1]}
+        self._stored = stored[1]
+        logger.info(f"Loaded {len(self._doors)} doors from the edge store")
+        return True
+
+    def _try_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Could not load door config: {str(e)}")
+
+    def _run(self, refresh_first=False):
+        if refresh_first:
+            self._try_refresh()
+        while not self._stop.wait(self.interval):
+            self._try_refresh()
+
+    def roi(self, door_id):
+        """Relative (x, y, width, height) detection region, or None for the whole frame."""
+        door = self._doors.get(door_id)
+        if door is None or door.get("roi_width") is None or door.get("roi_height") is None:
+            return None
+        return (door.get("roi_x") or 0.0, door.get("roi_y") or 0.0, door["roi_width"], door["roi_height"])
+
+    def camera_sources(self):
+        """Active doors that have a camera_url, as {door_id: url}."""
+        return {
+            door_id: door["camera_url"]
+            for door_id, door in self._doors.items()
+            if door["status"] and door.get("camera_url")
+        }
+
+    def stats(self):
+        return {
+            "doors": len(self._doors),
+            "with_roi": sum(1 for door_id in self._doors if self.roi(door_id) is not None),
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+            "last_refresh": self.last_refresh,
+        }
@@ -0,0 +1,154 @@
+"""
+Local store of an edge face service (EDGE_MODE).
+
+One SQLite file keeps what a door controller needs to keep deciding while
+the central backend is unreachable:
+
+  state            latest policy snapshot and door list, each with the
+                   version it was fetched at
+  gallery_changes  change-feed entries applied since the last gallery
+                   snapshot (the snapshot itself stays in its .npy files),
+                   replayed on startup on top of that snapshot
+  journal          every access event, appended before the decision is
+                   returned and uploaded in order; the "journal" state row
+                   holds the last uploaded sequence number
+
+SQLite runs in WAL mode with synchronous=NORMAL, so an append is a local
+write of a few tens of microseconds and a power cut loses at most the
+last transactions, never the file. Each thread gets its own connection.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS gallery_changes (
+    id INTEGER PRIMARY KEY,
+    change TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    event TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+POLICY = "policy"
+DOORS = "doors"
+JOURNAL = "journal"
+
+
+class EdgeStore:
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._db().executescript(SCHEMA)
+        self.appended = 0
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def close(self):
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    def put(self, key, version, value):
+        """Replace a state document (JSON-encodable value) and its version."""
+        with self._db() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO state (key, version, value, updated_at) VALUES (?, ?, ?, ?)",
+                (key, version, json.dumps(value), time.time())
+            )
+
+    def get(self, key):
+        """(version, value) of a state document, or None."""
+        row = self._db().execute("SELECT version, value FROM state WHERE key = ?", (key,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def version(self, key, default=0):
+        row = self._db().execute("SELECT version FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def append_gallery_changes(self, changes):
+        if not changes:
+            return
+        with self._db() as db:
+            db.executemany(
+                "INSERT OR IGNORE INTO gallery_changes (id, change) VALUES (?, ?)",
+                [(change["id"], json.dumps(change)) for change in changes]
+            )
+
+    def gallery_changes(self, since):
+        """Stored change-feed entries after watermark ``since``, in order."""
+        rows = self._db().execute(
+            "SELECT change FROM gallery_changes WHERE id > ? ORDER BY id", (since,)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def truncate_gallery_changes(self, watermark):
+        """Forget changes a gallery snapshot at ``watermark`` already contains."""
+        with self._db() as db:
+            db.execute("DELETE FROM gallery_changes WHERE id <= ?", (watermark,))
+
+    def append_event(self, event):
+        with self._db() as db:
+            cursor = db.execute(
+                "INSERT INTO journal (event, created_at) VALUES (?, ?)", (json.dumps(event), time.time())
+            )
+        self.appended += 1
+        return cursor.lastrowid
+
+    def pending_events(self, limit):
+        """Up to ``limit`` (seq, event) pairs after the upload watermark."""
+        rows = self._db().execute(
+            "SELECT seq, event FROM journal WHERE seq > ? ORDER BY seq LIMIT ?",
+            (self.version(JOURNAL), limit)
+        ).fetchall()
+        return [(seq, json.loads(event)) for seq, event in rows]
+
+    def mark_uploaded(self, seq):
+        with self._db() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO state (key, version, value, updated_at) VALUES (?, ?, 'null', ?)",
+                (JOURNAL, seq, time.time())
+            )
+
+    def prune_journal(self, older_than):
+        """Delete uploaded events journaled before the ``older_than`` timestamp."""
+        with self._db() as db:
+            cursor = db.execute(
+                "DELETE FROM journal WHERE seq <= ? AND created_at < ?", (self.version(JOURNAL), older_than)
+            )
+        return cursor.rowcount
+
+    def stats(self):
+        db = self._db()
+        uploaded = self.version(JOURNAL)
+        return {
+            "journal_pending": db.execute("SELECT COUNT(*) FROM journal WHERE seq > ?", (uploaded,)).fetchone()[0],
+            "journal_rows": db.execute("SELECT COUNT(*) FROM journal").fetchone()[0],
+            "journal_uploaded_seq": uploaded,
+            "journal_appended": self.appended,
+            "gallery_changes": db.execute("SELECT COUNT(*) FROM gallery_changes").fetchone()[0],
+            "policy_version": self.version(POLICY, None),
+            "file_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
@@ -0,0 +1,111 @@
+import os
+import threading
+
+import cv2
+import numpy as np
+
+# SFace expects a 112x112 BGR face crop and returns a 128-d feature
+SFACE_INPUT_SIZE = 112
+FALLBACK_INPUT_SIZE = 32
+
+
+class FaceEmbedder:
+    """
+    Turns a detected face into a fixed-length embedding vector.
+
+    With FACE_EMBEDDING_MODEL pointing at an SFace ONNX model the OpenCV
+    FaceRecognizerSF network is used. Without a model a normalised grey
+    patch is used instead, which cannot tell strangers from enrolled users:
+    ``identifies`` is then False unless ``allow_fallback`` is set for
+    development, and callers must neither grant access nor enrol on it.
+    """
+
+    def __init__(self, model_path="", allow_fallback=False):
+        self.model_path = model_path
+        self.use_model = bool(model_path) and os.path.exists(model_path)
+        self.identifies = self.use_model or allow_fallback
+        self.dim = 128 if self.use_model else FALLBACK_INPUT_SIZE * FALLBACK_INPUT_SIZE
+        # Crops smaller than this are upscaled by embed_crop and lose detail
+        self.input_size = SFACE_INPUT_SIZE if self.use_model else FALLBACK_INPUT_SIZE
+        # FaceRecognizerSF instances are not shared between threads
+        self._local = threading.local()
+        # Cleared when the ONNX model turns out to have a fixed batch size
+        self.batchable = True
+
+    def _recognizer(self):
+        recognizer = getattr(self._local, "recognizer", None)
+        if recognizer is None:
+            recognizer = cv2.FaceRecognizerSF.create(self.model_path, "")
+            self._local.recognizer = recognizer
+        return recognizer
+
+    def _net(self):
+        net = getattr(self._local, "net", None)
+        if net is None:
+            net = cv2.dnn.readNet(self.model_path)
+            self._local.net = net
+        return net
+
+    def _grey_patch(self, face):
+        gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+        gray = cv2.resize(gray, (FALLBACK_INPUT_SIZE, FALLBACK_INPUT_SIZE))
+        gray = cv2.equalizeHist(gray)
+        vector = gray.astype(np.float32).reshape(-1)
+        return vector - vector.mean()
+
+    def crop(self, image, bbox):
+        """Crop a relative (xmin, ymin, width, height) box with a small margin."""
+        h, w = image.shape[:2]
+        xmin, ymin, width, height = bbox
+        margin_x, margin_y = width * 0.1, height * 0.1
+        x1 = max(0, int((xmin - margin_x) * w))
+        y1 = max(0, int((ymin - margin_y) * h))
+        x2 = min(w, int((xmin + width + margin_x) * w))
+        y2 = min(h, int((ymin + height + margin_y) * h))
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return image[y1:y2, x1:x2]
+
+    def embed_crop(self, face):
+        if self.use_model:
+            face = cv2.resize(face, (SFACE_INPUT_SIZE, SFACE_INPUT_SIZE))
+            vector = self._recognizer().feature(face).reshape(-1)
+        else:
+            vector = self._grey_patch(face)
+        vector = vector.astype(np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def embed_crops(self, faces):
+        """
+        Embed several face crops at once; returns an (n, dim) float32 matrix
+        of L2-normalised rows. With a model this is one batched forward pass
+        using the same preprocessing as FaceRecognizerSF.feature().
+        """
+        if self.use_model and self.batchable:
+            blob = cv2.dnn.blobFromImages(
+                faces, 1.0, (SFACE_INPUT_SIZE, SFACE_INPUT_SIZE), (0, 0, 0), swapRB=True, crop=False
+            )
+            net = self._net()
+            net.setInput(blob)
+            try:
+                vectors = net.forward().reshape(len(faces), -1)
+            except cv2.error:
+                self.batchable = False
+                return self.embed_crops(faces)
+        elif self.use_model:
+            vectors = np.stack([self._recognizer().feature(
+                cv2.resize(face, (SFACE_INPUT_SIZE, SFACE_INPUT_SIZE))
+            ).reshape(-1) for face in faces])
+        else:
+            vectors = np.stack([self._grey_patch(face) for face in faces])
+        vectors = vectors.astype(np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def embed(self, image, bbox):
+        face = self.crop(image, bbox)
+        if face is None:
+            return None
+        return self.embed_crop(face)
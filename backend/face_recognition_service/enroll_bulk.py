@@ -0,0 +1,413 @@
+"""
+Bulk enrolment: users from a CSV plus their photos from a directory or a
+.zip/.tar(.gz) archive.
+
+CSV columns: name, email, and optionally employee_id, status and photos
+(";"-separated file names). Without a photos column a user's photos are
+the files named <employee_id>.<ext> or <employee_id>_<anything>.<ext>.
+
+Photos are decoded, detected and embedded in a process pool (one detector
+per process). Faces are rejected when they fail the ENROLL_* quality
+checks (no face, several faces, low detection score, too small, blurry)
+or are closer than ENROLL_DUPLICATE_THRESHOLD to a template of a
+different person, whether already enrolled or earlier in the same run.
+Users and their accepted embeddings are written through the backend's
+POST /api/users/bulk in batches while the pool keeps working on the next
+photos. The backend is BACKEND_API_URL, as for the service itself.
+Progress goes to stderr and a summary with throughput at the end.
+
+Usage: python enroll_bulk.py users.csv photos/ --workers 8 --batch-size 500
+       python enroll_bulk.py users.csv photos.zip --dry-run --report report.jsonl
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import tarfile
+import time
+import zipfile
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+import inference
+from config import settings
+from embeddings import FaceEmbedder
+from gallery import fetch_gallery
+from preprocess import InvalidImageError, PreprocessOptions
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+class DirectorySource:
+    def __init__(self, path):
+        self.path = path
+
+    def names(self):
+        for root, _, files in os.walk(self.path):
+            for name in files:
+                yield os.path.relpath(os.path.join(root, name), self.path).replace(os.sep, "/")
+
+    def read(self, name):
+        with open(os.path.join(self.path, name), "rb") as f:
+            return f.read()
+
+
+class ZipSource:
+    def __init__(self, path):
+        self.archive = zipfile.ZipFile(path)
+
+    def names(self):
+        return (info.filename for info in self.archive.infolist() if not info.is_dir())
+
+    def read(self, name):
+        return self.archive.read(name)
+
+
+class TarSource:
+    def __init__(self, path):
+        self.archive = tarfile.open(path)
+        self.members = {member.name: member for member in self.archive.getmembers() if member.isfile()}
+
+    def names(self):
+        return iter(self.members)
+
+    def read(self, name):
+        return self.archive.extractfile(self.members[name]).read()
+
+
+def open_photos(path):
+    if os.path.isdir(path):
+        return DirectorySource(path)
+    if zipfile.is_zipfile(path):
+        return ZipSource(path)
+    if tarfile.is_tarfile(path):
+        return TarSource(path)
+    raise ValueError(f"{path} is not a directory, zip or tar archive")
+
+
+def read_users(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        rows = list(csv.DictReader(f))
+    missing = {"name", "email"} - set(rows[0] if rows else {})
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(sorted(missing))}")
+    return rows
+
+
+def assign_photos(users, source):
+    """Photo names per user, from the photos column or by employee id."""
+    images = [name for name in source.names() if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS]
+    by_basename = {os.path.basename(name): name for name in images}
+    by_employee_id = {}
+    for name in images:
+        stem = os.path.splitext(os.path.basename(name))[0]
+        by_employee_id.setdefault(stem.split("_", 1)[0], []).append(name)
+    assigned = []
+    for user in users:
+        listed = [p.strip() for p in (user.get("photos") or "").split(";") if p.strip()]
+        if listed:
+            assigned.append([by_basename.get(os.path.basename(p), p) for p in listed])
+        else:
+            assigned.append(sorted(by_employee_id.get((user.get("employee_id") or "").strip(), [])))
+    return assigned
+
+
+def parse_status(value):
+    return (value or "true").strip().lower() not in ("0", "false", "no", "inactive")
+
+
+def quality_problem(result):
+    """Why a photo cannot be enrolled, or None when it passes."""
+    detections = sorted(result["detections"], key=lambda d: d["score"], reverse=True)
+    if not detections or result["embedding"] is None:
+        return "no_face"
+    if len(detections) > 1 and detections[1]["score"] >= settings.ENROLL_MIN_FACE_SCORE:
+        return "multiple_faces"
+    if detections[0]["score"] < settings.ENROLL_MIN_FACE_SCORE:
+        return "low_score"
+    if result["face_size"] < settings.ENROLL_MIN_FACE_SIZE:
+        return "too_small"
+    if result["sharpness"] < settings.ENROLL_MIN_SHARPNESS:
+        return "blurry"
+    return None
+
+
+class DuplicateCheck:
+    """
+    Finds templates of a different person that are too similar to a new
+    face. Owners are user ids for the existing gallery and -(row + 1) for
+    faces accepted earlier in this run.
+    """
+
+    def __init__(self, threshold, owners=(), embeddings=None):
+        self.threshold = threshold
+        self._matrix = None
+        self._owners = None
+        self._count = 0
+        if len(owners):
+            self._extend(owners, embeddings)
+
+    def _extend(self, owners, embeddings):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        if self._matrix is None:
+            size = max(len(embeddings), 1024)
+            self._matrix = np.zeros((size, embeddings.shape[1]), dtype=np.float32)
+            self._owners = np.zeros(size, dtype=np.int64)
+        needed = self._count + len(embeddings)
+        if needed > len(self._matrix):
+            size = max(needed, len(self._matrix) * 2)
+            self._matrix = np.resize(self._matrix, (size, self._matrix.shape[1]))
+            self._owners = np.resize(self._owners, size)
+        self._matrix[self._count:needed] = embeddings
+        self._owners[self._count:needed] = owners
+        self._count = needed
+
+    def conflict(self, owner, embedding):
+        """Owner of the most similar template of someone else above the threshold, or None."""
+        if not self._count:
+            return None
+        embedding = np.asarray(embedding, dtype=np.float32)
+        scores = self._matrix[:self._count] @ (embedding / max(np.linalg.norm(embedding), 1e-12))
+        scores[self._owners[:self._count] == owner] = -1.0
+        best = int(np.argmax(scores))
+        return int(self._owners[best]) if scores[best] >= self.threshold else None
+
+    def add(self, owner, embedding):
+        self._extend([owner], [embedding])
+
+
+def bounded_map(pool, fn, jobs, window):
+    """
+    In-order pool.map over (key, args) jobs that keeps at most ``window`` in
+    flight, so photos are not all read into memory up front. Yields (key,
+    result), with the exception as the result when the job raised.
+    """
+    pending = deque()
+    for key, args in jobs:
+        pending.append((key, pool.submit(fn, *args)))
+        if len(pending) >= window:
+            key, future = pending.popleft()
+            yield key, future.exception() or future.result()
+    while pending:
+        key, future = pending.popleft()
+        yield key, future.exception() or future.result()
+
+
+class Progress:
+    def __init__(self, users, photos, interval):
+        self.users, self.photos, self.interval = users, photos, interval
+        self.started = time.perf_counter()
+        self._last = 0.0
+
+    def update(self, stats, force=False):
+        now = time.perf_counter()
+        if not force and now - self._last < self.interval:
+            return
+        self._last = now
+        elapsed = max(now - self.started, 1e-9)
+        print(
+            f"[{elapsed:7.1f}s] photos {stats['photos']}/{self.photos} "
+            f"({stats['photos'] / elapsed:.1f}/s), users {stats['users_done']}/{self.users}, "
+            f"faces accepted {stats['accepted']} rejected {stats['rejected']}, "
+            f"created {stats['created']} failed {stats['failed']}",
+            file=sys.stderr
+        )
+
+
+def post_batch(batch):
+    """
+    Send one batch of users and return (batch, per-user results). A failed
+    request fails the whole batch (the backend commits it atomically) but
+    not the run.
+    """
+    try:
+        response = requests.post(
+            f"{settings.BACKEND_API_URL}/api/users/bulk",
+            json=[user for _, user in batch],
+            timeout=120
+        )
+        response.raise_for_status()
+        return batch, response.json()["results"]
+    except requests.RequestException as e:
+        failure = {"success": False, "id": None, "embedding_ids": [], "detail": f"Backend error: {str(e)}"}
+        return batch, [failure] * len(batch)
+
+
+def enroll(args):
+    if not FaceEmbedder(settings.FACE_EMBEDDING_MODEL, settings.FACE_EMBEDDING_FALLBACK).identifies:
+        # Grey-patch templates would be useless for matching and make the duplicate check meaningless
+        raise SystemExit("Bulk enrolment needs FACE_EMBEDDING_MODEL (or FACE_EMBEDDING_FALLBACK=true for development)")
+    source = open_photos(args.photos)
+    users = read_users(args.csv)
+    photos = assign_photos(users, source)
+    total_photos = sum(len(names) for names in photos)
+
+    duplicates = DuplicateCheck(settings.ENROLL_DUPLICATE_THRESHOLD)
+    if not args.skip_gallery_check:
+        try:
+            user_ids, matrix, _, _ = fetch_gallery()
+            duplicates = DuplicateCheck(settings.ENROLL_DUPLICATE_THRESHOLD, user_ids, matrix)
+            print(f"Checking duplicates against {len(user_ids)} enrolled templates", file=sys.stderr)
+        except Exception as e:
+            print(f"Could not load the gallery ({str(e)}); only checking within this run", file=sys.stderr)
+
+    stats = Counter(photos=0, users_done=0, accepted=0, rejected=0, created=0, failed=0, embeddings=0)
+    reasons = Counter()
+    report = open(args.report, "w") if args.report else None
+    progress = Progress(len(users), total_photos, args.progress_interval)
+    options = PreprocessOptions(args.target_side)
+
+    def jobs():
+        for row, names in enumerate(photos):
+            for name in names:
+                try:
+                    contents = source.read(name)
+                except (KeyError, OSError):
+                    missing.add((row, name))
+                    contents = b""
+                yield (row, name), (contents, options)
+
+    def handle_results(batch, results):
+        for (row, user), result in zip(batch, results):
+            stats["created" if result["success"] else "failed"] += 1
+            stats["embeddings"] += len(result["embedding_ids"])
+            if report:
+                report.write(json.dumps({
+                    "row": row, "email": user["email"], "success": result["success"],
+                    "id": result["id"], "embedding_ids": result["embedding_ids"], "detail": result["detail"],
+                    "rejected_photos": rejected_photos.pop(row, []),
+                }) + "\n")
+
+    def flush(batch):
+        nonlocal post_future
+        if post_future is not None:
+            handle_results(*post_future.result())
+            post_future = None
+        if not batch:
+            return
+        if args.dry_run:
+            handle_results(batch, [
+                {"success": True, "id": None, "embedding_ids": [], "detail": "dry run"} for _ in batch
+            ])
+            return
+        post_future = poster.submit(post_batch, list(batch))
+
+    rejected_photos = {}
+    missing = set()
+    batch, current_row, current_faces = [], 0, []
+    post_future = None
+    extract_started = time.perf_counter()
+    pool = ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=inference.init_worker,
+        initargs=(1, settings.DETECTOR_MODEL_SELECTION, settings.DETECTOR_MIN_CONFIDENCE,
+                  settings.FACE_EMBEDDING_MODEL)
+    )
+    poster = ThreadPoolExecutor(max_workers=1)
+
+    def finish_row(row, faces):
+        if faces or not args.require_face:
+            user = users[row]
+            batch.append((row, {
+                "name": user["name"].strip(),
+                "email": user["email"].strip(),
+                "employee_id": (user.get("employee_id") or "").strip() or None,
+                "status": parse_status(user.get("status")),
+                "embeddings": faces,
+            }))
+        else:
+            stats["failed"] += 1
+            if report:
+                report.write(json.dumps({
+                    "row": row, "email": users[row]["email"], "success": False,
+                    "detail": "No acceptable face", "rejected_photos": rejected_photos.pop(row, []),
+                }) + "\n")
+        stats["users_done"] += 1
+        if len(batch) >= args.batch_size:
+            flush(batch)
+            batch.clear()
+
+    try:
+        for (row, name), result in bounded_map(pool, inference.enrollment_face, jobs(), args.workers * 4):
+            while current_row < row:
+                finish_row(current_row, current_faces)
+                current_row, current_faces = current_row + 1, []
+            stats["photos"] += 1
+            if (row, name) in missing:
+                problem = "missing_photo"
+            elif isinstance(result, InvalidImageError):
+                problem = "invalid_image"
+            elif isinstance(result, Exception):
+                problem = f"error: {str(result)}"
+            else:
+                problem = quality_problem(result)
+                if problem is None:
+                    owner = duplicates.conflict(-(row + 1), result["embedding"])
+                    if owner is not None:
+                        problem = f"duplicate of user {owner}" if owner > 0 else f"duplicate of CSV row {-owner - 1}"
+            if problem is None:
+                duplicates.add(-(row + 1), result["embedding"])
+                current_faces.append({"embedding": result["embedding"].tolist(), "photo_filename": name})
+                stats["accepted"] += 1
+            else:
+                stats["rejected"] += 1
+                reasons[problem.split(" of ")[0].split(":")[0]] += 1
+                rejected_photos.setdefault(row, []).append({"photo": name, "reason": problem})
+            progress.update(stats)
+        while current_row < len(users):
+            finish_row(current_row, current_faces)
+            current_row, current_faces = current_row + 1, []
+        extract_s = time.perf_counter() - extract_started
+        flush(batch)
+        flush([])
+    finally:
+        pool.shutdown(cancel_futures=True)
+        poster.shutdown()
+        if report:
+            report.close()
+
+    elapsed = time.perf_counter() - progress.started
+    progress.update(stats, force=True)
+    summary = {
+        "users": len(users),
+        "photos": total_photos,
+        "faces_accepted": stats["accepted"],
+        "faces_rejected": stats["rejected"],
+        "rejections": dict(reasons),
+        "users_created": stats["created"],
+        "users_failed": stats["failed"],
+        "embeddings_written": stats["embeddings"],
+        "workers": args.workers,
+        "seconds": round(elapsed, 2),
+        "photos_per_s": round(total_photos / extract_s, 1) if extract_s else 0.0,
+        "users_per_s": round(len(users) / elapsed, 1) if elapsed else 0.0,
+    }
+    print(json.dumps(summary, indent=2))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("csv", help="Users CSV (name, email[, employee_id, status, photos])")
+    parser.add_argument("photos", help="Directory, .zip or .tar(.gz) of photos")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--batch-size", type=int, default=500, help="Users per backend transaction (max 1000)")
+    parser.add_argument("--target-side", type=int, default=0,
+                        help="Decode photos at reduced resolution down to this long side (0 = full)")
+    parser.add_argument("--require-face", action="store_true", help="Skip users without an accepted face")
+    parser.add_argument("--skip-gallery-check", action="store_true",
+                        help="Do not load the enrolled gallery for duplicate checks")
+    parser.add_argument("--dry-run", action="store_true", help="Check photos without writing anything")
+    parser.add_argument("--report", help="Write one JSON line per user with the outcome")
+    parser.add_argument("--progress-interval", type=float, default=2.0)
+    args = parser.parse_args()
+    enroll(args)
+
+
+if __name__ == "__main__":
+    main()
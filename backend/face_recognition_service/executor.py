@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from inference import DeadlineExceededError
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class BoundedExecutor:
+    """
+    Thread or process pool with a bounded number of queued jobs.
+
+    At most ``workers + max_queue`` jobs are admitted at once; anything beyond
+    that is rejected immediately so the caller can shed load instead of
+    piling up requests that will miss their deadline anyway.
+    """
+
+    def __init__(self, mode="thread", workers=4, max_queue=16, initializer=None, initargs=()):
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._initializer = initializer
+        self._initargs = initargs
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._cancelled = 0
+        self._rejected = 0
+        self._deadline_exceeded = 0
+
+    def start(self):
+        if self.mode == "process":
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=self._initializer,
+                initargs=self._initargs
+            )
+        else:
+            # Thread workers share the detector pool built in this process
+            if self._initializer is not None:
+                self._initializer(*self._initargs)
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="inference"
+            )
+        logger.info(
+            f"Inference executor ready: mode={self.mode} workers={self.workers} queue={self.max_queue}"
+        )
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def _release(self, future):
+        self._slots.release()
+        with self._lock:
+            self._in_flight -= 1
+            # Jobs cancelled while queued or never submitted did not run
+            if future is None or future.cancelled():
+                self._cancelled += 1
+            else:
+                self._completed += 1
+
+    async def run(self, fn, *args, timeout):
+        """
+        Run ``fn(*args, deadline)`` on the pool and await the result.
+        Raises QueueFullError when no slot is free and DeadlineExceededError
+        when the job does not finish within ``timeout`` seconds.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise QueueFullError("Inference queue is full")
+        with self._lock:
+            self._in_flight += 1
+        deadline = time.time() + timeout
+        try:
+            future = self._executor.submit(fn, *args, deadline)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except (asyncio.TimeoutError, DeadlineExceededError):
+            future.cancel()
+            with self._lock:
+                self._deadline_exceeded += 1
+            raise DeadlineExceededError("Request deadline exceeded")
+
+    def stats(self):
+        with self._lock:
+            in_flight = self._in_flight
+            return {
+                "mode": self.mode,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": in_flight,
+                "queued": max(0, in_flight - self.workers),
+                "completed": self._completed,
+                "cancelled": self._cancelled,
+                "rejected": self._rejected,
+                "deadline_exceeded": self._deadline_exceeded,
+            }
@@ -0,0 +1,166 @@
+import logging
+import struct
+import threading
+import time
+
+import numpy as np
+import requests
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Must match embedding_codec.GALLERY_HEADER in the backend
+GALLERY_MAGIC = b"FGAL"
+GALLERY_VERSION = 1
+GALLERY_HEADER = struct.Struct("<4sBIIQ")
+
+
+def unpack_gallery(payload):
+    """
+    Decode the backend's binary gallery frame without copying rows.
+    Returns (embedding_ids, user_ids, matrix, watermark).
+    """
+    magic, version, dim, count, watermark = GALLERY_HEADER.unpack_from(payload)
+    if magic != GALLERY_MAGIC or version != GALLERY_VERSION:
+        raise ValueError("Unrecognised gallery payload")
+    offset = GALLERY_HEADER.size
+    embedding_ids = np.frombuffer(payload, dtype="<i8", count=count, offset=offset)
+    offset += 8 * count
+    user_ids = np.frombuffer(payload, dtype="<i8", count=count, offset=offset)
+    offset += 8 * count
+    matrix = np.frombuffer(payload, dtype="<f4", count=count * dim, offset=offset).reshape(count, dim)
+    return embedding_ids, user_ids, matrix, watermark
+
+
+def fetch_gallery():
+    """
+    Download the enrolled templates of active users from the backend.
+    Returns (user_ids, embeddings, embedding_ids, watermark).
+    """
+    response = requests.get(
+        f"{settings.BACKEND_API_URL}/api/face-embeddings/gallery",
+        params={"active_only": True},
+        timeout=settings.GALLERY_LOAD_TIMEOUT
+    )
+    response.raise_for_status()
+    embedding_ids, user_ids, matrix, watermark = unpack_gallery(response.content)
+    return user_ids, matrix, embedding_ids.tolist(), watermark
+
+
+def load_gallery(matcher):
+    try:
+        user_ids, embeddings, embedding_ids, watermark = fetch_gallery()
+    except Exception as e:
+        logger.warning(f"Could not load gallery from backend: {str(e)}")
+        return False
+    matcher.load(user_ids, embeddings, embedding_ids, watermark)
+    logger.info(f"Gallery loaded: {matcher.stats()}")
+    return True
+
+
+def apply_change(matcher, change):
+    action = change["action"]
+    if action == "add":
+        for row in change["embeddings"]:
+            matcher.add(row["user_id"], row["embedding"], row["id"])
+    elif action == "remove":
+        matcher.remove_embedding(change["embedding_id"])
+    elif action == "deactivate":
+        matcher.deactivate(change["user_id"])
+    elif action == "activate":
+        matcher.activate(
+            change["user_id"],
+            [(row["id"], row["embedding"]) for row in change["embeddings"]]
+        )
+    else:
+        logger.warning(f"Unknown gallery change action: {action}")
+
+
+class GallerySync:
+    """
+    Background thread that tails the backend gallery change feed and applies
+    each change to the matcher incrementally, compacting tombstones when
+    enough have accumulated or the compaction interval has passed.
+
+    With an EdgeStore every change is also stored before it is applied, so
+    a restart without the backend replays them on top of the last snapshot;
+    each snapshot written makes the changes it contains redundant.
+    """
+
+    def __init__(self, matcher, interval=0.5, max_tombstones=256, compact_interval=300.0, store=None):
+        self.matcher = matcher
+        self.store = store
+        self.interval = interval
+        self.max_tombstones = max_tombstones
+        self.compact_interval = compact_interval
+        self.applied = 0
+        self.errors = 0
+        self.last_sync = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="gallery-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def poll(self):
+        """Fetch and apply one page of changes. Returns the number applied."""
+        response = requests.get(
+            f"{settings.BACKEND_API_URL}/api/face-embeddings/changes",
+            params={"since": self.matcher.watermark},
+            timeout=settings.GALLERY_LOAD_TIMEOUT
+        )
+        response.raise_for_status()
+        data = response.json()
+        if self.store is not None:
+            self.store.append_gallery_changes(data["changes"])
+        for change in data["changes"]:
+            apply_change(self.matcher, change)
+            self.matcher.watermark = change["id"]
+        self.applied += len(data["changes"])
+        self.last_sync = time.time()
+        return len(data["changes"])
+
+    def replay_stored(self):
+        """Apply stored changes newer than the matcher's watermark; returns how many."""
+        changes = self.store.gallery_changes(self.matcher.watermark)
+        for change in changes:
+            apply_change(self.matcher, change)
+            self.matcher.watermark = change["id"]
+        if changes:
+            logger.info(f"Replayed {len(changes)} stored gallery changes up to watermark {self.matcher.watermark}")
+        return len(changes)
+
+    def save(self):
+        watermark = self.matcher.save()
+        if watermark is not None and self.store is not None:
+            self.store.truncate_gallery_changes(watermark)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                # Drain the backlog before sleeping again
+                while self.poll():
+                    pass
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Gallery sync failed: {str(e)}")
+            if self.matcher.compaction_due(self.max_tombstones, self.compact_interval):
+                self.matcher.compact()
+                self.save()
+            self._stop.wait(self.interval)
+
+    def stats(self):
+        return {
+            "interval_s": self.interval,
+            "applied": self.applied,
+            "errors": self.errors,
+            "last_sync": self.last_sync,
+        }
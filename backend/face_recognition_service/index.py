@@ -0,0 +1,402 @@
+import logging
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMPTY_LABELS = np.empty(0, dtype=np.int64)
+
+
+def normalize_rows(matrix):
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def default_row_ids(row_ids, count):
+    if row_ids is None:
+        return np.full(count, -1, dtype=np.int64)
+    return np.asarray(row_ids, dtype=np.int64)
+
+
+def make_block(vectors, labels, row_ids):
+    """
+    (vectors, labels, row_ids) triple. Blocks are immutable and replaced as a
+    whole, so a search running concurrently with add/remove always sees
+    vectors and labels that belong together.
+    """
+    return (
+        np.ascontiguousarray(vectors, dtype=np.float32),
+        np.asarray(labels, dtype=np.int64),
+        np.asarray(row_ids, dtype=np.int64),
+    )
+
+
+EMPTY_BLOCK = make_block(np.empty((0, 0)), EMPTY_LABELS, EMPTY_LABELS)
+
+
+class BlockAppender:
+    """
+    Appends rows to a block with geometric spare capacity, so n adds copy
+    O(n) rows in total instead of re-stacking the whole block each time.
+
+    The block returned is a view of the filled rows of a larger buffer. An
+    append only writes past every view already handed out, so a search
+    holding an older block never sees it change. A block that did not come
+    from this appender (rebuilt, filtered or memory-mapped) is copied into
+    a fresh buffer on its first append.
+    """
+
+    def __init__(self, min_capacity=64):
+        self.min_capacity = min_capacity
+        self._block = None
+        self._buffers = None
+
+    def append(self, block, vector, label, row_id):
+        size = block[1].shape[0]
+        vectors, labels, row_ids = self._buffers if block is self._block else (None, None, None)
+        if vectors is None or vectors.shape[0] == size:
+            capacity = max(self.min_capacity, 2 * size)
+            vectors = np.empty((capacity, vector.shape[0]), dtype=np.float32)
+            labels = np.empty(capacity, dtype=np.int64)
+            row_ids = np.empty(capacity, dtype=np.int64)
+            if size:
+                vectors[:size], labels[:size], row_ids[:size] = block
+            self._buffers = (vectors, labels, row_ids)
+        vectors[size], labels[size], row_ids[size] = vector, label, row_id
+        self._block = (vectors[:size + 1], labels[:size + 1], row_ids[:size + 1])
+        return self._block
+
+
+def concat_blocks(blocks):
+    """One block holding the rows of ``blocks``, in order."""
+    blocks = [block for block in blocks if block[1].shape[0]]
+    if not blocks:
+        return EMPTY_BLOCK
+    return make_block(
+        np.vstack([b[0] for b in blocks]),
+        np.concatenate([b[1] for b in blocks]),
+        np.concatenate([b[2] for b in blocks]),
+    )
+
+
+def filter_block(block, labels, row_ids):
+    """Returns (block without matching rows, number of rows removed)."""
+    vectors, block_labels, block_row_ids = block
+    keep = ~(np.isin(block_labels, labels) | np.isin(block_row_ids, row_ids))
+    removed = int(keep.shape[0] - keep.sum())
+    if not removed:
+        return block, 0
+    return make_block(vectors[keep], block_labels[keep], block_row_ids[keep]), removed
+
+
+def search_block(block, query):
+    vectors, labels, row_ids = block
+    if not labels.shape[0]:
+        return None, -np.inf, -1
+    scores = vectors @ query
+    best = int(np.argmax(scores))
+    return int(labels[best]), float(scores[best]), int(row_ids[best])
+
+
+def empty_many(count):
+    return (
+        np.full(count, -1, dtype=np.int64),
+        np.full(count, -np.inf, dtype=np.float32),
+        np.full(count, -1, dtype=np.int64),
+    )
+
+
+def search_block_many(block, queries):
+    """Best row per query as (labels, scores, row_ids) arrays; scores are -inf for an empty block."""
+    vectors, labels, row_ids = block
+    if not labels.shape[0]:
+        return empty_many(queries.shape[0])
+    scores = queries @ vectors.T
+    best = np.argmax(scores, axis=1)
+    return labels[best], scores[np.arange(best.shape[0]), best], row_ids[best]
+
+
+def merge_best(best, found):
+    """Keep, per query, whichever of two (labels, scores, row_ids) results scores higher."""
+    better = found[1] > best[1]
+    return tuple(np.where(better, new, old) for old, new in zip(best, found))
+
+
+def unpack_many(best):
+    """Convert batched results to the (label, score, row_id) tuples search() returns."""
+    return [
+        (None, 0.0, -1) if not np.isfinite(score) else (int(label), float(score), int(row_id))
+        for label, score, row_id in zip(*best)
+    ]
+
+
+class ExactIndex:
+    """
+    Brute-force cosine search. Rows must already be L2-normalised.
+
+    Rows live in a large base block (possibly a read-only memory map of a
+    snapshot) plus a small delta block that takes incremental adds, so an
+    add never copies the whole gallery. The delta grows with spare capacity
+    and is folded into the base once it reaches ``merge_fraction`` of it
+    (and at least ``merge_min`` rows), or when a removal rewrites the base
+    anyway, which keeps adds amortised O(1) copies per row.
+    """
+
+    kind = "exact"
+
+    def __init__(self, merge_min=4096, merge_fraction=0.125):
+        self.blocks = (EMPTY_BLOCK, EMPTY_BLOCK)
+        self.merge_min = merge_min
+        self.merge_fraction = merge_fraction
+        self._appender = BlockAppender()
+
+    def __len__(self):
+        return int(sum(block[1].shape[0] for block in self.blocks))
+
+    @property
+    def dim(self):
+        for vectors, _, _ in self.blocks:
+            if vectors.size:
+                return int(vectors.shape[1])
+        return 0
+
+    def build(self, vectors, labels, row_ids=None):
+        labels = np.asarray(labels, dtype=np.int64)
+        base = make_block(vectors, labels, default_row_ids(row_ids, labels.shape[0]))
+        self.blocks = (base, EMPTY_BLOCK)
+        return self
+
+    def add(self, vector, label, row_id=-1):
+        base, delta = self.blocks
+        delta = self._appender.append(delta, vector, label, row_id)
+        if delta[1].shape[0] >= max(self.merge_min, base[1].shape[0] * self.merge_fraction):
+            self.blocks = (concat_blocks([base, delta]), EMPTY_BLOCK)
+        else:
+            self.blocks = (base, delta)
+
+    def remove(self, labels=(), row_ids=()):
+        """Physically drop rows by label or row id; returns the number removed."""
+        labels, row_ids = list(labels), list(row_ids)
+        base, delta = self.blocks
+        base, removed_base = filter_block(base, labels, row_ids)
+        delta, removed_delta = filter_block(delta, labels, row_ids)
+        if removed_base and delta[1].shape[0]:
+            # The base was copied anyway; fold the delta in with it
+            self.blocks = (concat_blocks([base, delta]), EMPTY_BLOCK)
+        else:
+            self.blocks = (base, delta)
+        return removed_base + removed_delta
+
+    def search(self, query):
+        """Returns (label, score, row_id) of the best row, or (None, 0.0, -1) when empty."""
+        best = (None, -np.inf, -1)
+        for block in self.blocks:
+            found = search_block(block, query)
+            if found[0] is not None and found[1] > best[1]:
+                best = found
+        if best[0] is None:
+            return None, 0.0, -1
+        return best
+
+    def search_many(self, queries):
+        """search() for a (n, dim) matrix of queries using one GEMM per block."""
+        best = empty_many(queries.shape[0])
+        for block in self.blocks:
+            best = merge_best(best, search_block_many(block, queries))
+        return unpack_many(best)
+
+    def needs_training(self):
+        return False
+
+    def state(self):
+        vectors, labels, row_ids = concat_blocks(self.blocks)
+        return {"vectors": vectors, "labels": labels, "row_ids": row_ids}
+
+    def restore(self, state):
+        labels = np.asarray(state["labels"], dtype=np.int64)
+        return self.build(state["vectors"], labels, state.get("row_ids"))
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate index.
+
+    Templates are clustered with spherical k-means; a query is scored only
+    against the ``nprobe`` closest clusters. Each cluster keeps its rows in
+    its own contiguous block so probing stays a handful of small GEMVs.
+
+    The number of lists is ``nlist`` (sqrt of the size when 0), capped so
+    each list gets at least ``min_rows_per_list`` rows. An index started
+    empty or small has fewer lists than it should once it grows;
+    needs_training() reports when the target has doubled past the trained
+    count, and retrained() returns a rebuilt copy to swap in.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, nlist=0, nprobe=8, train_iterations=10, seed=0, min_rows_per_list=32):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_iterations = train_iterations
+        self.seed = seed
+        self.min_rows_per_list = min_rows_per_list
+        self.centroids = np.empty((0, 0), dtype=np.float32)
+        self.lists = []
+        self._appenders = {}
+
+    def __len__(self):
+        return int(sum(block[1].shape[0] for block in self.lists))
+
+    @property
+    def dim(self):
+        return int(self.centroids.shape[1]) if self.centroids.size else 0
+
+    def _target_lists(self, count):
+        nlist = self.nlist or int(np.sqrt(count))
+        return max(1, min(nlist, count // self.min_rows_per_list))
+
+    def needs_training(self):
+        # Doubling hysteresis keeps retraining to O(log nlist) rebuilds
+        return self._target_lists(len(self)) >= 2 * max(1, self.centroids.shape[0])
+
+    def retrained(self):
+        """A new index with the same options and rows and freshly trained centroids."""
+        state = self.state()
+        index = IVFIndex(self.nlist, self.nprobe, self.train_iterations, self.seed, self.min_rows_per_list)
+        return index.build(state["vectors"], state["labels"], state["row_ids"])
+
+    def _train(self, vectors):
+        rng = np.random.default_rng(self.seed)
+        nlist = self._target_lists(vectors.shape[0])
+        # Train on a sample; assignment quality barely changes past ~256/list
+        sample_size = min(vectors.shape[0], nlist * 256)
+        sample = vectors[rng.choice(vectors.shape[0], sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(self.train_iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assign == c]
+                if members.shape[0]:
+                    centroids[c] = members.sum(axis=0)
+            centroids = normalize_rows(centroids)
+        return centroids
+
+    def build(self, vectors, labels, row_ids=None, centroids=None):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        labels = np.asarray(labels, dtype=np.int64)
+        row_ids = default_row_ids(row_ids, labels.shape[0])
+        if not vectors.shape[0]:
+            self.centroids = np.empty((0, 0), dtype=np.float32)
+            self.lists = []
+            return self
+        started = time.perf_counter()
+        centroids = centroids if centroids is not None else self._train(vectors)
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(centroids.shape[0] + 1))
+        lists = []
+        for c in range(centroids.shape[0]):
+            rows = order[bounds[c]:bounds[c + 1]]
+            lists.append(make_block(vectors[rows], labels[rows], row_ids[rows]))
+        self.lists = lists
+        self.centroids = centroids
+        self._appenders = {}
+        logger.info(
+            f"IVF index built: {vectors.shape[0]} vectors, {centroids.shape[0]} lists "
+            f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        return self
+
+    def add(self, vector, label, row_id=-1):
+        if not self.centroids.size:
+            # Nothing to assign against yet; start with a single list
+            self.lists = [make_block(vector.reshape(1, -1), [label], [row_id])]
+            self.centroids = vector.reshape(1, -1).copy()
+            return
+        c = int(np.argmax(self.centroids @ vector))
+        appender = self._appenders.setdefault(c, BlockAppender(min_capacity=16))
+        self.lists[c] = appender.append(self.lists[c], vector, label, row_id)
+
+    def remove(self, labels=(), row_ids=()):
+        """Drop rows by label or row id list by list; centroids are kept."""
+        labels, row_ids = list(labels), list(row_ids)
+        removed = 0
+        for c in range(len(self.lists)):
+            self.lists[c], dropped = filter_block(self.lists[c], labels, row_ids)
+            removed += dropped
+        return removed
+
+    def search(self, query):
+        centroids, lists = self.centroids, self.lists
+        if not centroids.size:
+            return None, 0.0, -1
+        nprobe = min(self.nprobe, centroids.shape[0])
+        probes = np.argpartition(-(centroids @ query), nprobe - 1)[:nprobe]
+        best = (None, -np.inf, -1)
+        for c in probes:
+            found = search_block(lists[c], query)
+            if found[0] is not None and found[1] > best[1]:
+                best = found
+        if best[0] is None:
+            return None, 0.0, -1
+        return best
+
+    def search_many(self, queries):
+        """
+        search() for a (n, dim) matrix of queries. Queries are grouped by
+        probed list so each list is scored once with a single GEMM.
+        """
+        centroids, lists = self.centroids, self.lists
+        if not centroids.size:
+            return [(None, 0.0, -1)] * queries.shape[0]
+        nprobe = min(self.nprobe, centroids.shape[0])
+        probes = np.argpartition(-(queries @ centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        best = empty_many(queries.shape[0])
+        for c in np.unique(probes):
+            members = np.nonzero((probes == c).any(axis=1))[0]
+            found = search_block_many(lists[c], queries[members])
+            current = tuple(values[members] for values in best)
+            merged = merge_best(current, found)
+            for values, update in zip(best, merged):
+                values[members] = update
+        return unpack_many(best)
+
+    def state(self):
+        dim = self.dim
+        return {
+            "centroids": self.centroids,
+            "list_sizes": np.array([block[1].shape[0] for block in self.lists], dtype=np.int64),
+            "vectors": np.vstack([b[0] for b in self.lists]) if self.lists else np.empty((0, dim), dtype=np.float32),
+            "labels": np.concatenate([b[1] for b in self.lists]) if self.lists else EMPTY_LABELS,
+            "row_ids": np.concatenate([b[2] for b in self.lists]) if self.lists else EMPTY_LABELS,
+        }
+
+    def restore(self, state):
+        offsets = np.concatenate([[0], np.cumsum(state["list_sizes"])]).astype(np.int64)
+        vectors = np.asarray(state["vectors"], dtype=np.float32)
+        labels = np.asarray(state["labels"], dtype=np.int64)
+        row_ids = default_row_ids(state.get("row_ids"), labels.shape[0])
+        self.lists = [
+            make_block(vectors[a:b], labels[a:b], row_ids[a:b])
+            for a, b in zip(offsets[:-1], offsets[1:])
+        ]
+        self.centroids = np.ascontiguousarray(state["centroids"], dtype=np.float32)
+        self._appenders = {}
+        return self
+
+
+INDEX_BACKENDS = {
+    ExactIndex.kind: ExactIndex,
+    IVFIndex.kind: IVFIndex,
+}
+
+
+def create_index(kind, **options):
+    if kind not in INDEX_BACKENDS:
+        raise ValueError(f"Unknown index backend: {kind}")
+    if kind == IVFIndex.kind:
+        return IVFIndex(**options)
+    return ExactIndex()
@@ -0,0 +1,190 @@
+import time
+
+import cv2
+
+from detector_pool import DetectorPool
+from embeddings import FaceEmbedder
+from preprocess import InvalidImageError, decode, prepare_frame, prepare_upload
+
+# Detector pool owned by the current process. In thread mode the service
+# process holds one instance per worker thread; in process mode every worker
+# process builds its own single-instance pool through init_worker().
+_detector_pool = None
+_embedder = None
+
+
+class DeadlineExceededError(Exception):
+    pass
+
+
+def init_worker(pool_size, model_selection, min_detection_confidence, embedding_model=""):
+    global _detector_pool, _embedder
+    _embedder = FaceEmbedder(embedding_model)
+    _detector_pool = DetectorPool(
+        pool_size,
+        model_selection=model_selection,
+        min_detection_confidence=min_detection_confidence
+    )
+    _detector_pool.start()
+    return _detector_pool
+
+
+def get_detector_pool():
+    return _detector_pool
+
+
+def close_worker():
+    global _detector_pool
+    if _detector_pool is not None:
+        _detector_pool.close()
+        _detector_pool = None
+
+
+def decode_image(contents):
+    return decode(contents)
+
+
+def detect(image, acquire_timeout=None):
+    """
+    Run face detection on a BGR image.
+    Returns plain dicts (picklable) with the score and relative bounding box.
+    """
+    results = _detector_pool.process(
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB),
+        timeout=acquire_timeout
+    )
+    detections = []
+    for detection in results.detections or []:
+        bbox = detection.location_data.relative_bounding_box
+        detections.append({
+            "score": float(detection.score[0]),
+            "bbox": (bbox.xmin, bbox.ymin, bbox.width, bbox.height)
+        })
+    return detections
+
+
+def detect_prepared(prepared, acquire_timeout):
+    """Detect on the reduced/ROI image; bboxes come back relative to the whole frame."""
+    detections = detect(prepared.detect_image, acquire_timeout=acquire_timeout)
+    for detection in detections:
+        detection["bbox"] = prepared.frame_bbox(detection["bbox"])
+    return detections
+
+
+def check_deadline(deadline):
+    if time.time() > deadline:
+        raise DeadlineExceededError("Request deadline exceeded while queued")
+
+
+def detection_result(prepared, acquire_timeout, face, timings):
+    """
+    Detection plus, for the highest scoring face, either its embedding
+    (face="embedding") or its crop (face="crop") so the caller can batch
+    or skip the embedding. The crop is taken at full resolution only when
+    the reduced image is too small for the embedder. Per-stage seconds are
+    added to ``timings`` and returned as "timings".
+    """
+    started = time.perf_counter()
+    detections = detect_prepared(prepared, acquire_timeout)
+    timings["detect"] = time.perf_counter() - started
+    result = {
+        "width": prepared.width,
+        "height": prepared.height,
+        "detections": detections,
+        "timings": timings,
+    }
+    if face is None:
+        return result
+    started = time.perf_counter()
+    crop = None
+    if detections:
+        best = max(detections, key=lambda d: d["score"])
+        crop = prepared.face_crop(_embedder, best["bbox"])
+    timings["crop"] = time.perf_counter() - started
+    if face == "embedding":
+        started = time.perf_counter()
+        result["embedding"] = _embedder.embed_crop(crop) if crop is not None else None
+        timings["embed"] = time.perf_counter() - started
+    else:
+        # Copy so the full frame is not kept alive (or pickled) with the crop
+        result["crop"] = crop.copy() if crop is not None else None
+    return result
+
+
+def timed_upload(contents, options):
+    started = time.perf_counter()
+    prepared = prepare_upload(contents, options)
+    return prepared, {"decode": time.perf_counter() - started}
+
+
+def timed_frame(frame, options):
+    started = time.perf_counter()
+    prepared = prepare_frame(frame, options)
+    return prepared, {"preprocess": time.perf_counter() - started}
+
+
+def decode_and_detect(contents, acquire_timeout, options, deadline):
+    """
+    Executor entry point: decode the upload and run detection.
+    Work that has been queued past its deadline is dropped without decoding.
+    """
+    check_deadline(deadline)
+    prepared, timings = timed_upload(contents, options)
+    return detection_result(prepared, acquire_timeout, None, timings)
+
+
+def decode_detect_embed(contents, acquire_timeout, options, deadline):
+    """
+    Executor entry point for recognition: like decode_and_detect, plus the
+    embedding of the highest scoring face (None when no face was found).
+    """
+    check_deadline(deadline)
+    prepared, timings = timed_upload(contents, options)
+    return detection_result(prepared, acquire_timeout, "embedding", timings)
+
+
+def decode_detect_crop(contents, acquire_timeout, options, deadline):
+    """Like decode_detect_embed, but returns the best face crop ("crop") instead."""
+    check_deadline(deadline)
+    prepared, timings = timed_upload(contents, options)
+    return detection_result(prepared, acquire_timeout, "crop", timings)
+
+
+def detect_and_embed(frame, acquire_timeout, options, deadline):
+    """decode_detect_embed for already decoded frames (camera streams)."""
+    check_deadline(deadline)
+    prepared, timings = timed_frame(frame, options)
+    return detection_result(prepared, acquire_timeout, "embedding", timings)
+
+
+def detect_and_crop(frame, acquire_timeout, options, deadline):
+    """decode_detect_crop for already decoded frames (camera streams)."""
+    check_deadline(deadline)
+    prepared, timings = timed_frame(frame, options)
+    return detection_result(prepared, acquire_timeout, "crop", timings)
+
+
+def enrollment_face(contents, options):
+    """
+    Process-pool entry point for bulk enrolment: detection on the photo plus,
+    for the best face, its embedding and what the quality checks need, i.e.
+    the crop's shorter side in pixels and its sharpness (variance of the
+    Laplacian).
+    """
+    prepared, timings = timed_upload(contents, options)
+    result = detection_result(prepared, None, "crop", timings)
+    crop = result.pop("crop")
+    result["face_size"] = 0
+    result["sharpness"] = 0.0
+    result["embedding"] = None
+    if crop is not None:
+        result["face_size"] = min(crop.shape[:2])
+        result["sharpness"] = float(cv2.Laplacian(cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY), cv2.CV_64F).var())
+        result["embedding"] = _embedder.embed_crop(crop)
+    return result
+
+
+def embed_face(crop, deadline):
+    """Executor entry point: embedding of a face crop returned by detect_and_crop."""
+    check_deadline(deadline)
+    return _embedder.embed_crop(crop)
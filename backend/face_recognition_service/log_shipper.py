@@ -0,0 +1,265 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+import httpx
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class AccessLogShipper:
+    """
+    Ships access events to the backend off the request path.
+
+    Events are queued in memory and flushed by a background task in batches
+    (whichever comes first of ``batch_size`` events or ``flush_interval``
+    seconds) over one pooled keep-alive HTTP client. Failed batches are
+    retried with backoff and then appended to a bounded on-disk spool that
+    is replayed once the backend accepts events again.
+    """
+
+    def __init__(self, backend_url, batch_size=50, flush_interval=0.5, max_queue=10000,
+                 max_retries=3, timeout=5.0, spool_path="", spool_max_bytes=50 * 1024 * 1024):
+        self.backend_url = backend_url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.spool_path = spool_path
+        self.spool_max_bytes = spool_max_bytes
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._client = None
+        self._task = None
+        self._stopping = False
+        self.sent = 0
+        self.rejected = 0
+        self.spooled = 0
+        self.dropped = 0
+        self.replayed = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._flush_total_ms = 0.0
+
+    async def start(self):
+        self._client = httpx.AsyncClient(
+            base_url=self.backend_url,
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4)
+        )
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stopping = True
+        if self._task is not None:
+            await self._task
+        if self._client is not None:
+            await self._client.aclose()
+
+    def submit(self, event):
+        """Queue an event without blocking; spools to disk when the queue is full."""
+        event.setdefault("timestamp", datetime.utcnow().isoformat())
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self._spool([event])
+
+    async def _next_batch(self):
+        batch = []
+        try:
+            batch.append(await asyncio.wait_for(self._queue.get(), timeout=self.flush_interval))
+        except asyncio.TimeoutError:
+            return batch
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while not (self._stopping and self._queue.empty()):
+            batch = await self._next_batch()
+            if batch:
+                delivered = await self._flush(batch)
+                if delivered and self.spool_path and os.path.exists(self.spool_path):
+                    await self._replay_spool()
+
+    async def _post(self, batch):
+        """Send one batch to the bulk endpoint; returns events that still need delivery."""
+        try:
+            with metrics.span("backend_post"):
+                response = await self._client.post("/api/access-logs/bulk", json=batch)
+        except httpx.HTTPError:
+            return batch
+        if response.status_code >= 500:
+            return batch
+        if response.status_code >= 400:
+            self.rejected += len(batch)
+            logger.warning(f"Backend rejected access log batch: {response.status_code} {response.text}")
+            return []
+        result = response.json()
+        self.sent += result["created"]
+        if result["failed"]:
+            # Unknown door/user etc.; retrying will not help
+            self.rejected += result["failed"]
+            details = {item["detail"] for item in result["results"] if not item["success"]}
+            logger.warning(f"Backend rejected {result['failed']} access logs: {', '.join(sorted(details))}")
+        return []
+
+    async def _flush(self, batch):
+        started = time.perf_counter()
+        pending = batch
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(min(0.2 * 2 ** attempt, 5.0))
+            pending = await self._post(pending)
+            if not pending:
+                break
+        if pending:
+            logger.warning(f"Backend unavailable, spooling {len(pending)} access logs")
+            self._spool(pending)
+        elapsed = (time.perf_counter() - started) * 1000
+        self.flushes += 1
+        self.last_flush_ms = elapsed
+        self.max_flush_ms = max(self.max_flush_ms, elapsed)
+        self._flush_total_ms += elapsed
+        return not pending
+
+    def _spool(self, events):
+        if not self.spool_path:
+            self.dropped += len(events)
+            return
+        size = os.path.getsize(self.spool_path) if os.path.exists(self.spool_path) else 0
+        lines = [json.dumps(event) + "\n" for event in events]
+        written = 0
+        with open(self.spool_path, "a") as f:
+            for line in lines:
+                if size + len(line) > self.spool_max_bytes:
+                    break
+                f.write(line)
+                size += len(line)
+                written += 1
+        self.spooled += written
+        self.dropped += len(events) - written
+        if written < len(events):
+            logger.error(f"Access log spool full, dropped {len(events) - written} events")
+
+    async def _replay_spool(self):
+        replay_path = f"{self.spool_path}.replay"
+        os.replace(self.spool_path, replay_path)
+        with open(replay_path) as f:
+            events = [json.loads(line) for line in f if line.strip()]
+        os.remove(replay_path)
+        logger.info(f"Replaying {len(events)} spooled access logs")
+        for i in range(0, len(events), self.batch_size):
+            batch = events[i:i + self.batch_size]
+            if not await self._flush(batch):
+                # Backend went away again; keep the rest for the next replay
+                self._spool(events[i + self.batch_size:])
+                break
+            self.replayed += len(batch)
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "sent": self.sent,
+            "rejected": self.rejected,
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "dropped": self.dropped,
+            "spool_bytes": os.path.getsize(self.spool_path) if self.spool_path and os.path.exists(self.spool_path) else 0,
+            "flushes": self.flushes,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "avg_flush_ms": round(self._flush_total_ms / self.flushes, 2) if self.flushes else 0.0,
+            "max_flush_ms": round(self.max_flush_ms, 2),
+        }
+
+
+class JournalShipper(AccessLogShipper):
+    """
+    Edge mode shipper: events go to the local EdgeStore journal before the
+    decision returns and are uploaded from there in order, advancing the
+    journal's upload watermark after each accepted batch. While the backend
+    is away the journal simply grows, so there is no spool and no drop.
+
+    An upload the backend accepted but the process did not live to mark is
+    sent again after a restart; that window is one batch wide.
+    """
+
+    def __init__(self, backend_url, store, batch_size=50, flush_interval=0.5, timeout=5.0,
+                 retention_hours=24.0, max_backoff=30.0):
+        super().__init__(backend_url, batch_size=batch_size, flush_interval=flush_interval, timeout=timeout)
+        self.store = store
+        self.retention_hours = retention_hours
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.pruned = 0
+        self._wakeup = asyncio.Event()
+
+    def submit(self, event):
+        event.setdefault("timestamp", datetime.utcnow().isoformat())
+        self.store.append_event(event)
+        self._wakeup.set()
+
+    async def _run(self):
+        backoff = 0.0
+        next_prune = 0.0
+        backlog = False
+        while True:
+            if backoff:
+                await asyncio.sleep(backoff)
+            elif not (self._stopping or backlog):
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            pending = self.store.pending_events(self.batch_size)
+            # A full batch means more is waiting, e.g. after an outage: keep going
+            backlog = len(pending) == self.batch_size
+            if not pending:
+                if self._stopping:
+                    break
+                backoff = 0.0
+            else:
+                started = time.perf_counter()
+                if await self._post([event for _, event in pending]):
+                    self.failures += 1
+                    backoff = min(max(backoff * 2, 0.5), self.max_backoff)
+                    if self._stopping:
+                        # Left in the journal for the next start
+                        break
+                else:
+                    self.store.mark_uploaded(pending[-1][0])
+                    backoff = 0.0
+                elapsed = (time.perf_counter() - started) * 1000
+                self.flushes += 1
+                self.last_flush_ms = elapsed
+                self.max_flush_ms = max(self.max_flush_ms, elapsed)
+                self._flush_total_ms += elapsed
+            if time.monotonic() >= next_prune:
+                self.pruned += self.store.prune_journal(time.time() - self.retention_hours * 3600)
+                next_prune = time.monotonic() + 60
+
+    def stats(self):
+        return {
+            **self.store.stats(),
+            "sent": self.sent,
+            "rejected": self.rejected,
+            "upload_failures": self.failures,
+            "pruned": self.pruned,
+            "flushes": self.flushes,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "avg_flush_ms": round(self._flush_total_ms / self.flushes, 2) if self.flushes else 0.0,
+            "max_flush_ms": round(self.max_flush_ms, 2),
+        }
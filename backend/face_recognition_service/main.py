@@ -1,13 +1,32 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-import cv2
-import mediapipe as mp
-import numpy as np
+from fastapi.responses import PlainTextResponse, Response
 from datetime import datetime
 import logging
+import os
+import time
 import requests
 import io
 from PIL import Image
+from config import settings
+from detector_pool import DetectorBusyError
+from executor import BoundedExecutor, QueueFullError
+import inference
+from inference import DeadlineExceededError, InvalidImageError
+from matcher import FaceMatcher
+from gallery import load_gallery, GallerySync
+from log_shipper import AccessLogShipper, JournalShipper
+from edge_store import EdgeStore
+from streams import StreamManager
+from batcher import MicroBatcher, embed_and_match
+from embeddings import FaceEmbedder
+from tracker import FaceTracker
+from door_config import DoorConfig
+from policy import PolicyEngine, PolicySync
+from preprocess import PreprocessOptions
+from metrics import profiler
+import metrics
+import asyncio
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,9 +40,331 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.RequestTimer)
 
-mp_face_detection = mp.solutions.face_detection
-BACKEND_API_URL = "http://localhost:8000"
+BACKEND_API_URL = settings.BACKEND_API_URL
+
+# Edge mode keeps everything a door needs in a local store (see edge_store.py)
+edge_store = EdgeStore(os.path.join(settings.EDGE_DATA_DIR, "edge.sqlite3")) if settings.EDGE_MODE else None
+snapshot_dir = settings.GALLERY_SNAPSHOT_DIR
+if settings.EDGE_MODE and not snapshot_dir:
+    snapshot_dir = os.path.join(settings.EDGE_DATA_DIR, "gallery")
+
+# One detector per worker thread in thread mode, one per process otherwise
+detector_pool_size = settings.INFERENCE_WORKERS if settings.INFERENCE_EXECUTOR == "thread" else 1
+if settings.DETECTOR_POOL_SIZE > 0:
+    logger.warning(
+        "DETECTOR_POOL_SIZE is deprecated; the detector pool follows INFERENCE_WORKERS"
+    )
+    if settings.INFERENCE_EXECUTOR == "thread":
+        detector_pool_size = settings.DETECTOR_POOL_SIZE
+
+inference_executor = BoundedExecutor(
+    mode=settings.INFERENCE_EXECUTOR,
+    workers=settings.INFERENCE_WORKERS,
+    max_queue=settings.INFERENCE_QUEUE_SIZE,
+    initializer=inference.init_worker,
+    initargs=(
+        detector_pool_size,
+        settings.DETECTOR_MODEL_SELECTION,
+        settings.DETECTOR_MIN_CONFIDENCE,
+        settings.FACE_EMBEDDING_MODEL,
+    )
+)
+
+face_matcher = FaceMatcher(
+    threshold=settings.FACE_MATCH_THRESHOLD,
+    backend=settings.FACE_INDEX_BACKEND,
+    snapshot_dir=snapshot_dir,
+    nlist=settings.FACE_INDEX_NLIST,
+    nprobe=settings.FACE_INDEX_NPROBE
+)
+
+gallery_sync = GallerySync(
+    face_matcher,
+    interval=settings.GALLERY_SYNC_INTERVAL,
+    max_tombstones=settings.GALLERY_COMPACT_TOMBSTONES,
+    compact_interval=settings.GALLERY_COMPACT_INTERVAL,
+    store=edge_store
+)
+
+if settings.EDGE_MODE:
+    access_log_shipper = JournalShipper(
+        BACKEND_API_URL,
+        edge_store,
+        batch_size=settings.ACCESS_LOG_BATCH_SIZE,
+        flush_interval=settings.ACCESS_LOG_FLUSH_INTERVAL,
+        retention_hours=settings.EDGE_JOURNAL_RETENTION_HOURS
+    )
+else:
+    access_log_shipper = AccessLogShipper(
+        BACKEND_API_URL,
+        batch_size=settings.ACCESS_LOG_BATCH_SIZE,
+        flush_interval=settings.ACCESS_LOG_FLUSH_INTERVAL,
+        max_queue=settings.ACCESS_LOG_QUEUE_SIZE,
+        max_retries=settings.ACCESS_LOG_MAX_RETRIES,
+        spool_path=settings.ACCESS_LOG_SPOOL_PATH,
+        spool_max_bytes=settings.ACCESS_LOG_SPOOL_MAX_BYTES
+    )
+
+face_embedder = FaceEmbedder(settings.FACE_EMBEDDING_MODEL, settings.FACE_EMBEDDING_FALLBACK)
+
+# Embedding and matching for recognition requests, batched across callers
+embedding_batcher = MicroBatcher(
+    embed_and_match(face_embedder, face_matcher),
+    max_batch=settings.BATCH_MAX_SIZE,
+    max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+    max_queue=settings.BATCH_QUEUE_SIZE,
+    name="embedding-batcher"
+)
+
+face_tracker = FaceTracker(
+    ttl=settings.TRACK_TTL,
+    iou_threshold=settings.TRACK_IOU_THRESHOLD,
+    similarity_threshold=settings.TRACK_SIMILARITY_THRESHOLD,
+    log_window=settings.TRACK_LOG_WINDOW
+)
+
+# Detection entry points for recognition. Batching needs the face crop back
+# so embedding can be batched with other requests.
+if settings.INFERENCE_BATCHING:
+    recognize_upload_fn, recognize_frame_fn = inference.decode_detect_crop, inference.detect_and_crop
+else:
+    recognize_upload_fn, recognize_frame_fn = inference.decode_detect_embed, inference.detect_and_embed
+
+door_config = DoorConfig(settings.DOOR_CONFIG_REFRESH_INTERVAL, store=edge_store)
+
+policy_engine = PolicyEngine()
+policy_sync = PolicySync(policy_engine, interval=settings.ACCESS_POLICY_REFRESH_INTERVAL, store=edge_store)
+
+# process_stream_frame is defined below, once the decision helpers exist
+stream_manager = StreamManager(
+    lambda door_id, frame: process_stream_frame(door_id, frame),
+    door_config=door_config,
+    fps=settings.STREAM_SAMPLE_FPS,
+    motion_threshold=settings.STREAM_MOTION_THRESHOLD,
+    motion_min_area=settings.STREAM_MOTION_MIN_AREA,
+    reconnect_delay=settings.STREAM_RECONNECT_DELAY,
+    refresh_interval=settings.STREAM_REFRESH_INTERVAL,
+    sources=settings.STREAM_SOURCES
+)
+event_loop = None
+
+# Gauges, read from the components only when /metrics is scraped
+metrics.register_stats({
+    "face_executor": inference_executor.stats,
+    "face_detector_pool": lambda: inference.get_detector_pool().stats() if inference.get_detector_pool() else None,
+    "face_gallery": face_matcher.stats,
+    "face_gallery_sync": gallery_sync.stats,
+    "face_log_shipper": access_log_shipper.stats,
+    "face_batcher": lambda: embedding_batcher.stats() if settings.INFERENCE_BATCHING else None,
+    "face_tracker": lambda: face_tracker.stats() if settings.FACE_TRACKING else None,
+    "face_streams": lambda: {"active": len(stream_manager.streams)},
+    "face_policy": lambda: policy_engine.stats() if settings.ACCESS_POLICY_ENABLED else None,
+    "face_profiler": profiler.stats,
+})
+
+@app.on_event("startup")
+async def start_log_shipper():
+    global event_loop
+    event_loop = asyncio.get_running_loop()
+    await access_log_shipper.start()
+    if settings.INFERENCE_BATCHING:
+        await embedding_batcher.start()
+
+@app.on_event("shutdown")
+async def stop_log_shipper():
+    if settings.INFERENCE_BATCHING:
+        await embedding_batcher.stop()
+    await access_log_shipper.stop()
+
+@app.on_event("startup")
+def startup():
+    if not face_embedder.identifies:
+        logger.error(
+            f"No usable FACE_EMBEDDING_MODEL ({settings.FACE_EMBEDDING_MODEL or 'not set'}): "
+            f"every recognised face is denied and enrolment is refused. "
+            f"Set FACE_EMBEDDING_FALLBACK=true to identify with grey patches (development only)."
+        )
+    inference_executor.start()
+    # A mapped snapshot lets doors open before the backend answers; the
+    # change feed then catches up from the snapshot's watermark.
+    if face_matcher.load_snapshot():
+        if edge_store is not None:
+            # Changes received after that snapshot, in case the backend is away now
+            gallery_sync.replay_stored()
+    else:
+        load_gallery(face_matcher)
+    gallery_sync.start()
+    door_config.start()
+    if settings.ACCESS_POLICY_ENABLED:
+        policy_sync.start()
+    if settings.STREAMS_ENABLED:
+        stream_manager.start()
+
+@app.on_event("shutdown")
+def shutdown():
+    stream_manager.stop()
+    policy_sync.stop()
+    door_config.stop()
+    gallery_sync.stop()
+    if face_matcher.dirty:
+        gallery_sync.save()
+    inference_executor.shutdown()
+    inference.close_worker()
+
+async def run_inference(fn, *args):
+    """
+    Run fn on the inference executor and record the stage timings it returns.
+    Maps executor back-pressure and deadlines to HTTP errors.
+    """
+    started = time.perf_counter()
+    try:
+        result = await inference_executor.run(fn, *args, timeout=settings.INFERENCE_TIMEOUT)
+    except (QueueFullError, DetectorBusyError):
+        raise HTTPException(
+            status_code=503,
+            detail="Face service is busy, retry shortly",
+            headers={"Retry-After": "1"}
+        )
+    except DeadlineExceededError:
+        raise HTTPException(status_code=504, detail="Face detection timed out")
+    except InvalidImageError:
+        raise HTTPException(status_code=400, detail="Invalid image")
+    if isinstance(result, dict) and "timings" in result:
+        timings = result.pop("timings")
+        metrics.observe_timings(timings)
+        # Time the worker did not account for was spent queued or in transit
+        metrics.observe("executor_wait", max(0.0, time.perf_counter() - started - sum(timings.values())))
+    return result
+
+def preprocess_options(door_id=None):
+    """Reduced-resolution decode everywhere, plus the door's ROI when known."""
+    roi = door_config.roi(door_id) if door_id is not None else None
+    return PreprocessOptions(settings.PREPROCESS_TARGET_SIDE, roi)
+
+async def run_detection(contents, fn=inference.decode_and_detect, door_id=None):
+    """Decode and detect on the inference executor."""
+    return await run_inference(fn, contents, settings.DETECTOR_ACQUIRE_TIMEOUT, preprocess_options(door_id))
+
+async def embed_best_face(result):
+    """
+    The detector returned the best face crop instead of its embedding.
+    With batching the crop is embedded and matched in a micro-batch shared
+    with other requests, otherwise it is embedded on the executor.
+    Fills in "embedding" (and "match" when batched) in place.
+    """
+    if "crop" not in result:
+        return result
+    crop = result.pop("crop")
+    result["embedding"] = None
+    if crop is None:
+        result["match"] = (None, 0.0)
+    elif settings.INFERENCE_BATCHING:
+        try:
+            with metrics.span("embed_match_batch"):
+                embedding, user_id, score = await embedding_batcher.submit(crop)
+        except QueueFullError:
+            raise HTTPException(
+                status_code=503,
+                detail="Face service is busy, retry shortly",
+                headers={"Retry-After": "1"}
+            )
+        result["embedding"], result["match"] = embedding, (user_id, score)
+    else:
+        with metrics.span("embed"):
+            result["embedding"] = await run_inference(inference.embed_face, crop)
+    return result
+
+async def recognize_result(door_id, result, track=True):
+    """
+    Decision and access log for a detection result with at least one face.
+    Every face is embedded, matched and decided. With tracking, a face that
+    continues a track at the door is not re-logged while its outcome stays
+    the same.
+    """
+    await embed_best_face(result)
+    decision = decide(door_id, result)
+    if not (settings.FACE_TRACKING and track):
+        log_decision(door_id, decision)
+        return decision
+    
+    bbox = max(result["detections"], key=lambda d: d["score"])["bbox"]
+    face_track = face_tracker.find(door_id, bbox, result["embedding"])
+    face_track = face_tracker.update(door_id, face_track, bbox, decision, result["embedding"])
+    if face_tracker.should_log(face_track):
+        log_decision(door_id, decision)
+    return {**decision, "track_id": face_track.id}
+
+def decide(door_id, result):
+    """
+    Access decision at a door for an inference result that has at least one
+    face. Shared by uploaded stills and camera streams.
+    """
+    # Use the highest confidence face
+    detection = max(result["detections"], key=lambda d: d["score"])
+    confidence = detection["score"]
+    
+    user_id, match_score = None, 0.0
+    if "match" in result:
+        user_id, match_score = result["match"]
+    elif result["embedding"] is not None:
+        with metrics.span("match"):
+            user_id, match_score = face_matcher.match(result["embedding"])
+    
+    if confidence <= settings.MIN_FACE_SCORE:
+        log_status, access_status = "low_confidence", "low_confidence"
+        message = f"Face detected with low confidence ({confidence*100:.1f}%)"
+    elif not face_embedder.identifies:
+        log_status, access_status = "failed", "denied"
+        message = "Face identification unavailable: no embedding model configured"
+    elif user_id is None:
+        log_status, access_status = "failed", "denied"
+        message = f"Unknown face (best match {match_score*100:.1f}%)"
+    else:
+        denied_by = policy_engine.check(user_id, door_id) if settings.ACCESS_POLICY_ENABLED else None
+        if denied_by is None:
+            log_status, access_status = "success", "granted"
+            message = f"User {user_id} recognized with {match_score*100:.1f}% similarity"
+        else:
+            log_status, access_status = "denied", "denied"
+            message = f"User {user_id} recognized but not allowed at door {door_id} ({denied_by})"
+    
+    return {
+        "user_id": user_id,
+        "confidence": confidence,
+        "match_score": match_score,
+        "log_status": log_status,
+        "access_status": access_status,
+        "message": message
+    }
+
+def log_decision(door_id, decision):
+    # Log to backend in the background; never blocks the door decision
+    access_log_shipper.submit({
+        "user_id": decision["user_id"],
+        "door_id": door_id,
+        "confidence_score": decision["match_score"],
+        "status": decision["log_status"],
+        "notes": f"{decision['message']}; detection score {decision['confidence']*100:.1f}%"
+    })
+
+async def recognize_frame(door_id, frame):
+    """Run a decoded camera frame through the same path as /api/recognize."""
+    result = await run_inference(
+        recognize_frame_fn,
+        frame,
+        settings.DETECTOR_ACQUIRE_TIMEOUT,
+        preprocess_options(door_id)
+    )
+    if not result["detections"]:
+        return None
+    return await recognize_result(door_id, result)
+
+def process_stream_frame(door_id, frame):
+    """Called on a door's stream thread; waits for the event loop to finish the frame."""
+    future = asyncio.run_coroutine_threadsafe(recognize_frame(door_id, frame), event_loop)
+    return future.result()
 
 @app.get("/health")
 def health_check():
@@ -33,6 +374,48 @@ def health_check():
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/api/stats")
+def get_stats():
+    detector_pool = inference.get_detector_pool()
+    return {
+        "edge_mode": settings.EDGE_MODE,
+        "identification_enabled": face_embedder.identifies,
+        # Per-process pools are not visible from here in process mode
+        "detector_pool": detector_pool.stats() if detector_pool else None,
+        "executor": inference_executor.stats(),
+        "gallery": face_matcher.stats(),
+        "gallery_sync": gallery_sync.stats(),
+        "access_log_shipper": access_log_shipper.stats(),
+        "streams": stream_manager.stats(),
+        "door_config": door_config.stats(),
+        "access_policy": {**policy_engine.stats(), **policy_sync.stats()} if settings.ACCESS_POLICY_ENABLED else None,
+        "embedding_batcher": embedding_batcher.stats() if settings.INFERENCE_BATCHING else None,
+        "face_tracker": face_tracker.stats() if settings.FACE_TRACKING else None,
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/metrics")
+def get_metrics():
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
+
+@app.post("/api/profiler/start")
+def start_profiler(interval_ms: float = Query(5.0, gt=0), seconds: float = Query(None, gt=0)):
+    """Start sampling all threads; the result comes back from /api/profiler/stop."""
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=403, detail="Profiler is disabled (PROFILER_ENABLED)")
+    max_seconds = min(seconds or settings.PROFILER_MAX_SECONDS, settings.PROFILER_MAX_SECONDS)
+    if not profiler.start(interval_ms / 1000, max_seconds):
+        raise HTTPException(status_code=409, detail="Profiler is already running")
+    return {"success": True, "profiler": profiler.stats()}
+
+@app.post("/api/profiler/stop", response_class=PlainTextResponse)
+def stop_profiler():
+    """Stop sampling; returns collapsed stacks for flamegraph.pl or speedscope."""
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=403, detail="Profiler is disabled (PROFILER_ENABLED)")
+    return PlainTextResponse(profiler.stop())
+
 @app.post("/api/detect-faces")
 async def detect_faces(file: UploadFile = File(...)):
     """
@@ -41,36 +424,24 @@ async def detect_faces(file: UploadFile = File(...)):
     """
     try:
         contents = await file.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if image is None:
-            raise HTTPException(status_code=400, detail="Invalid image")
-        
-        h, w, c = image.shape
-        
-        with mp_face_detection.FaceDetection(
-            model_selection=0, 
-            min_detection_confidence=0.5
-        ) as face_detection:
-            results = face_detection.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        result = await run_detection(contents)
+        w, h = result["width"], result["height"]
         
         faces = []
-        if results.detections:
-            for idx, detection in enumerate(results.detections):
-                bbox = detection.location_data.relative_bounding_box
-                
-                faces.append({
-                    "face_id": idx,
-                    "confidence": float(detection.score[0]),
-                    "bbox": {
-                        "x": int(bbox.xmin * w),
-                        "y": int(bbox.ymin * h),
-                        "w": int(bbox.width * w),
-                        "h": int(bbox.height * h)
-                    },
-                    "position": f"x:{int(bbox.xmin * w)}, y:{int(bbox.ymin * h)}"
-                })
+        for idx, detection in enumerate(result["detections"]):
+            xmin, ymin, width, height = detection["bbox"]
+            
+            faces.append({
+                "face_id": idx,
+                "confidence": detection["score"],
+                "bbox": {
+                    "x": int(xmin * w),
+                    "y": int(ymin * h),
+                    "w": int(width * w),
+                    "h": int(height * h)
+                },
+                "position": f"x:{int(xmin * w)}, y:{int(ymin * h)}"
+            })
         
         logger.info(f"Detected {len(faces)} faces in image")
         
@@ -83,30 +454,74 @@ async def detect_faces(file: UploadFile = File(...)):
             "timestamp": datetime.now().isoformat()
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in detect_faces: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
-@app.post("/api/recognize")
-async def recognize_faces(file: UploadFile = File(...), door_id: int = Query(...)):
+@app.post("/api/gallery/reload")
+def reload_gallery():
+    if not load_gallery(face_matcher):
+        raise HTTPException(status_code=502, detail="Could not load gallery from backend")
+    return {"success": True, "gallery": face_matcher.stats()}
+
+@app.post("/api/enroll")
+async def enroll_face(file: UploadFile = File(...), user_id: int = Query(...)):
     """
-    Recognize faces dan log access
+    Extract embedding dari foto dan simpan ke backend
     """
+    if not face_embedder.identifies:
+        raise HTTPException(status_code=503, detail="Enrolment needs FACE_EMBEDDING_MODEL")
     try:
         contents = await file.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        result = await run_detection(contents, fn=inference.decode_detect_embed)
+        
+        if result["embedding"] is None:
+            raise HTTPException(status_code=400, detail="No face detected")
         
-        if image is None:
-            raise HTTPException(status_code=400, detail="Invalid image")
+        embedding = result["embedding"]
+        response = requests.post(
+            f"{BACKEND_API_URL}/api/face-embeddings/",
+            json={
+                "user_id": user_id,
+                "embedding": embedding.tolist(),
+                "photo_filename": file.filename
+            },
+            timeout=5
+        )
+        if response.status_code != 201:
+            raise HTTPException(status_code=response.status_code, detail=response.json().get("detail"))
+        # The template reaches the matcher through the gallery change feed
         
-        with mp_face_detection.FaceDetection(
-            model_selection=0, 
-            min_detection_confidence=0.5
-        ) as face_detection:
-            results = face_detection.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        return {
+            "success": True,
+            "user_id": user_id,
+            "embedding_id": response.json()["id"],
+            "dim": int(embedding.shape[0]),
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in enroll_face: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+@app.post("/api/recognize")
+async def recognize_faces(
+    file: UploadFile = File(...),
+    door_id: int = Query(...),
+    track: bool = Query(False, description="Follow the face across uploads to avoid repeated logs")
+):
+    """
+    Recognize faces dan log access
+    """
+    try:
+        contents = await file.read()
+        result = await run_detection(contents, fn=recognize_upload_fn, door_id=door_id)
         
-        if not results.detections:
+        if not result["detections"]:
             return {
                 "success": True,
                 "recognized": False,
@@ -114,37 +529,22 @@ async def recognize_faces(file: UploadFile = File(...), door_id: int = Query(...
                 "timestamp": datetime.now().isoformat()
             }
         
-        # Get first face (highest confidence)
-        detection = results.detections[0]
-        confidence = float(detection.score[0])
-        
-        # Log to backend
-        try:
-            log_response = requests.post(
-                f"{BACKEND_API_URL}/api/access-logs",
-                json={
-                    "user_id": None,
-                    "door_id": door_id,
-                    "confidence_score": confidence,
-                    "status": "success" if confidence > 0.7 else "low_confidence",
-                    "notes": f"Face detected with {confidence*100:.1f}% confidence"
-                },
-                timeout=5
-            )
-            logger.info(f"Access log created: {log_response.status_code}")
-        except Exception as e:
-            logger.warning(f"Could not log to backend: {str(e)}")
+        decision = await recognize_result(door_id, result, track=track)
         
         return {
             "success": True,
-            "recognized": True,
-            "confidence": confidence,
+            "recognized": decision["user_id"] is not None,
+            "user_id": decision["user_id"],
+            "confidence": decision["confidence"],
+            "match_score": decision["match_score"],
             "door_id": door_id,
-            "status": "granted" if confidence > 0.7 else "low_confidence",
-            "message": f"Face recognized with {confidence*100:.1f}% confidence",
+            "status": decision["access_status"],
+            "message": decision["message"],
             "timestamp": datetime.now().isoformat()
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in recognize_faces: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
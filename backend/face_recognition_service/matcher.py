@@ -0,0 +1,236 @@
+import logging
+import threading
+import time
+
+import numpy as np
+
+from index import create_index, normalize_rows
+from snapshot import open_snapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+class FaceMatcher:
+    """
+    1:N identification against the enrolled gallery.
+
+    Templates are L2-normalised float32 rows held by a pluggable index
+    ("exact" brute force or "ivf" approximate). Several templates per user
+    are allowed; the best scoring row wins.
+
+    Deactivations and template removals take effect immediately through
+    tombstones checked on every match; the rows themselves are dropped by
+    compact(), which runs off the request path.
+    """
+
+    def __init__(self, threshold=0.6, backend="exact", snapshot_dir="", **index_options):
+        self.threshold = threshold
+        self.backend = backend
+        self.snapshot_dir = snapshot_dir
+        self.index_options = index_options
+        self.watermark = 0
+        self._saved_watermark = 0
+        self._lock = threading.Lock()
+        self._index = create_index(backend, **index_options)
+        self._embedding_ids = set()
+        self._user_tombstones = set()
+        self._row_tombstones = set()
+        self._last_compaction = time.monotonic()
+        self._compactions = 0
+
+    def load(self, user_ids, embeddings, embedding_ids=None, watermark=0):
+        """Rebuild the index from scratch and snapshot it when a directory is set."""
+        index = create_index(self.backend, **self.index_options)
+        if len(embeddings):
+            index.build(normalize_rows(np.asarray(embeddings, dtype=np.float32)), user_ids, embedding_ids)
+        with self._lock:
+            self._index = index
+            self._embedding_ids = set(embedding_ids or [])
+            self._user_tombstones = set()
+            self._row_tombstones = set()
+            self.watermark = watermark
+        self.save()
+
+    def save(self):
+        """Write a snapshot; returns its watermark, or None when nothing was written."""
+        if not self.snapshot_dir:
+            return None
+        # State, tombstones and watermark are captured together: adds change
+        # the index in place, and a deactivation the feed already delivered
+        # has to survive a restart until compaction drops the user's rows
+        with self._lock:
+            index, watermark = self._index, self.watermark
+            state = index.state()
+            user_tombstones, row_tombstones = list(self._user_tombstones), list(self._row_tombstones)
+            self._saved_watermark = watermark
+        try:
+            write_snapshot(index, self.snapshot_dir, watermark, state, user_tombstones, row_tombstones)
+        except Exception as e:
+            logger.warning(f"Could not write gallery snapshot: {str(e)}")
+            return None
+        return watermark
+
+    @property
+    def dirty(self):
+        """True when changes were applied since the last snapshot."""
+        return self.watermark != self._saved_watermark
+
+    def load_snapshot(self):
+        """Map the current on-disk snapshot; returns False if there is none."""
+        if not self.snapshot_dir:
+            return False
+        try:
+            index, meta = open_snapshot(self.snapshot_dir, **self.index_options)
+        except Exception as e:
+            logger.warning(f"Could not open gallery snapshot in {self.snapshot_dir}: {str(e)}")
+            return False
+        if index is None:
+            return False
+        if index.kind != self.backend:
+            logger.warning(f"Snapshot index is {index.kind}, configured backend is {self.backend}")
+            return False
+        row_ids = index.state()["row_ids"]
+        row_tombstones = set(meta.get("row_tombstones", []))
+        with self._lock:
+            self._index = index
+            self._embedding_ids = set(int(r) for r in row_ids if r >= 0) - row_tombstones
+            self._user_tombstones = set(meta.get("user_tombstones", []))
+            self._row_tombstones = row_tombstones
+            self.watermark = meta["watermark"]
+            self._saved_watermark = meta["watermark"]
+        logger.info(
+            f"Mapped gallery snapshot {meta['name']}: {len(index)} templates at watermark {meta['watermark']}, "
+            f"{self.tombstones} tombstones"
+        )
+        return True
+
+    def add(self, user_id, embedding, embedding_id=None):
+        """Add one template; replays of an already indexed embedding id are ignored."""
+        vector = normalize_rows(np.asarray(embedding, dtype=np.float32).reshape(1, -1))[0]
+        with self._lock:
+            if embedding_id is not None:
+                if embedding_id in self._embedding_ids:
+                    return False
+                self._embedding_ids.add(embedding_id)
+            self._index.add(vector, user_id, -1 if embedding_id is None else embedding_id)
+            self._retrain_if_needed()
+        return True
+
+    def _retrain_if_needed(self):
+        """Swap in a retrained index once it has outgrown its training (lock held)."""
+        if not self._index.needs_training():
+            return
+        started = time.perf_counter()
+        self._index = self._index.retrained()
+        logger.info(
+            f"Gallery index retrained: {len(self._index)} templates in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+
+    def remove_embedding(self, embedding_id):
+        with self._lock:
+            if embedding_id in self._embedding_ids:
+                self._embedding_ids.discard(embedding_id)
+                self._row_tombstones.add(embedding_id)
+
+    def deactivate(self, user_id):
+        with self._lock:
+            self._user_tombstones.add(user_id)
+
+    def activate(self, user_id, embeddings):
+        """
+        Replace the user's templates with ``embeddings``, a list of
+        (embedding_id, vector) pairs, and lift any tombstone.
+        """
+        with self._lock:
+            self._index.remove(labels=[user_id])
+            self._user_tombstones.discard(user_id)
+        for embedding_id, vector in embeddings:
+            with self._lock:
+                self._embedding_ids.discard(embedding_id)
+            self.add(user_id, vector, embedding_id)
+
+    @property
+    def tombstones(self):
+        return len(self._user_tombstones) + len(self._row_tombstones)
+
+    def compact(self):
+        """Physically drop tombstoned rows. Returns the number of rows removed."""
+        with self._lock:
+            users = list(self._user_tombstones)
+            rows = list(self._row_tombstones)
+            if not users and not rows:
+                self._last_compaction = time.monotonic()
+                return 0
+            started = time.perf_counter()
+            removed = self._index.remove(labels=users, row_ids=rows)
+            self._retrain_if_needed()
+            self._user_tombstones.difference_update(users)
+            self._row_tombstones.difference_update(rows)
+            self._last_compaction = time.monotonic()
+            self._compactions += 1
+        logger.info(
+            f"Gallery compacted: {removed} rows removed in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+        return removed
+
+    def compaction_due(self, max_tombstones, interval):
+        if not self.tombstones:
+            return False
+        return self.tombstones >= max_tombstones or time.monotonic() - self._last_compaction >= interval
+
+    def match(self, embedding):
+        """
+        Returns (user_id, score). user_id is None when the best score is
+        below the threshold, the gallery is empty or the best row is
+        tombstoned.
+        """
+        index = self._index
+        if not len(index):
+            return None, 0.0
+        query = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        if query.shape[0] != index.dim:
+            raise ValueError(
+                f"Embedding dimension {query.shape[0]} does not match gallery dimension {index.dim}"
+            )
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        user_id, score, row_id = index.search(query)
+        # A tombstoned best match is denied outright rather than falling
+        # through to the next closest identity.
+        if user_id in self._user_tombstones or row_id in self._row_tombstones:
+            return None, score
+        if user_id is None or score < self.threshold:
+            return None, score
+        return user_id, score
+
+    def match_many(self, embeddings):
+        """match() for a (n, dim) matrix of embeddings in one batched search."""
+        index = self._index
+        queries = np.asarray(embeddings, dtype=np.float32)
+        if not len(index):
+            return [(None, 0.0)] * queries.shape[0]
+        if queries.shape[1] != index.dim:
+            raise ValueError(
+                f"Embedding dimension {queries.shape[1]} does not match gallery dimension {index.dim}"
+            )
+        results = []
+        for user_id, score, row_id in index.search_many(normalize_rows(queries)):
+            if user_id in self._user_tombstones or row_id in self._row_tombstones:
+                user_id = None
+            elif user_id is not None and score < self.threshold:
+                user_id = None
+            results.append((user_id, score))
+        return results
+
+    def stats(self):
+        index = self._index
+        return {
+            "backend": index.kind,
+            "templates": len(index),
+            "dim": index.dim,
+            "threshold": self.threshold,
+            "watermark": self.watermark,
+            "tombstones": self.tombstones,
+            "compactions": self._compactions,
+        }
@@ -0,0 +1,62 @@
+"""
+Prometheus metrics for the face service.
+
+Recognition stages are timed into one histogram labelled by stage, either
+with span() around code in this process or with observe_timings() for the
+per-stage timings inference workers return with their result (so process
+mode works too). Gauges are not updated on the request path at all:
+StatsCollector reads the components' stats() when /metrics is scraped.
+
+StatsCollector, render() and the RequestTimer base live in the backend's
+telemetry.py (the parent directory), shared by both services.
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+from prometheus_client import Histogram
+
+# telemetry.py is shared with the backend one directory up; appended so the
+# service's own modules (config, main, metrics) still win on name clashes
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import telemetry
+from telemetry import profiler, register_stats, render
+
+# Seconds; from sub-millisecond matching up to whole requests near the deadline
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+STAGE_SECONDS = Histogram(
+    "face_stage_seconds", "Time spent in each recognition stage", ["stage"], buckets=BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    "face_http_request_seconds", "HTTP request latency", ["method", "route", "status"], buckets=BUCKETS
+)
+
+_stages = {}
+
+
+def observe(stage, seconds):
+    child = _stages.get(stage)
+    if child is None:
+        child = _stages.setdefault(stage, STAGE_SECONDS.labels(stage))
+    child.observe(seconds)
+
+
+def observe_timings(timings):
+    """Record a worker's {stage: seconds} timings."""
+    for stage, seconds in (timings or {}).items():
+        observe(stage, seconds)
+
+
+@contextmanager
+def span(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - started)
+
+
+class RequestTimer(telemetry.RequestTimer):
+    histogram = REQUEST_SECONDS
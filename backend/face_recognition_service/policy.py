@@ -0,0 +1,352 @@
+"""
+Access policy: which recognised user may open which door, and when.
+
+The backend's /api/access-policy/ snapshot (user groups, door groups,
+weekly time windows, inactive users and doors) is compiled per door into
+a few user bitsets, one per stretch of the week in which the same rules
+apply. A decision is then a dict lookup, a bisect over those few
+boundaries and one bit test, independent of the number of users, groups
+and rules.
+
+When a new snapshot arrives only the bitsets of user groups whose members
+changed and the doors affected by changed rules, groups or door status are
+rebuilt; the rest of the compiled policy is reused as is.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_right
+from collections import Counter
+
+import numpy as np
+import requests
+
+from config import settings
+from edge_store import POLICY
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 1440
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+ALL_DAYS = 127
+
+# Reasons a recognised user is denied
+NOT_LOADED = "policy_not_loaded"
+INACTIVE_USER = "inactive_user"
+INACTIVE_DOOR = "inactive_door"
+NO_RULE = "no_rule"
+OUTSIDE_WINDOW = "outside_window"
+
+EMPTY = b""
+
+
+def minute_of_week(timestamp=None):
+    """Local minutes since Monday 00:00."""
+    t = time.localtime(timestamp)
+    return t.tm_wday * MINUTES_PER_DAY + t.tm_hour * 60 + t.tm_min
+
+
+def window_intervals(days, start_minute, end_minute):
+    """
+    Minute-of-week [start, end) intervals of a weekly window. Windows with
+    start >= end run past midnight, and past Sunday into Monday.
+    """
+    length = (end_minute - start_minute) % MINUTES_PER_DAY or MINUTES_PER_DAY
+    if days & ALL_DAYS == ALL_DAYS and length == MINUTES_PER_DAY:
+        return [(0, MINUTES_PER_WEEK)]
+    intervals = []
+    for day in range(7):
+        if not days & (1 << day):
+            continue
+        start = day * MINUTES_PER_DAY + start_minute
+        end = start + length
+        if end <= MINUTES_PER_WEEK:
+            intervals.append((start, end))
+        else:
+            intervals.append((start, MINUTES_PER_WEEK))
+            intervals.append((0, end - MINUTES_PER_WEEK))
+    return intervals
+
+
+def user_bitset(user_ids):
+    """Packed bitset with bit ``user_id`` set for each id (bit 0 of byte 0 is user 0)."""
+    if not user_ids:
+        return EMPTY
+    ids = np.asarray(user_ids, dtype=np.int64)
+    bits = np.zeros(int(ids.max()) + 1, dtype=bool)
+    bits[ids] = True
+    return np.packbits(bits, bitorder="little").tobytes()
+
+
+def union(bitsets):
+    bitsets = [b for b in bitsets if b]
+    if len(bitsets) <= 1:
+        return bitsets[0] if bitsets else EMPTY
+    combined = np.zeros(max(len(b) for b in bitsets), dtype=np.uint8)
+    for b in bitsets:
+        combined[:len(b)] |= np.frombuffer(b, dtype=np.uint8)
+    return combined.tobytes()
+
+
+def has_bit(bitset, user_id):
+    byte = user_id >> 3
+    return byte < len(bitset) and bitset[byte] >> (user_id & 7) & 1
+
+
+class DoorPolicy:
+    """
+    A door's compiled policy: the week split at ``boundaries`` (minutes,
+    starting at 0) and, for each part, the bitset of users allowed in it.
+    ``anytime`` has every user allowed in some part, to tell "outside the
+    time window" from "no rule" without walking the parts.
+    """
+    __slots__ = ("boundaries", "bitsets", "anytime", "active")
+
+    def __init__(self, boundaries, bitsets, anytime, active=True):
+        self.boundaries = boundaries
+        self.bitsets = bitsets
+        self.anytime = anytime
+        self.active = active
+
+    def bitset_at(self, minute):
+        if len(self.boundaries) == 1:
+            return self.bitsets[0]
+        return self.bitsets[bisect_right(self.boundaries, minute) - 1]
+
+
+class PolicyEngine:
+    def __init__(self):
+        self.version = None
+        self._doors = {}
+        self._inactive_users = frozenset()
+        # Source of the compiled state, kept to work out what a new snapshot changes
+        self._user_groups = {}
+        self._door_groups = {}
+        self._rules = {}
+        self._inactive_doors = frozenset()
+        self._group_bits = {}
+        # Unions of user-group bitsets, shared by doors and parts of the week
+        self._unions = {}
+        self.compiles = 0
+        self.doors_compiled = 0
+        self.last_compile_ms = 0.0
+
+    @property
+    def loaded(self):
+        return self.version is not None
+
+    def check(self, user_id, door_id, minute=None):
+        """None when ``user_id`` may open ``door_id`` now (or at ``minute`` of the week), else the reason."""
+        if self.version is None:
+            return NOT_LOADED
+        if user_id in self._inactive_users:
+            return INACTIVE_USER
+        door = self._doors.get(door_id)
+        if door is None:
+            return NO_RULE
+        if not door.active:
+            return INACTIVE_DOOR
+        if has_bit(door.bitset_at(minute_of_week() if minute is None else minute), user_id):
+            return None
+        if has_bit(door.anytime, user_id):
+            return OUTSIDE_WINDOW
+        return NO_RULE
+
+    def load(self, snapshot):
+        """Compile a backend snapshot, rebuilding only what changed since the last one."""
+        started = time.perf_counter()
+        user_groups = {int(group_id): frozenset(ids) for group_id, ids in snapshot["user_groups"].items()}
+        door_groups = {int(group_id): frozenset(ids) for group_id, ids in snapshot["door_groups"].items()}
+        rules = {
+            rule["id"]: (rule["user_group_id"], rule["door_group_id"],
+                         tuple(window_intervals(rule["days"], rule["start_minute"], rule["end_minute"])))
+            for rule in snapshot["rules"]
+        }
+        inactive_doors = frozenset(snapshot["inactive_door_ids"])
+
+        changed_user_groups = {
+            group_id for group_id in user_groups.keys() | self._user_groups.keys()
+            if user_groups.get(group_id) != self._user_groups.get(group_id)
+        }
+        changed_door_groups = {
+            group_id for group_id in door_groups.keys() | self._door_groups.keys()
+            if door_groups.get(group_id) != self._door_groups.get(group_id)
+        }
+        changed_rules = {
+            rule_id for rule_id in rules.keys() | self._rules.keys()
+            if rules.get(rule_id) != self._rules.get(rule_id)
+        }
+
+        affected = set(inactive_doors ^ self._inactive_doors)
+        for group_id in changed_door_groups:
+            affected |= door_groups.get(group_id, frozenset()) | self._door_groups.get(group_id, frozenset())
+        for source_rules, source_door_groups in ((rules, door_groups), (self._rules, self._door_groups)):
+            for rule_id, (user_group_id, door_group_id, _) in source_rules.items():
+                if rule_id in changed_rules or user_group_id in changed_user_groups:
+                    affected |= source_door_groups.get(door_group_id, frozenset())
+
+        for group_id in changed_user_groups:
+            if group_id in user_groups:
+                self._group_bits[group_id] = user_bitset(list(user_groups[group_id]))
+            else:
+                self._group_bits.pop(group_id, None)
+        self._unions = {key: bits for key, bits in self._unions.items() if not key & changed_user_groups}
+
+        self._user_groups, self._door_groups, self._rules = user_groups, door_groups, rules
+        self._inactive_doors = inactive_doors
+
+        doors = dict(self._doors)
+        if affected:
+            rules_by_door = self._rules_by_door(affected)
+            for door_id in affected:
+                policy = self._compile_door(rules_by_door.get(door_id, ()), door_id not in inactive_doors)
+                if policy is None:
+                    doors.pop(door_id, None)
+                else:
+                    doors[door_id] = policy
+            in_use = {id(bits) for door in doors.values() for bits in (*door.bitsets, door.anytime)}
+            self._unions = {key: bits for key, bits in self._unions.items() if id(bits) in in_use}
+
+        # Swap whole objects so check() never sees a half-applied snapshot
+        self._doors = doors
+        self._inactive_users = frozenset(snapshot["inactive_user_ids"])
+        self.version = snapshot["version"]
+        self.compiles += 1
+        self.doors_compiled += len(affected)
+        self.last_compile_ms = (time.perf_counter() - started) * 1000
+        return len(affected)
+
+    def _rules_by_door(self, door_ids):
+        by_door = {}
+        for user_group_id, door_group_id, intervals in self._rules.values():
+            for door_id in self._door_groups.get(door_group_id, frozenset()) & door_ids:
+                by_door.setdefault(door_id, []).append((user_group_id, intervals))
+        return by_door
+
+    def _compile_door(self, rules, active):
+        """DoorPolicy for a door's (user_group_id, intervals) rules, or None when it has none."""
+        if not rules:
+            return None if active else DoorPolicy([0], [EMPTY], EMPTY, active=False)
+        # Sweep the week: each interval start/end adds or removes its group
+        events = sorted(
+            (minute, delta, user_group_id)
+            for user_group_id, intervals in rules
+            for start, end in intervals
+            for minute, delta in ((start, 1), (end, -1))
+        )
+        open_groups = Counter()
+        boundaries, bitsets = [], []
+        i = 0
+        while i < len(events):
+            minute = events[i][0]
+            while i < len(events) and events[i][0] == minute:
+                open_groups[events[i][2]] += events[i][1]
+                i += 1
+            if minute >= MINUTES_PER_WEEK:
+                break
+            bits = self._union(frozenset(group_id for group_id, count in open_groups.items() if count > 0))
+            # Neighbouring parts of the week that allow the same users stay one part
+            if not bitsets or bits != bitsets[-1]:
+                boundaries.append(minute)
+                bitsets.append(bits)
+        if not boundaries or boundaries[0] != 0:
+            boundaries.insert(0, 0)
+            bitsets.insert(0, EMPTY)
+        anytime = self._union(frozenset(user_group_id for user_group_id, _ in rules))
+        return DoorPolicy(boundaries, bitsets, anytime, active)
+
+    def _union(self, groups):
+        bits = self._unions.get(groups)
+        if bits is None:
+            bits = self._unions[groups] = union([self._group_bits.get(group_id, EMPTY) for group_id in groups])
+        return bits
+
+    def stats(self):
+        doors = self._doors
+        return {
+            "version": self.version,
+            "doors": len(doors),
+            "rules": len(self._rules),
+            "user_groups": len(self._user_groups),
+            "door_groups": len(self._door_groups),
+            "inactive_users": len(self._inactive_users),
+            "week_segments": sum(len(door.boundaries) for door in doors.values()),
+            "bitset_bytes": sum(len(bits) for bits in self._unions.values()),
+            "compiles": self.compiles,
+            "doors_compiled": self.doors_compiled,
+            "last_compile_ms": round(self.last_compile_ms, 3),
+        }
+
+
+class PolicySync:
+    """
+    Polls the backend's policy version and compiles a new snapshot into
+    the engine when it moved, in the background like DoorConfig. With an
+    EdgeStore the snapshot is kept locally, compiled at startup and only
+    replaced when the backend reports a newer version.
+    """
+
+    def __init__(self, engine, interval=5.0, store=None):
+        self.engine = engine
+        self.interval = interval
+        self.store = store
+        self.refreshes = 0
+        self.errors = 0
+        self.last_refresh = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        stored = self.store.get(POLICY) if self.store is not None else None
+        if stored is not None:
+            self.engine.load(stored[1])
+            logger.info(f"Access policy v{stored[0]} compiled from the edge store")
+        else:
+            self._try_refresh()
+        self._thread = threading.Thread(
+            target=self._run, args=(stored is not None,), name="policy-sync", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def refresh(self):
+        params = {"since": self.engine.version} if self.engine.loaded else {}
+        response = requests.get(
+            f"{settings.BACKEND_API_URL}/api/access-policy/",
+            params=params,
+            timeout=settings.GALLERY_LOAD_TIMEOUT
+        )
+        response.raise_for_status()
+        snapshot = response.json()
+        self.refreshes += 1
+        self.last_refresh = time.time()
+        if snapshot["changed"]:
+            doors = self.engine.load(snapshot)
+            if self.store is not None:
+                self.store.put(POLICY, snapshot["version"], snapshot)
+            logger.info(f"Access policy v{snapshot['version']} compiled, {doors} doors rebuilt "
+                        f"in {self.engine.last_compile_ms:.1f} ms")
+
+    def _try_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Could not load access policy: {str(e)}")
+
+    def _run(self, refresh_first=False):
+        if refresh_first:
+            self._try_refresh()
+        while not self._stop.wait(self.interval):
+            self._try_refresh()
+
+    def stats(self):
+        return {
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+            "last_refresh": self.last_refresh,
+        }
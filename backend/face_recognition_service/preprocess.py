@@ -0,0 +1,149 @@
+import io
+from typing import NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# JPEG decoders can skip DCT work at 1/2, 1/4 and 1/8 scale
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+class PreprocessOptions(NamedTuple):
+    """
+    Per-request pre-processing; picklable so it crosses into worker processes.
+
+    ``target_side`` is the smallest long side detection should see (0
+    decodes at full resolution) and ``roi`` a relative (x, y, width,
+    height) region of the frame to run detection on.
+    """
+    target_side: int = 0
+    roi: Optional[Tuple[float, float, float, float]] = None
+
+
+class InvalidImageError(Exception):
+    pass
+
+
+def image_size(contents):
+    """(width, height) from the image header without decoding pixels, or None."""
+    try:
+        return Image.open(io.BytesIO(contents)).size
+    except Exception:
+        return None
+
+
+def choose_scale(size, target_side):
+    """Largest reduction (1, 2, 4 or 8) that keeps the long side >= target_side."""
+    scale = 1
+    if not target_side or size is None:
+        return scale
+    long_side = max(size)
+    while scale < 8 and long_side / (scale * 2) >= target_side:
+        scale *= 2
+    return scale
+
+
+def decode(contents, scale=1):
+    image = cv2.imdecode(np.frombuffer(contents, np.uint8), REDUCED_FLAGS[scale])
+    if image is None:
+        raise InvalidImageError("Invalid image")
+    return image
+
+
+def roi_slice(shape, roi):
+    """Pixel bounds (x1, y1, x2, y2) of a relative ROI, clamped to the image."""
+    h, w = shape[:2]
+    x, y, width, height = roi
+    x1, y1 = max(0, int(x * w)), max(0, int(y * h))
+    x2, y2 = min(w, int(round((x + width) * w))), min(h, int(round((y + height) * h)))
+    if x2 - x1 < 2 or y2 - y1 < 2:
+        return 0, 0, w, h
+    return x1, y1, x2, y2
+
+
+class PreparedImage:
+    """
+    An image ready for detection: possibly decoded at reduced resolution and
+    cropped to the door's ROI. Bounding boxes found on ``detect_image`` are
+    mapped back to relative frame coordinates by ``frame_bbox``, and
+    ``face_crop`` only decodes the full-resolution image when the reduced
+    one is too small for the embedder.
+    """
+
+    def __init__(self, image, scale=1, roi=None, contents=None, full=None, size=None):
+        self.image = image
+        self.scale = scale
+        self.contents = contents
+        self._full = full
+        h, w = image.shape[:2]
+        # Full-resolution dimensions, as reported to clients
+        self.width, self.height = size or (w * scale, h * scale)
+        self.bounds = roi_slice(image.shape, roi) if roi else (0, 0, w, h)
+        x1, y1, x2, y2 = self.bounds
+        self.detect_image = image[y1:y2, x1:x2] if roi else image
+        self.full_decodes = 0
+
+    def frame_bbox(self, bbox):
+        """Map a bbox relative to detect_image to one relative to the whole frame."""
+        x1, y1, x2, y2 = self.bounds
+        h, w = self.image.shape[:2]
+        xmin, ymin, width, height = bbox
+        return (
+            (x1 + xmin * (x2 - x1)) / w,
+            (y1 + ymin * (y2 - y1)) / h,
+            width * (x2 - x1) / w,
+            height * (y2 - y1) / h,
+        )
+
+    def full(self):
+        if self._full is None:
+            self._full = decode(self.contents) if self.contents is not None else self.image
+            self.full_decodes += 1
+        return self._full
+
+    def face_crop(self, embedder, bbox):
+        """Crop a frame-relative bbox, going back to full resolution only if needed."""
+        crop = embedder.crop(self.image, bbox)
+        if crop is not None and min(crop.shape[:2]) >= embedder.input_size:
+            return crop
+        if self.scale > 1:
+            return embedder.crop(self.full(), bbox)
+        return crop
+
+
+def oriented_size(size, image, scale):
+    """
+    Header (width, height) matched to the decoded pixels. imdecode applies
+    the EXIF orientation, so a rotated JPEG decodes with the header's sides
+    swapped; the header still gives the exact size when decoding was reduced.
+    """
+    h, w = image.shape[:2]
+    if size is None:
+        return w * scale, h * scale
+    width, height = size
+    if abs(w * scale - width) + abs(h * scale - height) > abs(w * scale - height) + abs(h * scale - width):
+        return height, width
+    return width, height
+
+
+def prepare_upload(contents, options):
+    size = image_size(contents)
+    scale = choose_scale(size, options.target_side)
+    image = decode(contents, scale)
+    return PreparedImage(image, scale, options.roi, contents=contents, size=oriented_size(size, image, scale))
+
+
+def prepare_frame(frame, options):
+    """Camera frames are already decoded; downscale with INTER_AREA instead."""
+    h, w = frame.shape[:2]
+    scale = choose_scale((w, h), options.target_side)
+    if scale == 1:
+        return PreparedImage(frame, 1, options.roi)
+    small = cv2.resize(frame, (w // scale, h // scale), interpolation=cv2.INTER_AREA)
+    return PreparedImage(small, scale, options.roi, full=frame, size=(w, h))
@@ -0,0 +1,116 @@
+"""
+Versioned on-disk gallery snapshots.
+
+A snapshot is a directory of plain .npy arrays plus meta.json:
+
+    <GALLERY_SNAPSHOT_DIR>/
+        CURRENT                      name of the live version
+        v000000001234-<pid>/
+            meta.json                kind, dim, count, watermark, tombstones, created_at
+            vectors.npy labels.npy row_ids.npy [centroids.npy list_sizes.npy]
+
+Arrays are opened with mmap_mode="r", so every worker process on the host
+maps the same page-cache copy instead of holding its own matrix.
+
+Tombstones not yet compacted away are part of the snapshot: the change
+feed resumes after the watermark, so a deactivation it already delivered
+would otherwise never be applied again.
+"""
+import json
+import logging
+import os
+import shutil
+import time
+
+import numpy as np
+
+from index import create_index
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+CURRENT_FILE = "CURRENT"
+KEEP_VERSIONS = 2
+
+
+def write_snapshot(index, directory, watermark, state=None, user_tombstones=(), row_tombstones=()):
+    """
+    Write ``index`` (or its already captured ``state``) as the current
+    version. Callers that mutate the index concurrently take ``state``
+    under their own lock.
+    """
+    os.makedirs(directory, exist_ok=True)
+    started = time.perf_counter()
+    name = f"v{watermark:012d}-{os.getpid()}"
+    tmp_path = os.path.join(directory, f".{name}.tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    
+    state = state if state is not None else index.state()
+    for key, array in state.items():
+        np.save(os.path.join(tmp_path, f"{key}.npy"), np.ascontiguousarray(array))
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "kind": index.kind,
+        "dim": index.dim,
+        "count": int(state["labels"].shape[0]),
+        "watermark": watermark,
+        "user_tombstones": sorted(int(user_id) for user_id in user_tombstones),
+        "row_tombstones": sorted(int(row_id) for row_id in row_tombstones),
+        "created_at": time.time(),
+    }
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    
+    final_path = os.path.join(directory, name)
+    shutil.rmtree(final_path, ignore_errors=True)
+    os.rename(tmp_path, final_path)
+    # Flip CURRENT atomically; readers see either the old or the new version
+    pointer_tmp = os.path.join(directory, f".{CURRENT_FILE}.{os.getpid()}")
+    with open(pointer_tmp, "w") as f:
+        f.write(name)
+    os.replace(pointer_tmp, os.path.join(directory, CURRENT_FILE))
+    
+    prune_snapshots(directory, keep=name)
+    logger.info(
+        f"Wrote gallery snapshot {name}: {meta['count']} templates "
+        f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+    )
+    return name
+
+
+def prune_snapshots(directory, keep):
+    versions = sorted(
+        entry for entry in os.listdir(directory)
+        if entry.startswith("v") and os.path.isdir(os.path.join(directory, entry))
+    )
+    # Unlinking a mapped file is safe on POSIX; open maps stay valid
+    for entry in versions[:-KEEP_VERSIONS]:
+        if entry != keep:
+            shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+
+
+def open_snapshot(directory, **index_options):
+    """
+    Memory-map the current snapshot.
+    Returns (index, meta) or (None, None) when there is no usable snapshot.
+    """
+    pointer = os.path.join(directory, CURRENT_FILE)
+    if not os.path.exists(pointer):
+        return None, None
+    with open(pointer) as f:
+        name = f.read().strip()
+    path = os.path.join(directory, name)
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta.get("format_version") != FORMAT_VERSION:
+        logger.warning(f"Ignoring snapshot {name} with format {meta.get('format_version')}")
+        return None, None
+    
+    state = {
+        entry[:-4]: np.load(os.path.join(path, entry), mmap_mode="r")
+        for entry in os.listdir(path) if entry.endswith(".npy")
+    }
+    index = create_index(meta["kind"], **index_options).restore(state)
+    meta["name"] = name
+    return index, meta
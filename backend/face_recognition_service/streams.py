@@ -0,0 +1,329 @@
+"""
+Continuous camera ingestion for doors with a camera_url.
+
+Every stream gets two dedicated threads: a grabber that reads and decodes
+frames as fast as the source produces them, keeping only the newest one,
+and a worker that samples that slot at a fixed rate, skips frames without
+motion and hands the rest to the recognition callback. A slow callback
+therefore never builds a backlog; frames it could not keep up with are
+simply overwritten and counted as stale.
+
+Run directly to try a video file or RTSP URL without the backend:
+    python streams.py --source door.mp4 --fps 5
+"""
+import logging
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def is_file_source(url):
+    return "://" not in url
+
+
+class FrameGrabber:
+    """
+    Reads a capture source on its own thread and keeps only the latest frame.
+
+    Network sources are reopened after ``reconnect_delay`` when they fail.
+    Local files are paced at their native frame rate and looped so they
+    behave like a live camera.
+    """
+
+    def __init__(self, url, reconnect_delay=2.0):
+        self.url = url
+        self.reconnect_delay = reconnect_delay
+        self.frames = 0
+        self.stale = 0
+        self.reconnects = 0
+        self._frame = None
+        self._seq = 0
+        self._taken = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"grab-{self.url}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def latest(self, after=0, timeout=1.0):
+        """Return (seq, frame) newer than ``after``, or None on timeout."""
+        with self._cond:
+            if self._seq <= after:
+                self._cond.wait(timeout)
+            if self._seq <= after or self._frame is None:
+                return None
+            self._taken = self._seq
+            return self._seq, self._frame
+
+    def _publish(self, frame):
+        with self._cond:
+            if self._seq > self._taken:
+                # Previous frame was never picked up
+                self.stale += 1
+            self._frame = frame
+            self._seq += 1
+            self.frames += 1
+            self._cond.notify_all()
+
+    def _open(self):
+        capture = cv2.VideoCapture(self.url)
+        if not capture.isOpened():
+            capture.release()
+            return None
+        # Ask the backend not to queue frames on our behalf
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return capture
+
+    def _run(self):
+        file_source = is_file_source(self.url)
+        while not self._stop.is_set():
+            capture = self._open()
+            if capture is None:
+                logger.warning(f"Could not open camera {self.url}, retrying in {self.reconnect_delay}s")
+                self.reconnects += 1
+                self._stop.wait(self.reconnect_delay)
+                continue
+            interval = 0.0
+            if file_source:
+                fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+                interval = 1.0 / fps
+            next_at = time.monotonic()
+            while not self._stop.is_set():
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                self._publish(frame)
+                if interval:
+                    next_at += interval
+                    delay = next_at - time.monotonic()
+                    if delay > 0:
+                        self._stop.wait(delay)
+            capture.release()
+            if not file_source and not self._stop.is_set():
+                self.reconnects += 1
+                logger.warning(f"Camera {self.url} dropped, reconnecting")
+                self._stop.wait(self.reconnect_delay)
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "stale": self.stale,
+            "reconnects": self.reconnects,
+        }
+
+
+class MotionDetector:
+    """
+    Cheap frame differencing on a small blurred grey copy of the frame.
+    A frame has motion when at least ``min_area`` of its pixels changed by
+    more than ``threshold`` grey levels since the previous sampled frame.
+    """
+
+    def __init__(self, threshold=25, min_area=0.01, width=160):
+        self.threshold = threshold
+        self.min_area = min_area
+        self.width = width
+        self._previous = None
+
+    def __call__(self, frame):
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, h * self.width // w)), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        previous, self._previous = self._previous, gray
+        if previous is None:
+            return True
+        changed = np.count_nonzero(cv2.absdiff(gray, previous) > self.threshold)
+        return changed >= self.min_area * gray.size
+
+
+class DoorStream:
+    """One door's camera: a FrameGrabber plus a sampling worker thread."""
+
+    def __init__(self, door_id, url, process, fps=5.0, motion_threshold=25,
+                 motion_min_area=0.01, reconnect_delay=2.0):
+        self.door_id = door_id
+        self.url = url
+        self.process = process
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self.grabber = FrameGrabber(url, reconnect_delay)
+        self.motion = MotionDetector(motion_threshold, motion_min_area)
+        self.sampled = 0
+        self.still = 0
+        self.processed = 0
+        self.errors = 0
+        self.last_process_ms = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.grabber.start()
+        self._thread = threading.Thread(target=self._run, name=f"door-{self.door_id}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.grabber.stop()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        seq = 0
+        next_at = time.monotonic()
+        while not self._stop.is_set():
+            latest = self.grabber.latest(after=seq)
+            if latest is None:
+                continue
+            seq, frame = latest
+            self.sampled += 1
+            if self.motion(frame):
+                started = time.perf_counter()
+                try:
+                    self.process(self.door_id, frame)
+                    self.processed += 1
+                except Exception as e:
+                    self.errors += 1
+                    logger.warning(f"Door {self.door_id} frame failed: {str(e)}")
+                self.last_process_ms = (time.perf_counter() - started) * 1000
+            else:
+                self.still += 1
+            next_at = max(next_at + self.interval, time.monotonic())
+            self._stop.wait(next_at - time.monotonic())
+
+    def stats(self):
+        return {
+            "door_id": self.door_id,
+            "url": self.url,
+            "sampled": self.sampled,
+            "still": self.still,
+            "processed": self.processed,
+            "errors": self.errors,
+            "last_process_ms": round(self.last_process_ms, 2),
+            **self.grabber.stats(),
+        }
+
+
+def parse_sources(value):
+    """Parse "1=rtsp://cam/1,2=door2.mp4" into {door_id: url}."""
+    sources = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        door_id, url = item.split("=", 1)
+        sources[int(door_id)] = url.strip()
+    return sources
+
+
+class StreamManager:
+    """
+    Keeps one DoorStream per active camera door, re-reading the door list
+    from ``door_config`` periodically. STREAM_SOURCES overrides the backend
+    list, which is handy for testing with local files.
+    """
+
+    def __init__(self, process, door_config=None, fps=5.0, motion_threshold=25, motion_min_area=0.01,
+                 reconnect_delay=2.0, refresh_interval=30.0, sources=""):
+        self.process = process
+        self.door_config = door_config
+        self.fps = fps
+        self.motion_threshold = motion_threshold
+        self.motion_min_area = motion_min_area
+        self.reconnect_delay = reconnect_delay
+        self.refresh_interval = refresh_interval
+        self.sources = parse_sources(sources) if sources else None
+        self.streams = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stream-manager", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        with self._lock:
+            streams, self.streams = list(self.streams.values()), {}
+        for stream in streams:
+            stream.stop()
+
+    def sync(self, sources):
+        """Start streams for new or changed doors and stop removed ones."""
+        with self._lock:
+            for door_id in list(self.streams):
+                if sources.get(door_id) != self.streams[door_id].url:
+                    self.streams.pop(door_id).stop()
+            for door_id, url in sources.items():
+                if door_id not in self.streams:
+                    stream = DoorStream(
+                        door_id, url, self.process,
+                        fps=self.fps,
+                        motion_threshold=self.motion_threshold,
+                        motion_min_area=self.motion_min_area,
+                        reconnect_delay=self.reconnect_delay
+                    )
+                    stream.start()
+                    self.streams[door_id] = stream
+                    logger.info(f"Streaming door {door_id} from {url}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sync(self.sources if self.sources is not None else self.door_config.camera_sources())
+            except Exception as e:
+                logger.warning(f"Could not refresh camera doors: {str(e)}")
+            self._stop.wait(self.refresh_interval)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "fps": self.fps,
+                "streams": [stream.stats() for stream in self.streams.values()],
+            }
+
+
+if __name__ == "__main__":
+    import argparse
+    import inference
+    from preprocess import PreprocessOptions
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", required=True, help="Video file or camera URL")
+    parser.add_argument("--fps", type=float, default=settings.STREAM_SAMPLE_FPS)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--roi", type=float, nargs=4, metavar=("X", "Y", "W", "H"))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    inference.init_worker(1, settings.DETECTOR_MODEL_SELECTION, settings.DETECTOR_MIN_CONFIDENCE,
+                          settings.FACE_EMBEDDING_MODEL)
+
+    options = PreprocessOptions(settings.PREPROCESS_TARGET_SIDE, tuple(args.roi) if args.roi else None)
+
+    def show(door_id, frame):
+        result = inference.detect_and_embed(frame, settings.DETECTOR_ACQUIRE_TIMEOUT, options, time.time() + 5)
+        scores = ", ".join(f"{d['score']:.2f}" for d in result["detections"])
+        print(f"frame {frame.shape[1]}x{frame.shape[0]}: {len(result['detections'])} faces [{scores}]")
+
+    stream = DoorStream(0, args.source, show, fps=args.fps,
+                        motion_threshold=settings.STREAM_MOTION_THRESHOLD,
+                        motion_min_area=settings.STREAM_MOTION_MIN_AREA)
+    stream.start()
+    time.sleep(args.seconds)
+    stream.stop()
+    inference.close_worker()
+    print(stream.stats())
@@ -0,0 +1,139 @@
+import itertools
+import threading
+import time
+
+import numpy as np
+
+
+def iou(a, b):
+    """Intersection over union of two relative (xmin, ymin, width, height) boxes."""
+    ax2, ay2 = a[0] + a[2], a[1] + a[3]
+    bx2, by2 = b[0] + b[2], b[1] + b[3]
+    inter_w = min(ax2, bx2) - max(a[0], b[0])
+    inter_h = min(ay2, by2) - max(a[1], b[1])
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    inter = inter_w * inter_h
+    return inter / (a[2] * a[3] + b[2] * b[3] - inter)
+
+
+class Track:
+    """One face followed across consecutive frames at a door."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, bbox, now):
+        self.id = next(self._ids)
+        self.bbox = bbox
+        self.embedding = None
+        self.decision = None
+        self.first_seen = now
+        self.last_seen = now
+        self.hits = 0
+        self.logged_key = None
+        self.logged_at = None
+
+
+class FaceTracker:
+    """
+    Per-door face tracks so a person standing at a door is recognised and
+    logged once instead of on every frame.
+
+    A detection joins an existing track of the same door when its box
+    overlaps the track's last box (IoU) and its embedding is close to the
+    track's, or, failing the overlap, on embedding alone. Tracks expire
+    after ``ttl`` seconds without a detection. Every detection is still
+    embedded, matched and decided; the track only decides whether the
+    outcome is logged: again only when it changes or ``log_window`` seconds
+    have passed since its last log.
+    """
+
+    def __init__(self, ttl=2.0, iou_threshold=0.3, similarity_threshold=0.6, log_window=30.0):
+        self.ttl = ttl
+        self.iou_threshold = iou_threshold
+        self.similarity_threshold = similarity_threshold
+        self.log_window = log_window
+        self._doors = {}
+        self._lock = threading.Lock()
+        self.detections = 0
+        self.tracks = 0
+        self.logs_written = 0
+        self.logs_suppressed = 0
+
+    def _live_tracks(self, door_id, now):
+        tracks = [t for t in self._doors.get(door_id, []) if now - t.last_seen <= self.ttl]
+        self._doors[door_id] = tracks
+        return tracks
+
+    def _same_face(self, track, embedding):
+        if track.embedding is None or embedding is None:
+            return track.embedding is None and embedding is None
+        return float(np.dot(track.embedding, embedding)) >= self.similarity_threshold
+
+    def find(self, door_id, bbox, embedding, now=None):
+        """
+        Live track a detection continues, or None. An overlapping box alone
+        is not enough: someone stepping into the previous person's place
+        overlaps too, so the embeddings must agree as well.
+        """
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            self.detections += 1
+            tracks = self._live_tracks(door_id, now)
+            best, best_iou = None, self.iou_threshold
+            for track in tracks:
+                overlap = iou(track.bbox, bbox)
+                if overlap >= best_iou and self._same_face(track, embedding):
+                    best, best_iou = track, overlap
+            if best is not None or embedding is None:
+                return best
+            best_score = self.similarity_threshold
+            for track in tracks:
+                if track.embedding is None:
+                    continue
+                score = float(np.dot(track.embedding, embedding))
+                if score >= best_score:
+                    best, best_score = track, score
+            return best
+
+    def update(self, door_id, track, bbox, decision, embedding=None, now=None):
+        """Record a detection on ``track`` (a new track when None) and return it."""
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            if track is None:
+                track = Track(bbox, now)
+                self._doors.setdefault(door_id, []).append(track)
+                self.tracks += 1
+            track.bbox = bbox
+            track.last_seen = now
+            track.hits += 1
+            track.decision = decision
+            track.embedding = embedding
+            return track
+
+    def should_log(self, track, now=None):
+        """True when the track's current decision still needs an access log."""
+        now = now if now is not None else time.monotonic()
+        key = (track.decision["log_status"], track.decision["user_id"])
+        with self._lock:
+            if key == track.logged_key and now - track.logged_at < self.log_window:
+                self.logs_suppressed += 1
+                return False
+            track.logged_key, track.logged_at = key, now
+            self.logs_written += 1
+            return True
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "ttl_s": self.ttl,
+                "log_window_s": self.log_window,
+                "active_tracks": sum(
+                    1 for tracks in self._doors.values() for t in tracks if now - t.last_seen <= self.ttl
+                ),
+                "tracks": self.tracks,
+                "detections": self.detections,
+                "logs_written": self.logs_written,
+                "logs_suppressed": self.logs_suppressed,
+            }
@@ -0,0 +1,42 @@
+"""
+Fast path for large list responses.
+
+List routes select plain column tuples and return them through
+``rows_response``, which skips ORM hydration, per-row pydantic validation
+and FastAPI's jsonable_encoder. The JSON matches what the response_model
+would produce: the same keys in the same order, with naive datetimes as
+ISO 8601 strings. orjson does the encoding when it is installed.
+"""
+import json
+from datetime import datetime
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def rows_response(rows, columns, headers=None) -> FastJSONResponse:
+    """Encode column tuples as a JSON array of objects keyed by ``columns``."""
+    return FastJSONResponse([dict(zip(columns, row)) for row in rows], headers=headers)
@@ -0,0 +1,35 @@
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from models import GalleryChange
+import change_counters
+
+# Actions understood by the face recognition service
+ADD = "add"
+REMOVE = "remove"
+ACTIVATE = "activate"
+DEACTIVATE = "deactivate"
+
+
+def record_change(db: Session, action: str, user_id: int, embedding_id: int = None):
+    """
+    Queue a change in the current transaction; committed with the caller's
+    data. Its id comes from the feed's counter, so ids commit in order.
+    """
+    db.add(GalleryChange(
+        id=change_counters.next_ids(db, GalleryChange),
+        action=action, user_id=user_id, embedding_id=embedding_id
+    ))
+
+
+def record_changes(db: Session, changes):
+    """record_change() for many (action, user_id, embedding_id) tuples in one INSERT."""
+    if changes:
+        first = change_counters.next_ids(db, GalleryChange, len(changes))
+        db.execute(insert(GalleryChange), [
+            {"id": first + i, "action": action, "user_id": user_id, "embedding_id": embedding_id}
+            for i, (action, user_id, embedding_id) in enumerate(changes)
+        ])
+
+
+def current_watermark(db: Session) -> int:
+    return change_counters.current(db, GalleryChange)
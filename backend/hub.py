@@ -0,0 +1,111 @@
+"""
+In-process pub/sub for live access events.
+
+Every committed access log is published once; the hub serialises it once
+and fans the same JSON string out to every subscribed WebSocket/SSE client
+whose door filter matches. Each client has a bounded buffer: when it is
+full the oldest event is dropped, and a client that keeps falling behind
+(more than max_dropped drops without once draining its buffer) is
+disconnected so it cannot hold memory or slow the others down.
+"""
+import asyncio
+from datetime import datetime
+import json
+import logging
+import threading
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class Subscriber:
+    def __init__(self, door_ids=None, buffer_size=100):
+        self.door_ids = set(door_ids) if door_ids else None
+        self.queue = asyncio.Queue(maxsize=buffer_size)
+        # Drops since the client last emptied its buffer
+        self.dropped = 0
+        self.closed = False
+
+    def wants(self, door_id):
+        return self.door_ids is None or door_id in self.door_ids
+
+
+class AccessLogHub:
+    def __init__(self, buffer_size=100, max_dropped=1000):
+        self.buffer_size = buffer_size
+        self.max_dropped = max_dropped
+        self._loop = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.disconnected = 0
+
+    def bind(self, loop):
+        """Attach to the server's event loop; publish() is a no-op until then."""
+        self._loop = loop
+
+    def subscribe(self, door_ids=None):
+        subscriber = Subscriber(door_ids, self.buffer_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        subscriber.closed = True
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event):
+        """
+        Publish an event dict (must contain door_id). Safe to call from the
+        threadpool that runs sync route handlers.
+        """
+        if self._loop is None or not self._subscribers:
+            return
+        message = json.dumps(event, default=_json_default)
+        self._loop.call_soon_threadsafe(self._fan_out, event["door_id"], message)
+
+    def _fan_out(self, door_id, message):
+        self.published += 1
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            if not subscriber.wants(door_id):
+                continue
+            queue = subscriber.queue
+            if queue.empty():
+                # Caught up since its last drop: a burst, not a slow client
+                subscriber.dropped = 0
+            elif queue.full():
+                # Slow consumer: drop its oldest event rather than block
+                queue.get_nowait()
+                subscriber.dropped += 1
+                self.dropped += 1
+                if subscriber.dropped > self.max_dropped:
+                    logger.warning("Disconnecting slow live-event subscriber")
+                    self.disconnected += 1
+                    self.unsubscribe(subscriber)
+                    continue
+            queue.put_nowait(message)
+            self.delivered += 1
+
+    def stats(self):
+        return {
+            "subscribers": len(self._subscribers),
+            "buffer_size": self.buffer_size,
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "disconnected": self.disconnected,
+        }
+
+
+hub = AccessLogHub(settings.LIVE_BUFFER_SIZE, settings.LIVE_MAX_DROPPED)
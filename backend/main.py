@@ -1,8 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database import Base, engine
+from database import Base, engine, async_engine
 from config import settings
 from routes import router
+from partitions import PartitionMaintainer
+from hub import hub
+from metrics import RequestTimer
+import asyncio
 
 # Create tables
 Base.metadata.create_all(bind=engine)
@@ -21,11 +25,34 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(RequestTimer)
 
 # Include routes
 app.include_router(router)
 
+# Keep monthly access log partitions ahead of time and apply retention
+partition_maintainer = PartitionMaintainer(settings.ACCESS_LOG_MAINTENANCE_INTERVAL_HOURS)
+
+@app.on_event("startup")
+async def bind_live_hub():
+    # Sync routes run in the threadpool and publish onto this loop
+    hub.bind(asyncio.get_running_loop())
+
+@app.on_event("startup")
+def startup():
+    partition_maintainer.start()
+
+@app.on_event("shutdown")
+def shutdown():
+    partition_maintainer.stop()
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    if async_engine is not None:
+        await async_engine.dispose()
+
 # Health check
 @app.get("/health")
 def health_check():
@@ -0,0 +1,47 @@
+"""
+Prometheus metrics for the backend.
+
+Access-log routes time their stages (cache lookups, rollup upsert, commit,
+live publish, ...) into one histogram labelled by route and stage with
+span(). Gauges are not updated on the request path: StatsCollector reads
+the pool, hub and cache stats() when /metrics is scraped.
+
+StatsCollector, render() and the RequestTimer base live in telemetry.py,
+which the face service imports too.
+"""
+import time
+from contextlib import contextmanager
+
+from prometheus_client import Histogram
+
+import telemetry
+from telemetry import register_stats, render
+
+# Seconds; from cache hits up to slow commits and large list queries
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+STAGE_SECONDS = Histogram(
+    "access_log_stage_seconds", "Time spent in each stage of the access-log routes",
+    ["route", "stage"], buckets=BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    "http_request_seconds", "HTTP request latency", ["method", "route", "status"], buckets=BUCKETS
+)
+
+_stages = {}
+
+
+@contextmanager
+def span(route, stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        child = _stages.get((route, stage))
+        if child is None:
+            child = _stages.setdefault((route, stage), STAGE_SECONDS.labels(route, stage))
+        child.observe(time.perf_counter() - started)
+
+
+class RequestTimer(telemetry.RequestTimer):
+    histogram = REQUEST_SECONDS
@@ -0,0 +1,28 @@
+"""
+Add the region-of-interest columns (roi_x, roi_y, roi_width, roi_height)
+to an existing doors table. New databases get them from create_all.
+
+Usage: python migrate_door_roi.py
+
+Safe to re-run: columns that already exist are left alone.
+"""
+from sqlalchemy import inspect, text, Float
+
+from database import engine
+
+TABLE = "doors"
+COLUMNS = ("roi_x", "roi_y", "roi_width", "roi_height")
+
+
+def migrate():
+    existing = {c["name"] for c in inspect(engine).get_columns(TABLE)}
+    float_type = Float().compile(dialect=engine.dialect)
+    added = [name for name in COLUMNS if name not in existing]
+    with engine.begin() as conn:
+        for name in added:
+            conn.execute(text(f"ALTER TABLE {TABLE} ADD COLUMN {name} {float_type}"))
+    print(f"Added {', '.join(added)}" if added else "ROI columns already present, nothing to do")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,77 @@
+"""
+Convert face_embeddings.embedding from JSON text to the binary format in
+embedding_codec.
+
+Usage: python migrate_embeddings.py [--dtype float32|float16|int8] [--batch-size 1000]
+
+Safe to re-run: a column that is already binary is left alone.
+"""
+import argparse
+import json
+import time
+
+from sqlalchemy import inspect, text, LargeBinary
+
+import embedding_codec
+from config import settings
+from database import engine
+
+TABLE = "face_embeddings"
+
+
+def is_binary(column_type) -> bool:
+    return isinstance(column_type, LargeBinary) or column_type.__class__.__name__.upper() in ("BYTEA", "BLOB")
+
+
+def migrate(dtype: str, batch_size: int):
+    columns = {c["name"]: c for c in inspect(engine).get_columns(TABLE)}
+    if "embedding" not in columns:
+        print(f"Table {TABLE} has no embedding column, nothing to do")
+        return
+    if is_binary(columns["embedding"]["type"]):
+        print("embedding column is already binary, nothing to do")
+        return
+    
+    blob_type = LargeBinary().compile(dialect=engine.dialect)
+    started = time.perf_counter()
+    converted = 0
+    
+    # PostgreSQL runs the DDL and data copy in one transaction; SQLite >= 3.35
+    # is needed for DROP COLUMN.
+    with engine.begin() as conn:
+        if "embedding_bin" not in columns:
+            conn.execute(text(f"ALTER TABLE {TABLE} ADD COLUMN embedding_bin {blob_type}"))
+        
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                text(f"SELECT id, embedding FROM {TABLE} WHERE id > :last_id ORDER BY id LIMIT :limit"),
+                {"last_id": last_id, "limit": batch_size}
+            ).all()
+            if not rows:
+                break
+            conn.execute(
+                text(f"UPDATE {TABLE} SET embedding_bin = :blob WHERE id = :id"),
+                [
+                    {"id": row.id, "blob": embedding_codec.encode(json.loads(row.embedding), dtype)}
+                    for row in rows
+                ]
+            )
+            converted += len(rows)
+            last_id = rows[-1].id
+            print(f"  converted {converted} rows")
+        
+        conn.execute(text(f"ALTER TABLE {TABLE} DROP COLUMN embedding"))
+        conn.execute(text(f"ALTER TABLE {TABLE} RENAME COLUMN embedding_bin TO embedding"))
+        if engine.dialect.name == "postgresql":
+            conn.execute(text(f"ALTER TABLE {TABLE} ALTER COLUMN embedding SET NOT NULL"))
+    
+    print(f"Migrated {converted} embeddings to {dtype} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dtype", default=settings.EMBEDDING_STORAGE_DTYPE, choices=list(embedding_codec.DTYPES))
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    migrate(args.dtype, args.batch_size)
@@ -1,5 +1,5 @@
-from database import Base
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Boolean, Text
+from database import Base, ACCESS_LOG_PARTITIONED
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Boolean, Text, LargeBinary, Index, UniqueConstraint, Table
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -23,7 +23,8 @@ class FaceEmbedding(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    embedding = Column(Text, nullable=False)
+    # Binary blob, see embedding_codec for the layout
+    embedding = Column(LargeBinary, nullable=False)
     photo_filename = Column(String(255), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -38,6 +39,11 @@ class Door(Base):
     location = Column(String(255), nullable=True)
     device_id = Column(String(50), unique=True, nullable=False)
     camera_url = Column(String(255), nullable=True)
+    # Region of interest for face detection, relative to the frame (0..1)
+    roi_x = Column(Float, nullable=True)
+    roi_y = Column(Float, nullable=True)
+    roi_width = Column(Float, nullable=True)
+    roi_height = Column(Float, nullable=True)
     status = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -46,11 +52,19 @@ class Door(Base):
 
 class AccessLog(Base):
     __tablename__ = "access_logs"
+    __table_args__ = (
+        Index("ix_access_logs_timestamp_id", "timestamp", "id"),
+        Index("ix_access_logs_door_id_timestamp", "door_id", "timestamp"),
+        Index("ix_access_logs_user_id_timestamp", "user_id", "timestamp"),
+        # Partitioned by month on PostgreSQL; see partitions.py
+        {"postgresql_partition_by": "RANGE (timestamp)"} if ACCESS_LOG_PARTITIONED else {},
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    # The partition key has to be part of the primary key
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     door_id = Column(Integer, ForeignKey("doors.id"), nullable=False)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, primary_key=ACCESS_LOG_PARTITIONED)
     status = Column(String(20), default="success")
     confidence_score = Column(Float, nullable=True)
     photo_filename = Column(String(255), nullable=True)
@@ -58,3 +72,119 @@ class AccessLog(Base):
     
     user = relationship("User", back_populates="access_logs")
     door = relationship("Door", back_populates="access_logs")
+
+
+class GalleryChange(Base):
+    """
+    Append-only change feed consumed by the face recognition service to keep
+    its in-memory gallery in sync without full reloads. Ids come from the
+    feed's ChangeCounter, so they become visible in commit order.
+    """
+    __tablename__ = "gallery_changes"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    action = Column(String(20), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    embedding_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ChangeCounter(Base):
+    """Last id handed out by each change feed; see change_counters.py."""
+    __tablename__ = "change_counters"
+    
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+class AccessStat(Base):
+    """
+    Pre-aggregated access log counts per time bucket, door, user and status.
+    Maintained incrementally by rollups.record(); user_id 0 means unknown face.
+    """
+    __tablename__ = "access_stats"
+    __table_args__ = (
+        UniqueConstraint("granularity", "bucket_start", "door_id", "user_id", "status", name="uq_access_stats_bucket"),
+        Index("ix_access_stats_granularity_bucket", "granularity", "bucket_start"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    granularity = Column(String(10), nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    door_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=False, default=0)
+    status = Column(String(20), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+
+user_group_members = Table(
+    "user_group_members",
+    Base.metadata,
+    Column("user_group_id", Integer, ForeignKey("user_groups.id"), primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True, index=True),
+)
+
+door_group_members = Table(
+    "door_group_members",
+    Base.metadata,
+    Column("door_group_id", Integer, ForeignKey("door_groups.id"), primary_key=True),
+    Column("door_id", Integer, ForeignKey("doors.id"), primary_key=True, index=True),
+)
+
+
+class UserGroup(Base):
+    __tablename__ = "user_groups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), unique=True, nullable=False)
+    description = Column(String(255), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    users = relationship("User", secondary=user_group_members)
+
+
+class DoorGroup(Base):
+    __tablename__ = "door_groups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), unique=True, nullable=False)
+    description = Column(String(255), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    doors = relationship("Door", secondary=door_group_members)
+
+
+class AccessRule(Base):
+    """
+    Members of a user group may open the doors of a door group during a
+    weekly time window: ``days`` is a bitmask (bit 0 = Monday) of the days
+    the window starts on and the window runs from ``start_minute`` to
+    ``end_minute`` after midnight. A window with start >= end runs past
+    midnight into the next day.
+    """
+    __tablename__ = "access_rules"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=True)
+    user_group_id = Column(Integer, ForeignKey("user_groups.id"), nullable=False, index=True)
+    door_group_id = Column(Integer, ForeignKey("door_groups.id"), nullable=False, index=True)
+    days = Column(Integer, nullable=False, default=127)
+    start_minute = Column(Integer, nullable=False, default=0)
+    end_minute = Column(Integer, nullable=False, default=1440)
+    status = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class PolicyChange(Base):
+    """
+    Append-only log of changes that affect access decisions (groups, rules,
+    user and door status). Ids come from the feed's ChangeCounter, whose
+    value is the policy version the face recognition service polls before
+    fetching a new snapshot.
+    """
+    __tablename__ = "policy_changes"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    entity = Column(String(20), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
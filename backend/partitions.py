@@ -0,0 +1,214 @@
+"""
+Monthly range partitions for access_logs.
+
+On PostgreSQL access_logs is a partitioned table with one child table per
+calendar month (access_logs_y2024m05) plus a default partition that
+catches anything outside the pre-created range. When a month is created
+after the default already holds rows for it, those rows are moved into
+the new partition (PostgreSQL refuses the CREATE otherwise). Retention drops whole
+partitions instead of deleting rows. On other databases (SQLite for local
+development) the table is unpartitioned and retention falls back to a
+row delete.
+
+Usage:
+    python partitions.py maintain      create upcoming partitions, drop expired ones
+    python partitions.py convert       turn an existing plain access_logs table into a partitioned one
+"""
+import argparse
+import logging
+import re
+import threading
+from datetime import datetime
+
+from sqlalchemy import text
+
+import rollups
+from config import settings
+from database import engine, SessionLocal, ACCESS_LOG_PARTITIONED
+
+logger = logging.getLogger(__name__)
+
+TABLE = "access_logs"
+DEFAULT_PARTITION = f"{TABLE}_default"
+PARTITION_PATTERN = re.compile(rf"^{TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(start: datetime) -> str:
+    return f"{TABLE}_y{start.year:04d}m{start.month:02d}"
+
+
+def is_partitioned(conn) -> bool:
+    return bool(conn.execute(
+        text("SELECT 1 FROM pg_class WHERE relname = :name AND relkind = 'p'"),
+        {"name": TABLE}
+    ).scalar())
+
+
+def list_partitions(conn) -> list:
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :name"
+    ), {"name": TABLE}).scalars().all()
+    return sorted(rows)
+
+
+def table_exists(conn, name: str) -> bool:
+    return bool(conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar())
+
+
+def create_partition(conn, start: datetime):
+    """
+    Create the month's partition. Rows for that month already sitting in
+    the default partition would make the CREATE fail, so the default is
+    detached, its rows for the month moved into the new partition and the
+    default reattached, all in the caller's transaction.
+    """
+    name = partition_name(start)
+    if table_exists(conn, name):
+        return
+    end = add_months(start, 1)
+    bounds = f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+    in_range = "timestamp >= :start AND timestamp < :end"
+    stranded = table_exists(conn, DEFAULT_PARTITION) and conn.execute(
+        text(f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range} LIMIT 1"), {"start": start, "end": end}
+    ).scalar()
+    if not stranded:
+        conn.execute(text(f"CREATE TABLE {name} PARTITION OF {TABLE} {bounds}"))
+        return
+    
+    conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+    conn.execute(text(f"CREATE TABLE {name} PARTITION OF {TABLE} {bounds}"))
+    moved = conn.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), {"start": start, "end": end}).rowcount
+    conn.execute(text(f"ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    logger.info(f"Moved {moved} rows from {DEFAULT_PARTITION} into new partition {name}")
+
+
+def ensure_partitions(conn, months_ahead: int, now: datetime = None, months_back: int = 1):
+    """Create partitions from ``months_back`` before now through ``months_ahead`` after."""
+    current = month_start(now or datetime.utcnow())
+    for offset in range(-months_back, months_ahead + 1):
+        create_partition(conn, add_months(current, offset))
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+
+
+def drop_expired_partitions(conn, retention_months: int, now: datetime = None) -> list:
+    """Detach and drop every monthly partition that ends before the retention cutoff."""
+    cutoff = add_months(month_start(now or datetime.utcnow()), -retention_months)
+    dropped = []
+    for name in list_partitions(conn):
+        match = PARTITION_PATTERN.match(name)
+        if not match:
+            continue
+        start = datetime(int(match.group(1)), int(match.group(2)), 1)
+        if add_months(start, 1) <= cutoff:
+            conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+            conn.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return dropped
+
+
+def delete_expired_rows(conn, retention_months: int, now: datetime = None) -> int:
+    cutoff = add_months(month_start(now or datetime.utcnow()), -retention_months)
+    return conn.execute(text(f"DELETE FROM {TABLE} WHERE timestamp < :cutoff"), {"cutoff": cutoff}).rowcount
+
+
+def maintain():
+    retention = settings.ACCESS_LOG_RETENTION_MONTHS
+    with engine.begin() as conn:
+        if ACCESS_LOG_PARTITIONED and is_partitioned(conn):
+            ensure_partitions(conn, settings.ACCESS_LOG_PREMAKE_MONTHS)
+            if retention > 0:
+                dropped = drop_expired_partitions(conn, retention)
+                logger.info(f"Dropped {len(dropped)} expired access log partitions: {dropped}")
+        else:
+            if ACCESS_LOG_PARTITIONED:
+                logger.warning(f"{TABLE} is not partitioned yet; run 'python partitions.py convert'")
+            if retention > 0:
+                deleted = delete_expired_rows(conn, retention)
+                logger.info(f"Access log retention removed {deleted} rows")
+    with SessionLocal() as db:
+        rollups.prune(db)
+
+
+def convert():
+    """
+    Rebuild a plain access_logs table as a partitioned one in a single
+    transaction. The old table is kept as access_logs_legacy.
+    """
+    from models import AccessLog
+    with engine.begin() as conn:
+        if is_partitioned(conn):
+            print(f"{TABLE} is already partitioned")
+            return
+        conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_legacy"))
+        # Index names are global in PostgreSQL; free them for the new table
+        for index in AccessLog.__table__.indexes:
+            conn.execute(text(f"ALTER INDEX IF EXISTS {index.name} RENAME TO {index.name}_legacy"))
+        conn.execute(text(f"ALTER SEQUENCE IF EXISTS {TABLE}_id_seq RENAME TO {TABLE}_legacy_id_seq"))
+        AccessLog.__table__.create(conn)
+        
+        first, last = conn.execute(text(f"SELECT min(timestamp), max(timestamp) FROM {TABLE}_legacy")).one()
+        now = datetime.utcnow()
+        start = month_start(first or now)
+        months_back = (now.year - start.year) * 12 + now.month - start.month
+        ensure_partitions(conn, settings.ACCESS_LOG_PREMAKE_MONTHS, now=now, months_back=max(1, months_back))
+        
+        columns = ", ".join(c.name for c in AccessLog.__table__.columns)
+        copied = conn.execute(text(
+            f"INSERT INTO {TABLE} ({columns}) SELECT {columns} FROM {TABLE}_legacy"
+        )).rowcount
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), COALESCE((SELECT max(id) FROM {TABLE}), 1))"
+        ))
+    print(f"Converted {TABLE}: {copied} rows copied, old table kept as {TABLE}_legacy")
+
+
+class PartitionMaintainer:
+    """Runs maintain() periodically in a daemon thread."""
+    
+    def __init__(self, interval_hours: float):
+        self.interval = interval_hours * 3600
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="partition-maintenance", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+    
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                maintain()
+            except Exception as e:
+                logger.error(f"Access log maintenance failed: {str(e)}")
+            self._stop.wait(self.interval)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["maintain", "convert"])
+    args = parser.parse_args()
+    if args.command == "convert":
+        if not ACCESS_LOG_PARTITIONED:
+            raise SystemExit("Partitioning needs PostgreSQL with ACCESS_LOG_PARTITIONING enabled")
+        convert()
+    else:
+        maintain()
@@ -0,0 +1,24 @@
+from sqlalchemy.orm import Session
+from models import PolicyChange
+import change_counters
+
+# Entities whose changes alter access decisions
+USER = "user"
+DOOR = "door"
+USER_GROUP = "user_group"
+DOOR_GROUP = "door_group"
+RULE = "rule"
+
+
+def record_policy_change(db: Session, entity: str, entity_id: int):
+    """
+    Bump the policy version in the current transaction; committed with the
+    caller's data. The id comes from the feed's counter, so versions commit
+    in order and a late commit can never hide below the current version.
+    """
+    db.add(PolicyChange(id=change_counters.next_ids(db, PolicyChange), entity=entity, entity_id=entity_id))
+
+
+def current_version(db: Session) -> int:
+    """The policy counter: one indexed single-row read per poll."""
+    return change_counters.current(db, PolicyChange)
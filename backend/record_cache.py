@@ -0,0 +1,115 @@
+"""
+Read-through cache for rarely changing records (doors, users).
+
+Entries are the response-schema dicts of a row, never ORM instances, so
+they are safe to share between sessions and threads. Each entry expires
+after ``ttl`` seconds and the least recently used entries are evicted
+beyond ``max_size``. Write routes call invalidate() after committing; the
+TTL bounds staleness across processes (e.g. several uvicorn workers),
+which do not see each other's invalidations.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from config import settings
+from models import Door, User
+from schemas import DoorResponse, UserResponse
+
+# Key for the cached "all rows" list
+ALL = "__all__"
+
+
+class RecordCache:
+    def __init__(self, model, schema, ttl=60.0, max_size=10000):
+        self.model = model
+        self.schema = schema
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            self.misses += 1
+            return False, None
+    
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def _to_dict(self, row):
+        return self.schema.model_validate(row).model_dump()
+    
+    def get(self, db, record_id):
+        """Record as a dict, or None if it does not exist (misses are not cached)."""
+        found, value = self._lookup(record_id)
+        if found:
+            return value
+        row = db.get(self.model, record_id)
+        if row is None:
+            return None
+        value = self._to_dict(row)
+        self._store(record_id, value)
+        return value
+    
+    async def get_async(self, db, record_id):
+        """get() for an AsyncSession."""
+        found, value = self._lookup(record_id)
+        if found:
+            return value
+        row = await db.get(self.model, record_id)
+        if row is None:
+            return None
+        value = self._to_dict(row)
+        self._store(record_id, value)
+        return value
+    
+    def get_all(self, db):
+        found, value = self._lookup(ALL)
+        if found:
+            return value
+        value = [self._to_dict(row) for row in db.query(self.model).order_by(self.model.id)]
+        self._store(ALL, value)
+        return value
+    
+    def invalidate(self, record_id=None):
+        """Drop one record (and the cached list), or everything when no id is given."""
+        with self._lock:
+            self.invalidations += 1
+            if record_id is None:
+                self._entries.clear()
+                return
+            self._entries.pop(record_id, None)
+            self._entries.pop(ALL, None)
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+door_cache = RecordCache(Door, DoorResponse, settings.RECORD_CACHE_TTL, settings.RECORD_CACHE_MAX_SIZE)
+user_cache = RecordCache(User, UserResponse, settings.RECORD_CACHE_TTL, settings.RECORD_CACHE_MAX_SIZE)
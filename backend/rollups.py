@@ -0,0 +1,158 @@
+"""
+Minute/hour/day rollups of access logs for dashboards.
+
+Every insert path calls record() in the same transaction as the log rows,
+so counts stay exact without a background job. backfill() rebuilds the
+buckets for a time range from the raw table.
+
+Usage: python rollups.py backfill --days 90
+"""
+import argparse
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select, literal
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import engine, SessionLocal
+from models import AccessLog, AccessStat
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("minute", "hour", "day")
+UNKNOWN_USER = 0
+
+
+def truncate(timestamp: datetime, granularity: str) -> datetime:
+    if granularity == "minute":
+        return timestamp.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def upsert_statement(rows):
+    """INSERT ... ON CONFLICT DO UPDATE count = count + excluded.count."""
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(AccessStat).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=["granularity", "bucket_start", "door_id", "user_id", "status"],
+        set_={"count": AccessStat.count + stmt.excluded.count}
+    )
+
+
+def rollup_rows(logs):
+    """
+    Upsert rows adding ``logs`` to every granularity, sorted by conflict
+    key. Concurrent batches then lock shared buckets in the same order, so
+    two multi-row upserts on PostgreSQL cannot deadlock on each other.
+    """
+    counts = Counter()
+    for log in logs:
+        for granularity in GRANULARITIES:
+            counts[(
+                granularity,
+                truncate(log["timestamp"], granularity),
+                log["door_id"],
+                log.get("user_id") or UNKNOWN_USER,
+                log.get("status") or "success",
+            )] += 1
+    return [
+        {"granularity": g, "bucket_start": b, "door_id": d, "user_id": u, "status": s, "count": n}
+        for (g, b, d, u, s), n in sorted(counts.items())
+    ]
+
+
+def record_statement(logs):
+    """The single upsert that adds ``logs`` to the rollups, or None when empty."""
+    rows = rollup_rows(logs)
+    if not rows:
+        return None
+    return upsert_statement(rows)
+
+
+def record(db: Session, logs):
+    """
+    Add ``logs`` (dicts with timestamp, door_id, user_id, status) to the
+    rollups. Runs in the caller's transaction; one upsert per batch.
+    """
+    stmt = record_statement(logs)
+    if stmt is not None:
+        db.execute(stmt)
+
+
+def bucket_expression(granularity: str):
+    if engine.dialect.name == "postgresql":
+        return func.date_trunc(granularity, AccessLog.timestamp)
+    formats = {"minute": "%Y-%m-%d %H:%M:00", "hour": "%Y-%m-%d %H:00:00", "day": "%Y-%m-%d 00:00:00"}
+    return func.strftime(formats[granularity], AccessLog.timestamp)
+
+
+def backfill(db: Session, since: datetime, until: datetime = None) -> int:
+    """
+    Recompute rollups from access_logs for [since, until). Both ends are
+    aligned to day boundaries so no bucket is partially rebuilt; without
+    ``until`` everything from ``since`` onwards is rebuilt.
+    """
+    since = truncate(since, "day")
+    until = truncate(until, "day") if until else None
+    stale = delete(AccessStat).where(AccessStat.bucket_start >= since)
+    if until:
+        stale = stale.where(AccessStat.bucket_start < until)
+    db.execute(stale)
+    written = 0
+    for granularity in GRANULARITIES:
+        bucket = bucket_expression(granularity).label("bucket_start")
+        stmt = select(
+            literal(granularity).label("granularity"),
+            bucket,
+            AccessLog.door_id,
+            func.coalesce(AccessLog.user_id, UNKNOWN_USER).label("user_id"),
+            func.coalesce(AccessLog.status, "success").label("status"),
+            func.count().label("count"),
+        ).where(
+            AccessLog.timestamp >= since
+        ).group_by(bucket, AccessLog.door_id, AccessLog.user_id, AccessLog.status)
+        if until:
+            stmt = stmt.where(AccessLog.timestamp < until)
+        rows = []
+        for row in db.execute(stmt):
+            data = row._asdict()
+            if isinstance(data["bucket_start"], str):
+                data["bucket_start"] = datetime.fromisoformat(data["bucket_start"])
+            rows.append(data)
+        # Keep each upsert well under driver parameter limits
+        for i in range(0, len(rows), 1000):
+            db.execute(upsert_statement(rows[i:i + 1000]))
+        written += len(rows)
+    db.commit()
+    return written
+
+
+def prune(db: Session) -> int:
+    """Minute buckets are only kept for a short window."""
+    cutoff = datetime.utcnow() - timedelta(days=settings.ACCESS_STATS_MINUTE_RETENTION_DAYS)
+    deleted = db.execute(delete(AccessStat).where(
+        AccessStat.granularity == "minute", AccessStat.bucket_start < cutoff
+    )).rowcount
+    db.commit()
+    return deleted
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["backfill", "prune"])
+    parser.add_argument("--days", type=int, default=90)
+    args = parser.parse_args()
+    with SessionLocal() as db:
+        if args.command == "backfill":
+            count = backfill(db, datetime.utcnow() - timedelta(days=args.days))
+            print(f"Backfilled {count} rollup rows for the last {args.days} days")
+        else:
+            print(f"Pruned {prune(db)} minute rollup rows")
@@ -1,8 +1,23 @@
 from fastapi import APIRouter
-from . import users, doors, access_logs
+from config import settings
+from . import users, doors, access_logs, face_embeddings, stats, live, monitoring, access_policy
 
 router = APIRouter()
 
 router.include_router(users.router)
 router.include_router(doors.router)
+if settings.DB_ASYNC_ENABLED:
+    # The async create/list routes replace their sync counterparts
+    from . import access_logs_async
+    replaced = {(route.path, method) for route in access_logs_async.router.routes for method in route.methods}
+    access_logs.router.routes = [
+        route for route in access_logs.router.routes
+        if not any((route.path, method) in replaced for method in route.methods)
+    ]
+    router.include_router(access_logs_async.router)
 router.include_router(access_logs.router)
+router.include_router(face_embeddings.router)
+router.include_router(stats.router)
+router.include_router(live.router)
+router.include_router(monitoring.router)
+router.include_router(access_policy.router)
@@ -1,51 +1,237 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from database import get_db
+from sqlalchemy import desc, insert, select, tuple_
+from database import get_db, SessionLocal
 from models import AccessLog, User, Door
-from schemas import AccessLogCreate, AccessLogResponse
+from schemas import AccessLogCreate, AccessLogResponse, BulkAccessLogResponse, BulkAccessLogResult
 from datetime import datetime, timedelta
 from typing import List
+import rollups
+from hub import hub
+from record_cache import door_cache, user_cache
+from fast_json import rows_response
+from metrics import span
+import base64
+import csv
+import io
+import json
+import threading
 
 router = APIRouter(
     prefix="/api/access-logs",
     tags=["access_logs"],
 )
 
+class KnownIds:
+    """
+    Set of ids known to exist in a table. Doors and users are only ever
+    deactivated, never deleted, so an id once seen stays valid; unknown ids
+    are looked up in one query per batch.
+    """
+    def __init__(self, model):
+        self.model = model
+        self._ids = set()
+        self._lock = threading.Lock()
+    
+    def missing(self, db: Session, ids) -> set:
+        with self._lock:
+            unknown = set(ids) - self._ids
+        if unknown:
+            found = {row[0] for row in db.query(self.model.id).filter(self.model.id.in_(unknown))}
+            with self._lock:
+                self._ids |= found
+            unknown -= found
+        return unknown
+
+
+known_doors = KnownIds(Door)
+known_users = KnownIds(User)
+
+MAX_BULK_EVENTS = 10000
+# List routes return these columns, in AccessLogResponse order
+LIST_COLUMNS = ("id", "user_id", "door_id", "timestamp", "status", "confidence_score", "notes")
+LIST_FIELDS = [getattr(AccessLog, name) for name in LIST_COLUMNS]
+LIVE_EVENT_FIELDS = ("user_id", "door_id", "timestamp", "status", "confidence_score", "notes")
+
+
+async def parse_bulk_body(request: Request) -> list:
+    """
+    Accept a JSON array or NDJSON (one event per line). Used as a dependency
+    so the body is read on the event loop and the route itself can be a
+    plain def, keeping its database work off the loop.
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    try:
+        with span("bulk", "parse"):
+            if "ndjson" in content_type or "jsonlines" in content_type:
+                return [json.loads(line) for line in body.splitlines() if line.strip()]
+            items = json.loads(body)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid JSON: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a JSON array of access logs")
+    return items
+
+
+def live_event(log_id: int, row: dict) -> dict:
+    """Live console payload, built from data already in hand (no extra query)."""
+    event = {field: row.get(field) for field in LIVE_EVENT_FIELDS}
+    event["id"] = log_id
+    return event
+
+
 @router.post("/", response_model=AccessLogResponse, status_code=status.HTTP_201_CREATED)
 def create_access_log(log: AccessLogCreate, db: Session = Depends(get_db)):
-    door = db.query(Door).filter(Door.id == log.door_id).first()
+    with span("create", "lookup"):
+        door = door_cache.get(db, log.door_id)
+        user = user_cache.get(db, log.user_id) if log.user_id else None
     if not door:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Door not found"
         )
     
-    if log.user_id:
-        user = db.query(User).filter(User.id == log.user_id).first()
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
+    if log.user_id and not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
     
-    new_log = AccessLog(**log.dict())
+    new_log = AccessLog(**log.dict(exclude_none=True))
+    if new_log.timestamp is None:
+        new_log.timestamp = datetime.utcnow()
     db.add(new_log)
-    db.commit()
-    db.refresh(new_log)
+    with span("create", "rollup"):
+        rollups.record(db, [{
+            "timestamp": new_log.timestamp,
+            "door_id": new_log.door_id,
+            "user_id": new_log.user_id,
+            "status": new_log.status,
+        }])
+    with span("create", "commit"):
+        db.commit()
+        db.refresh(new_log)
+    with span("create", "publish"):
+        hub.publish(live_event(new_log.id, new_log.__dict__))
     return new_log
 
 
+@router.post("/bulk", response_model=BulkAccessLogResponse)
+def create_access_logs_bulk(items: list = Depends(parse_bulk_body), db: Session = Depends(get_db)):
+    """
+    Insert many access logs in one transaction.
+    Invalid items are reported per index and do not fail the batch.
+    """
+    if len(items) > MAX_BULK_EVENTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {MAX_BULK_EVENTS} access logs per request"
+        )
+    
+    results = [None] * len(items)
+    valid = []
+    with span("bulk", "validate"):
+        for index, item in enumerate(items):
+            try:
+                valid.append((index, AccessLogCreate.model_validate(item)))
+            except ValidationError as e:
+                results[index] = BulkAccessLogResult(index=index, success=False, detail=str(e.errors()[0]["msg"]))
+    
+    with span("bulk", "lookup"):
+        missing_doors = known_doors.missing(db, {log.door_id for _, log in valid})
+        missing_users = known_users.missing(db, {log.user_id for _, log in valid if log.user_id})
+    rows, row_indexes = [], []
+    now = datetime.utcnow()
+    for index, log in valid:
+        if log.door_id in missing_doors:
+            results[index] = BulkAccessLogResult(index=index, success=False, detail="Door not found")
+        elif log.user_id and log.user_id in missing_users:
+            results[index] = BulkAccessLogResult(index=index, success=False, detail="User not found")
+        else:
+            row = log.model_dump()
+            row["timestamp"] = row["timestamp"] or now
+            rows.append(row)
+            row_indexes.append(index)
+    
+    if rows:
+        # One multi-row INSERT ... RETURNING for the whole batch
+        with span("bulk", "insert"):
+            ids = db.execute(insert(AccessLog).returning(AccessLog.id, sort_by_parameter_order=True), rows).scalars().all()
+        with span("bulk", "rollup"):
+            rollups.record(db, rows)
+        with span("bulk", "commit"):
+            db.commit()
+        with span("bulk", "publish"):
+            for index, log_id, row in zip(row_indexes, ids, rows):
+                results[index] = BulkAccessLogResult(index=index, success=True, id=log_id)
+                hub.publish(live_event(log_id, row))
+    
+    return BulkAccessLogResponse(
+        created=len(rows),
+        failed=len(items) - len(rows),
+        results=results
+    )
+
+
+def encode_cursor(log: AccessLog) -> str:
+    raw = f"{log.timestamp.isoformat()}|{log.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        timestamp, log_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(log_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def check_skip(cursor: str, skip: int):
+    """The deprecated offset only pages from the start, never from a cursor."""
+    if skip and cursor:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Use either cursor or skip, not both")
+
+
+def keyset_page(query, cursor: str, limit: int, route: str, skip: int = 0):
+    """
+    Newest-first keyset pagination on (timestamp, id). Seeks straight to the
+    cursor position via the index instead of skipping rows. Returns the
+    page and the cursor for the next one (None on the last page). ``skip``
+    is the deprecated offset, applied after ordering.
+    """
+    if cursor:
+        query = query.filter(tuple_(AccessLog.timestamp, AccessLog.id) < decode_cursor(cursor))
+    query = query.order_by(desc(AccessLog.timestamp), desc(AccessLog.id)).limit(limit)
+    if skip:
+        query = query.offset(skip)
+    with span(route, "query"):
+        logs = query.all()
+    next_cursor = encode_cursor(logs[-1]) if len(logs) == limit else None
+    return logs, next_cursor
+
+
+def page_response(rows, next_cursor, route: str):
+    """List page as JSON straight from column tuples; cursor in X-Next-Cursor."""
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    with span(route, "encode"):
+        return rows_response(rows, LIST_COLUMNS, headers)
+
+
 @router.get("/", response_model=List[AccessLogResponse])
 def get_access_logs(
     user_id: int = Query(None),
     door_id: int = Query(None),
     days: int = Query(7, description="Last N days"),
-    skip: int = 0,
-    limit: int = 100,
+    cursor: str = Query(None, description="X-Next-Cursor value from the previous page"),
+    skip: int = Query(0, description="Deprecated, use cursor"),
+    limit: int = Query(100, le=1000),
     db: Session = Depends(get_db)
 ):
-    query = db.query(AccessLog)
+    query = db.query(*LIST_FIELDS)
     
     date_from = datetime.utcnow() - timedelta(days=days)
     query = query.filter(AccessLog.timestamp >= date_from)
@@ -56,17 +242,88 @@ def get_access_logs(
     if door_id:
         query = query.filter(AccessLog.door_id == door_id)
     
-    logs = query.order_by(desc(AccessLog.timestamp)).offset(skip).limit(limit).all()
-    return logs
+    check_skip(cursor, skip)
+    return page_response(*keyset_page(query, cursor, limit, "list", skip), "list")
 
 
 @router.get("/today", response_model=List[AccessLogResponse])
-def get_today_logs(db: Session = Depends(get_db)):
+def get_today_logs(
+    cursor: str = Query(None, description="X-Next-Cursor value from the previous page"),
+    limit: int = Query(1000, le=10000),
+    db: Session = Depends(get_db)
+):
     today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    logs = db.query(AccessLog).filter(
-        AccessLog.timestamp >= today
-    ).order_by(desc(AccessLog.timestamp)).all()
-    return logs
+    query = db.query(*LIST_FIELDS).filter(AccessLog.timestamp >= today)
+    return page_response(*keyset_page(query, cursor, limit, "today"), "today")
+
+
+EXPORT_COLUMNS = ["id", "timestamp", "user_id", "door_id", "status", "confidence_score", "notes"]
+EXPORT_BATCH_SIZE = 1000
+
+
+def export_rows(stmt, fmt: str):
+    """
+    Yield the export body chunk by chunk. Uses its own session and a
+    server-side cursor so memory stays flat regardless of the row count.
+    """
+    with SessionLocal() as db:
+        result = db.execute(stmt.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE))
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            yield buffer.getvalue()
+        for rows in result.partitions():
+            if fmt == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(
+                    (row.id, row.timestamp.isoformat(), row.user_id, row.door_id,
+                     row.status, row.confidence_score, row.notes)
+                    for row in rows
+                )
+                yield buffer.getvalue()
+            else:
+                yield "".join(
+                    json.dumps({
+                        "id": row.id,
+                        "timestamp": row.timestamp.isoformat(),
+                        "user_id": row.user_id,
+                        "door_id": row.door_id,
+                        "status": row.status,
+                        "confidence_score": row.confidence_score,
+                        "notes": row.notes,
+                    }) + "\n"
+                    for row in rows
+                )
+
+
+@router.get("/export")
+def export_access_logs(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    date_from: datetime = Query(None),
+    date_to: datetime = Query(None),
+    days: int = Query(30, description="Used when date_from is not given"),
+    user_id: int = Query(None),
+    door_id: int = Query(None),
+):
+    stmt = select(*[getattr(AccessLog, name) for name in EXPORT_COLUMNS])
+    stmt = stmt.where(AccessLog.timestamp >= (date_from or datetime.utcnow() - timedelta(days=days)))
+    if date_to:
+        stmt = stmt.where(AccessLog.timestamp < date_to)
+    if user_id:
+        stmt = stmt.where(AccessLog.user_id == user_id)
+    if door_id:
+        stmt = stmt.where(AccessLog.door_id == door_id)
+    stmt = stmt.order_by(AccessLog.timestamp, AccessLog.id)
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"access_logs_{datetime.utcnow():%Y%m%d_%H%M%S}.{format}"
+    return StreamingResponse(
+        export_rows(stmt, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 
 @router.get("/{log_id}", response_model=AccessLogResponse)
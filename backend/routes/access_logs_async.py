@@ -0,0 +1,105 @@
+"""
+Async versions of the access-log hot path (create, list, today), used when
+DB_ASYNC_ENABLED is set. They replace the matching routes of routes.access_logs;
+every other access-log route stays synchronous.
+"""
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, select, tuple_
+from database import get_async_db
+from models import AccessLog
+from schemas import AccessLogCreate, AccessLogResponse
+from datetime import datetime, timedelta
+from typing import List
+import rollups
+from hub import hub
+from record_cache import door_cache, user_cache
+from metrics import span
+from routes.access_logs import LIST_FIELDS, check_skip, decode_cursor, encode_cursor, live_event, page_response
+
+router = APIRouter(
+    prefix="/api/access-logs",
+    tags=["access_logs"],
+)
+
+
+async def fetch_keyset(db: AsyncSession, stmt, cursor: str, limit: int, route: str, skip: int = 0):
+    """keyset_page() for an AsyncSession."""
+    if cursor:
+        stmt = stmt.where(tuple_(AccessLog.timestamp, AccessLog.id) < decode_cursor(cursor))
+    stmt = stmt.order_by(desc(AccessLog.timestamp), desc(AccessLog.id)).limit(limit)
+    if skip:
+        stmt = stmt.offset(skip)
+    with span(route, "query"):
+        logs = (await db.execute(stmt)).all()
+    next_cursor = encode_cursor(logs[-1]) if len(logs) == limit else None
+    return logs, next_cursor
+
+
+@router.post("/", response_model=AccessLogResponse, status_code=status.HTTP_201_CREATED)
+async def create_access_log(log: AccessLogCreate, db: AsyncSession = Depends(get_async_db)):
+    with span("create", "lookup"):
+        door = await door_cache.get_async(db, log.door_id)
+        user = await user_cache.get_async(db, log.user_id) if log.user_id else None
+    if not door:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Door not found"
+        )
+    
+    if log.user_id and not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    new_log = AccessLog(**log.model_dump(exclude_none=True))
+    if new_log.timestamp is None:
+        new_log.timestamp = datetime.utcnow()
+    db.add(new_log)
+    with span("create", "rollup"):
+        await db.execute(rollups.record_statement([{
+            "timestamp": new_log.timestamp,
+            "door_id": new_log.door_id,
+            "user_id": new_log.user_id,
+            "status": new_log.status,
+        }]))
+    with span("create", "commit"):
+        await db.commit()
+    with span("create", "publish"):
+        hub.publish(live_event(new_log.id, new_log.__dict__))
+    return new_log
+
+
+@router.get("/", response_model=List[AccessLogResponse])
+async def get_access_logs(
+    user_id: int = Query(None),
+    door_id: int = Query(None),
+    days: int = Query(7, description="Last N days"),
+    cursor: str = Query(None, description="X-Next-Cursor value from the previous page"),
+    skip: int = Query(0, description="Deprecated, use cursor"),
+    limit: int = Query(100, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    date_from = datetime.utcnow() - timedelta(days=days)
+    stmt = select(*LIST_FIELDS).where(AccessLog.timestamp >= date_from)
+    
+    if user_id:
+        stmt = stmt.where(AccessLog.user_id == user_id)
+    
+    if door_id:
+        stmt = stmt.where(AccessLog.door_id == door_id)
+    
+    check_skip(cursor, skip)
+    return page_response(*await fetch_keyset(db, stmt, cursor, limit, "list", skip), "list")
+
+
+@router.get("/today", response_model=List[AccessLogResponse])
+async def get_today_logs(
+    cursor: str = Query(None, description="X-Next-Cursor value from the previous page"),
+    limit: int = Query(1000, le=10000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    stmt = select(*LIST_FIELDS).where(AccessLog.timestamp >= today)
+    return page_response(*await fetch_keyset(db, stmt, cursor, limit, "today"), "today")
@@ -0,0 +1,259 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from database import get_db
+from models import AccessRule, Door, DoorGroup, User, UserGroup, door_group_members, user_group_members
+from schemas import (
+    AccessRuleCreate, AccessRuleUpdate, AccessRuleResponse,
+    DoorGroupCreate, DoorGroupUpdate, DoorGroupResponse,
+    UserGroupCreate, UserGroupUpdate, UserGroupResponse,
+)
+from policy_changes import record_policy_change, current_version, USER_GROUP, DOOR_GROUP, RULE
+from fast_json import FastJSONResponse
+from typing import List
+
+router = APIRouter(
+    prefix="/api/access-policy",
+    tags=["access-policy"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+def _members(db: Session, model, ids, label):
+    """Rows of ``model`` for ``ids``; 400 when some do not exist."""
+    ids = set(ids)
+    rows = db.query(model).filter(model.id.in_(ids)).all() if ids else []
+    if len(rows) != len(ids):
+        missing = sorted(ids - {row.id for row in rows})
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown {label} ids: {missing[:20]}"
+        )
+    return rows
+
+
+def _get_or_404(db: Session, model, item_id, label):
+    item = db.get(model, item_id)
+    if not item:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"{label} not found"
+        )
+    return item
+
+
+def _check_name(db: Session, model, name, item_id=None):
+    existing = db.query(model.id).filter(model.name == name, model.id != item_id).first()
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Group name already exists"
+        )
+
+
+def _check_unused(db: Session, column, group_id):
+    if db.query(AccessRule.id).filter(column == group_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Group is used by access rules"
+        )
+
+
+def _user_group_response(group):
+    return {
+        "id": group.id,
+        "name": group.name,
+        "description": group.description,
+        "user_ids": sorted(user.id for user in group.users),
+        "created_at": group.created_at,
+    }
+
+
+def _door_group_response(group):
+    return {
+        "id": group.id,
+        "name": group.name,
+        "description": group.description,
+        "door_ids": sorted(door.id for door in group.doors),
+        "created_at": group.created_at,
+    }
+
+
+@router.get("/")
+def get_policy_snapshot(since: int = Query(None, ge=0), db: Session = Depends(get_db)):
+    """
+    Everything the face recognition service compiles into its policy engine.
+    With ``since`` equal to the current version only {"version", "changed":
+    false} comes back, so polling is a single-row counter read.
+    """
+    # Read first: a change committed while the rest is read only makes the
+    # snapshot newer than its version, and the next poll fetches it again
+    version = current_version(db)
+    if since is not None and since == version:
+        return {"version": version, "changed": False}
+    
+    user_groups, door_groups = {}, {}
+    for group_id, user_id in db.execute(select(user_group_members.c.user_group_id, user_group_members.c.user_id)):
+        user_groups.setdefault(group_id, []).append(user_id)
+    for group_id, door_id in db.execute(select(door_group_members.c.door_group_id, door_group_members.c.door_id)):
+        door_groups.setdefault(group_id, []).append(door_id)
+    rules = db.execute(
+        select(AccessRule.id, AccessRule.user_group_id, AccessRule.door_group_id,
+               AccessRule.days, AccessRule.start_minute, AccessRule.end_minute)
+        .where(AccessRule.status.is_(True))
+        .order_by(AccessRule.id)
+    ).all()
+    
+    return FastJSONResponse({
+        "version": version,
+        "changed": True,
+        "inactive_user_ids": db.execute(select(User.id).where(User.status.is_not(True))).scalars().all(),
+        "inactive_door_ids": db.execute(select(Door.id).where(Door.status.is_not(True))).scalars().all(),
+        "user_groups": {str(group_id): ids for group_id, ids in user_groups.items()},
+        "door_groups": {str(group_id): ids for group_id, ids in door_groups.items()},
+        "rules": [
+            dict(zip(("id", "user_group_id", "door_group_id", "days", "start_minute", "end_minute"), rule))
+            for rule in rules
+        ],
+    })
+
+
+@router.get("/user-groups", response_model=List[UserGroupResponse])
+def get_user_groups(db: Session = Depends(get_db)):
+    return [_user_group_response(group) for group in db.query(UserGroup).order_by(UserGroup.id).all()]
+
+
+@router.post("/user-groups", response_model=UserGroupResponse, status_code=status.HTTP_201_CREATED)
+def create_user_group(group: UserGroupCreate, db: Session = Depends(get_db)):
+    _check_name(db, UserGroup, group.name)
+    new_group = UserGroup(
+        name=group.name,
+        description=group.description,
+        users=_members(db, User, group.user_ids, "user")
+    )
+    db.add(new_group)
+    db.flush()
+    record_policy_change(db, USER_GROUP, new_group.id)
+    db.commit()
+    db.refresh(new_group)
+    return _user_group_response(new_group)
+
+
+@router.put("/user-groups/{group_id}", response_model=UserGroupResponse)
+def update_user_group(group_id: int, group_data: UserGroupUpdate, db: Session = Depends(get_db)):
+    group = _get_or_404(db, UserGroup, group_id, "User group")
+    
+    if group_data.name is not None:
+        _check_name(db, UserGroup, group_data.name, group_id)
+        group.name = group_data.name
+    if group_data.description is not None:
+        group.description = group_data.description
+    if group_data.user_ids is not None:
+        group.users = _members(db, User, group_data.user_ids, "user")
+        record_policy_change(db, USER_GROUP, group_id)
+    
+    db.commit()
+    db.refresh(group)
+    return _user_group_response(group)
+
+
+@router.delete("/user-groups/{group_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_user_group(group_id: int, db: Session = Depends(get_db)):
+    group = _get_or_404(db, UserGroup, group_id, "User group")
+    _check_unused(db, AccessRule.user_group_id, group_id)
+    db.delete(group)
+    record_policy_change(db, USER_GROUP, group_id)
+    db.commit()
+
+
+@router.get("/door-groups", response_model=List[DoorGroupResponse])
+def get_door_groups(db: Session = Depends(get_db)):
+    return [_door_group_response(group) for group in db.query(DoorGroup).order_by(DoorGroup.id).all()]
+
+
+@router.post("/door-groups", response_model=DoorGroupResponse, status_code=status.HTTP_201_CREATED)
+def create_door_group(group: DoorGroupCreate, db: Session = Depends(get_db)):
+    _check_name(db, DoorGroup, group.name)
+    new_group = DoorGroup(
+        name=group.name,
+        description=group.description,
+        doors=_members(db, Door, group.door_ids, "door")
+    )
+    db.add(new_group)
+    db.flush()
+    record_policy_change(db, DOOR_GROUP, new_group.id)
+    db.commit()
+    db.refresh(new_group)
+    return _door_group_response(new_group)
+
+
+@router.put("/door-groups/{group_id}", response_model=DoorGroupResponse)
+def update_door_group(group_id: int, group_data: DoorGroupUpdate, db: Session = Depends(get_db)):
+    group = _get_or_404(db, DoorGroup, group_id, "Door group")
+    
+    if group_data.name is not None:
+        _check_name(db, DoorGroup, group_data.name, group_id)
+        group.name = group_data.name
+    if group_data.description is not None:
+        group.description = group_data.description
+    if group_data.door_ids is not None:
+        group.doors = _members(db, Door, group_data.door_ids, "door")
+        record_policy_change(db, DOOR_GROUP, group_id)
+    
+    db.commit()
+    db.refresh(group)
+    return _door_group_response(group)
+
+
+@router.delete("/door-groups/{group_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_door_group(group_id: int, db: Session = Depends(get_db)):
+    group = _get_or_404(db, DoorGroup, group_id, "Door group")
+    _check_unused(db, AccessRule.door_group_id, group_id)
+    db.delete(group)
+    record_policy_change(db, DOOR_GROUP, group_id)
+    db.commit()
+
+
+@router.get("/rules", response_model=List[AccessRuleResponse])
+def get_access_rules(db: Session = Depends(get_db)):
+    return db.query(AccessRule).order_by(AccessRule.id).all()
+
+
+@router.post("/rules", response_model=AccessRuleResponse, status_code=status.HTTP_201_CREATED)
+def create_access_rule(rule: AccessRuleCreate, db: Session = Depends(get_db)):
+    _get_or_404(db, UserGroup, rule.user_group_id, "User group")
+    _get_or_404(db, DoorGroup, rule.door_group_id, "Door group")
+    new_rule = AccessRule(**rule.model_dump())
+    db.add(new_rule)
+    db.flush()
+    record_policy_change(db, RULE, new_rule.id)
+    db.commit()
+    db.refresh(new_rule)
+    return new_rule
+
+
+@router.put("/rules/{rule_id}", response_model=AccessRuleResponse)
+def update_access_rule(rule_id: int, rule_data: AccessRuleUpdate, db: Session = Depends(get_db)):
+    rule = _get_or_404(db, AccessRule, rule_id, "Access rule")
+    changes = rule_data.model_dump(exclude_unset=True)
+    if changes.get("user_group_id") is not None:
+        _get_or_404(db, UserGroup, changes["user_group_id"], "User group")
+    if changes.get("door_group_id") is not None:
+        _get_or_404(db, DoorGroup, changes["door_group_id"], "Door group")
+    
+    for key, value in changes.items():
+        if value is not None:
+            setattr(rule, key, value)
+    record_policy_change(db, RULE, rule_id)
+    
+    db.commit()
+    db.refresh(rule)
+    return rule
+
+
+@router.delete("/rules/{rule_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_access_rule(rule_id: int, db: Session = Depends(get_db)):
+    rule = _get_or_404(db, AccessRule, rule_id, "Access rule")
+    db.delete(rule)
+    record_policy_change(db, RULE, rule_id)
+    db.commit()
@@ -3,6 +3,8 @@ from sqlalchemy.orm import Session
 from database import get_db
 from models import Door
 from schemas import DoorCreate, DoorUpdate, DoorResponse
+from record_cache import door_cache
+from policy_changes import record_policy_change, DOOR
 from typing import List
 
 router = APIRouter(
@@ -24,17 +26,18 @@ def create_door(door: DoorCreate, db: Session = Depends(get_db)):
     db.add(new_door)
     db.commit()
     db.refresh(new_door)
+    door_cache.invalidate(new_door.id)
     return new_door
 
 
 @router.get("/", response_model=List[DoorResponse])
 def get_all_doors(db: Session = Depends(get_db)):
-    return db.query(Door).all()
+    return door_cache.get_all(db)
 
 
 @router.get("/{door_id}", response_model=DoorResponse)
 def get_door(door_id: int, db: Session = Depends(get_db)):
-    door = db.query(Door).filter(Door.id == door_id).first()
+    door = door_cache.get(db, door_id)
     if not door:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -52,11 +55,15 @@ def update_door(door_id: int, door_data: DoorUpdate, db: Session = Depends(get_d
             detail="Door not found"
         )
     
-    for key, value in door_data.dict(exclude_unset=True).items():
+    changes = door_data.dict(exclude_unset=True)
+    if "status" in changes and changes["status"] != door.status:
+        record_policy_change(db, DOOR, door_id)
+    for key, value in changes.items():
         setattr(door, key, value)
     
     db.commit()
     db.refresh(door)
+    door_cache.invalidate(door_id)
     return door
 
 
@@ -69,6 +76,9 @@ def delete_door(door_id: int, db: Session = Depends(get_db)):
             detail="Door not found"
         )
     
+    if door.status:
+        record_policy_change(db, DOOR, door_id)
     door.status = False
     db.commit()
+    door_cache.invalidate(door_id)
     return {"message": "Door deactivated"}
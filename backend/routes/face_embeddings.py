@@ -0,0 +1,156 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Query
+from sqlalchemy.orm import Session
+from database import get_db
+from models import FaceEmbedding, User, GalleryChange
+from schemas import FaceEmbeddingCreate, FaceEmbeddingResponse, GalleryChangeResponse, GalleryChangesResponse
+from gallery_changes import record_change, current_watermark, ADD, REMOVE, ACTIVATE
+from config import settings
+import embedding_codec
+from typing import List
+
+router = APIRouter(
+    prefix="/api/face-embeddings",
+    tags=["face_embeddings"],
+    responses={404: {"description": "Not found"}},
+)
+
+def load_gallery(db: Session, active_only: bool = True):
+    """
+    Read the whole gallery in one query.
+    Returns (embedding_ids, user_ids, float32 matrix).
+    """
+    query = db.query(FaceEmbedding.id, FaceEmbedding.user_id, FaceEmbedding.embedding)
+    if active_only:
+        query = query.join(User).filter(User.status == True)
+    rows = query.order_by(FaceEmbedding.id).all()
+    ids, user_ids, blobs = zip(*rows) if rows else ((), (), ())
+    return list(ids), list(user_ids), embedding_codec.decode_many(list(blobs))
+
+
+def to_response(row: FaceEmbedding) -> FaceEmbeddingResponse:
+    return FaceEmbeddingResponse(
+        id=row.id,
+        user_id=row.user_id,
+        embedding=embedding_codec.decode(row.embedding).tolist(),
+        photo_filename=row.photo_filename,
+        created_at=row.created_at
+    )
+
+
+@router.post("/", response_model=FaceEmbeddingResponse, status_code=status.HTTP_201_CREATED)
+def create_face_embedding(data: FaceEmbeddingCreate, db: Session = Depends(get_db)):
+    user = db.query(User).filter(User.id == data.user_id).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    if not data.embedding:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Embedding must not be empty"
+        )
+    
+    new_embedding = FaceEmbedding(
+        user_id=data.user_id,
+        embedding=embedding_codec.encode(data.embedding, settings.EMBEDDING_STORAGE_DTYPE),
+        photo_filename=data.photo_filename
+    )
+    db.add(new_embedding)
+    db.flush()
+    # Inactive users are picked up with all their templates on activation
+    if user.status:
+        record_change(db, ADD, user.id, new_embedding.id)
+    db.commit()
+    db.refresh(new_embedding)
+    return to_response(new_embedding)
+
+
+@router.get("/", response_model=List[FaceEmbeddingResponse])
+def get_face_embeddings(response: Response, active_only: bool = True, db: Session = Depends(get_db)):
+    """
+    Gallery used by the face recognition service.
+    By default only templates of active users are returned. The
+    X-Gallery-Watermark header is the change feed position the listing
+    already reflects; it is read first so replayed changes are harmless.
+    """
+    response.headers["X-Gallery-Watermark"] = str(current_watermark(db))
+    query = db.query(FaceEmbedding)
+    if active_only:
+        query = query.join(User).filter(User.status == True)
+    return [to_response(row) for row in query.order_by(FaceEmbedding.id).all()]
+
+
+@router.get("/gallery")
+def get_gallery_binary(active_only: bool = True, db: Session = Depends(get_db)):
+    """
+    Whole gallery as one binary frame (see embedding_codec.pack_gallery)
+    so the face service can load it without per-row JSON parsing.
+    """
+    watermark = current_watermark(db)
+    ids, user_ids, matrix = load_gallery(db, active_only)
+    return Response(
+        content=embedding_codec.pack_gallery(ids, user_ids, matrix, watermark),
+        media_type="application/octet-stream",
+        headers={"X-Gallery-Watermark": str(watermark)}
+    )
+
+
+@router.get("/changes", response_model=GalleryChangesResponse)
+def get_gallery_changes(
+    since: int = Query(0, description="Last change id already applied"),
+    limit: int = Query(1000, le=10000),
+    db: Session = Depends(get_db)
+):
+    changes = db.query(GalleryChange).filter(
+        GalleryChange.id > since
+    ).order_by(GalleryChange.id).limit(limit).all()
+    
+    # Attach the templates the consumer needs to apply each change
+    embedding_ids = [c.embedding_id for c in changes if c.action == ADD]
+    activated_users = [c.user_id for c in changes if c.action == ACTIVATE]
+    rows = db.query(FaceEmbedding).filter(
+        (FaceEmbedding.id.in_(embedding_ids)) | (FaceEmbedding.user_id.in_(activated_users))
+    ).all() if embedding_ids or activated_users else []
+    by_id = {row.id: row for row in rows}
+    by_user = {}
+    for row in rows:
+        by_user.setdefault(row.user_id, []).append(row)
+    
+    result = []
+    for change in changes:
+        if change.action == ADD:
+            embeddings = [by_id[change.embedding_id]] if change.embedding_id in by_id else []
+        elif change.action == ACTIVATE:
+            embeddings = by_user.get(change.user_id, [])
+        else:
+            embeddings = []
+        result.append(GalleryChangeResponse(
+            id=change.id,
+            action=change.action,
+            user_id=change.user_id,
+            embedding_id=change.embedding_id,
+            embeddings=[to_response(row) for row in embeddings]
+        ))
+    
+    watermark = changes[-1].id if changes else since
+    return GalleryChangesResponse(changes=result, watermark=watermark)
+
+
+@router.get("/user/{user_id}", response_model=List[FaceEmbeddingResponse])
+def get_user_face_embeddings(user_id: int, db: Session = Depends(get_db)):
+    rows = db.query(FaceEmbedding).filter(FaceEmbedding.user_id == user_id).all()
+    return [to_response(row) for row in rows]
+
+
+@router.delete("/{embedding_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_face_embedding(embedding_id: int, db: Session = Depends(get_db)):
+    row = db.query(FaceEmbedding).filter(FaceEmbedding.id == embedding_id).first()
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Face embedding not found"
+        )
+    record_change(db, REMOVE, row.user_id, row.id)
+    db.delete(row)
+    db.commit()
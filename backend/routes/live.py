@@ -0,0 +1,76 @@
+from fastapi import APIRouter, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from hub import hub
+import asyncio
+
+router = APIRouter(prefix="/api/live", tags=["live"])
+
+SSE_HEARTBEAT_SECONDS = 15
+
+
+def parse_door_ids(door_ids: Optional[str]):
+    """Comma separated door ids; empty means all doors."""
+    if not door_ids:
+        return None
+    return {int(door_id) for door_id in door_ids.split(",") if door_id.strip()}
+
+
+@router.websocket("/access-logs")
+async def access_logs_websocket(websocket: WebSocket, door_ids: Optional[str] = None):
+    """Push each new access log as a JSON text frame."""
+    await websocket.accept()
+    subscriber = hub.subscribe(parse_door_ids(door_ids))
+    
+    async def watch_disconnect():
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+    
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        while not subscriber.closed and not watcher.done():
+            getter = asyncio.ensure_future(subscriber.queue.get())
+            done, _ = await asyncio.wait({getter, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if getter not in done:
+                getter.cancel()
+                break
+            await websocket.send_text(getter.result())
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        watcher.cancel()
+        hub.unsubscribe(subscriber)
+
+
+@router.get("/access-logs/stream")
+async def access_logs_stream(request: Request, door_ids: Optional[str] = Query(None)):
+    """Server-sent events fallback for consoles that cannot use WebSockets."""
+    subscriber = hub.subscribe(parse_door_ids(door_ids))
+    
+    async def events():
+        try:
+            while not subscriber.closed:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: access_log\ndata: {message}\n\n"
+        finally:
+            hub.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/stats")
+def live_stats():
+    return hub.stats()
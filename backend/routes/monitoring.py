@@ -0,0 +1,54 @@
+from fastapi import APIRouter, HTTPException, status, Query
+from fastapi.responses import PlainTextResponse, Response
+from config import settings
+from database import engine, async_engine, pool_stats
+from record_cache import door_cache, user_cache
+from hub import hub
+from telemetry import profiler
+import metrics
+
+router = APIRouter(tags=["monitoring"])
+
+# Gauges, read from the components only when /metrics is scraped
+metrics.register_stats({
+    "db_pool": lambda: pool_stats(engine),
+    "db_async_pool": lambda: pool_stats(async_engine.sync_engine) if async_engine is not None else None,
+    "live_hub": hub.stats,
+    "door_cache": door_cache.stats,
+    "user_cache": user_cache.stats,
+    "profiler": profiler.stats,
+})
+
+
+@router.get("/metrics")
+def get_metrics():
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
+
+
+def require_profiler():
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Profiler is disabled (PROFILER_ENABLED)"
+        )
+
+
+@router.post("/api/profiler/start")
+def start_profiler(interval_ms: float = Query(5.0, gt=0), seconds: float = Query(None, gt=0)):
+    """Start sampling all threads; the result comes back from /api/profiler/stop."""
+    require_profiler()
+    max_seconds = min(seconds or settings.PROFILER_MAX_SECONDS, settings.PROFILER_MAX_SECONDS)
+    if not profiler.start(interval_ms / 1000, max_seconds):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Profiler is already running"
+        )
+    return {"success": True, "profiler": profiler.stats()}
+
+
+@router.post("/api/profiler/stop", response_class=PlainTextResponse)
+def stop_profiler():
+    """Stop sampling; returns collapsed stacks for flamegraph.pl or speedscope."""
+    require_profiler()
+    return PlainTextResponse(profiler.stop())
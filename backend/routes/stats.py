@@ -0,0 +1,94 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from database import get_db
+from models import AccessStat
+from schemas import AccessStatBucket
+from rollups import GRANULARITIES, truncate
+from record_cache import door_cache, user_cache
+from datetime import datetime, timedelta
+from typing import List
+
+router = APIRouter(
+    prefix="/api/stats",
+    tags=["stats"],
+)
+
+GROUP_COLUMNS = {
+    "door": AccessStat.door_id,
+    "user": AccessStat.user_id,
+    "status": AccessStat.status,
+}
+
+
+@router.get("/access", response_model=List[AccessStatBucket])
+def get_access_stats(
+    granularity: str = Query("hour", description="minute, hour or day"),
+    days: int = Query(30, description="Last N days"),
+    group_by: str = Query("door", description="Comma separated: door, user, status"),
+    door_id: int = Query(None),
+    user_id: int = Query(None),
+    status_filter: str = Query(None, alias="status"),
+    db: Session = Depends(get_db)
+):
+    """
+    Access counts per time bucket from the pre-aggregated rollups, e.g.
+    entries per door per hour for the last 30 days.
+    """
+    if granularity not in GRANULARITIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"granularity must be one of {', '.join(GRANULARITIES)}"
+        )
+    groups = [g.strip() for g in group_by.split(",") if g.strip()]
+    unknown = [g for g in groups if g not in GROUP_COLUMNS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot group by {', '.join(unknown)}"
+        )
+    
+    columns = [GROUP_COLUMNS[g].label(f"{g}_id" if g != "status" else "status") for g in groups]
+    date_from = truncate(datetime.utcnow() - timedelta(days=days), granularity)
+    query = db.query(
+        AccessStat.bucket_start,
+        *columns,
+        func.sum(AccessStat.count).label("count")
+    ).filter(
+        AccessStat.granularity == granularity,
+        AccessStat.bucket_start >= date_from
+    )
+    if door_id:
+        query = query.filter(AccessStat.door_id == door_id)
+    if user_id:
+        query = query.filter(AccessStat.user_id == user_id)
+    if status_filter:
+        query = query.filter(AccessStat.status == status_filter)
+    
+    rows = query.group_by(AccessStat.bucket_start, *columns).order_by(AccessStat.bucket_start).all()
+    return [AccessStatBucket(**row._asdict()) for row in rows]
+
+
+@router.get("/today")
+def get_today_stats(db: Session = Depends(get_db)):
+    """Totals for the dashboard cards: today's access count per status."""
+    today = truncate(datetime.utcnow(), "day")
+    rows = db.query(AccessStat.status, func.sum(AccessStat.count)).filter(
+        AccessStat.granularity == "day",
+        AccessStat.bucket_start == today
+    ).group_by(AccessStat.status).all()
+    by_status = {row[0]: int(row[1]) for row in rows}
+    return {
+        "date": today.date().isoformat(),
+        "total": sum(by_status.values()),
+        "by_status": by_status
+    }
+
+
+@router.get("/cache")
+def get_cache_stats():
+    """Hit/miss counters of the door and user record caches."""
+    return {
+        "doors": door_cache.stats(),
+        "users": user_cache.stats(),
+    }
@@ -1,8 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import insert, or_
 from sqlalchemy.orm import Session
 from database import get_db
-from models import User
-from schemas import UserCreate, UserUpdate, UserResponse
+from models import User, FaceEmbedding
+from schemas import UserCreate, UserUpdate, UserResponse, BulkUserCreate, BulkUserResponse, BulkUserResult
+from gallery_changes import record_change, record_changes, ACTIVATE, DEACTIVATE, ADD
+from policy_changes import record_policy_change, USER
+from config import settings
+import embedding_codec
+from record_cache import user_cache
+from fast_json import rows_response
 from typing import List
 
 router = APIRouter(
@@ -11,6 +18,12 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+MAX_BULK_USERS = 1000
+
+# get_all_users returns these columns, in UserResponse order
+LIST_COLUMNS = ("name", "email", "employee_id", "status", "id", "created_at", "updated_at")
+LIST_FIELDS = [getattr(User, name) for name in LIST_COLUMNS]
+
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 def create_user(user: UserCreate, db: Session = Depends(get_db)):
     db_user = db.query(User).filter(User.email == user.email).first()
@@ -33,15 +46,92 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
     return new_user
 
 
+@router.post("/bulk", response_model=BulkUserResponse)
+def create_users_bulk(items: List[BulkUserCreate], db: Session = Depends(get_db)):
+    """
+    Create many users, each with its face embeddings, in one transaction.
+    Users whose email or employee id is already taken (in the database or
+    earlier in the batch) are reported per index and do not fail the batch.
+    """
+    if len(items) > MAX_BULK_USERS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {MAX_BULK_USERS} users per request"
+        )
+    
+    emails = {item.email for item in items}
+    employee_ids = {item.employee_id for item in items if item.employee_id}
+    taken = db.query(User.email, User.employee_id).filter(
+        or_(User.email.in_(emails), User.employee_id.in_(employee_ids))
+    ).all()
+    taken_emails = {email for email, _ in taken}
+    taken_employee_ids = {employee_id for _, employee_id in taken if employee_id}
+    
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        if item.email in taken_emails:
+            results[index] = BulkUserResult(index=index, success=False, detail="Email already registered")
+        elif item.employee_id and item.employee_id in taken_employee_ids:
+            results[index] = BulkUserResult(index=index, success=False, detail="Employee ID already registered")
+        elif any(not face.embedding for face in item.embeddings):
+            results[index] = BulkUserResult(index=index, success=False, detail="Embedding must not be empty")
+        else:
+            taken_emails.add(item.email)
+            if item.employee_id:
+                taken_employee_ids.add(item.employee_id)
+            valid.append((index, item))
+    
+    embedding_count = 0
+    if valid:
+        # One multi-row INSERT ... RETURNING per table for the whole batch
+        user_ids = db.execute(insert(User).returning(User.id, sort_by_parameter_order=True), [
+            {"name": item.name, "email": item.email, "employee_id": item.employee_id, "status": item.status}
+            for _, item in valid
+        ]).scalars().all()
+        embedding_rows = [
+            {
+                "user_id": user_id,
+                "embedding": embedding_codec.encode(face.embedding, settings.EMBEDDING_STORAGE_DTYPE),
+                "photo_filename": face.photo_filename,
+            }
+            for user_id, (_, item) in zip(user_ids, valid)
+            for face in item.embeddings
+        ]
+        embedding_ids = db.execute(
+            insert(FaceEmbedding).returning(FaceEmbedding.id, sort_by_parameter_order=True), embedding_rows
+        ).scalars().all() if embedding_rows else []
+        
+        changes, position = [], 0
+        for user_id, (index, item) in zip(user_ids, valid):
+            ids = embedding_ids[position:position + len(item.embeddings)]
+            position += len(item.embeddings)
+            # Inactive users are picked up with all their templates on activation
+            if item.status:
+                changes += [(ADD, user_id, embedding_id) for embedding_id in ids]
+            results[index] = BulkUserResult(index=index, success=True, id=user_id, embedding_ids=ids)
+        record_changes(db, changes)
+        db.commit()
+        user_cache.invalidate()
+        embedding_count = len(embedding_ids)
+    
+    return BulkUserResponse(
+        created=len(valid),
+        failed=len(items) - len(valid),
+        embeddings=embedding_count,
+        results=results
+    )
+
+
 @router.get("/", response_model=List[UserResponse])
 def get_all_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    users = db.query(User).offset(skip).limit(limit).all()
-    return users
+    users = db.query(*LIST_FIELDS).order_by(User.id).offset(skip).limit(limit).all()
+    return rows_response(users, LIST_COLUMNS)
 
 
 @router.get("/{user_id}", response_model=UserResponse)
 def get_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = user_cache.get(db, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -63,11 +153,14 @@ def update_user(user_id: int, user_data: UserUpdate, db: Session = Depends(get_d
         user.name = user_data.name
     if user_data.email:
         user.email = user_data.email
-    if user_data.status is not None:
+    if user_data.status is not None and user_data.status != user.status:
         user.status = user_data.status
+        record_change(db, ACTIVATE if user.status else DEACTIVATE, user.id)
+        record_policy_change(db, USER, user.id)
     
     db.commit()
     db.refresh(user)
+    user_cache.invalidate(user_id)
     return user
 
 
@@ -80,6 +173,10 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
             detail="User not found"
         )
     
+    if user.status:
+        record_change(db, DEACTIVATE, user.id)
+        record_policy_change(db, USER, user.id)
     user.status = False
     db.commit()
+    user_cache.invalidate(user_id)
     return {"message": "User deactivated"}
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional, List
 
@@ -16,6 +16,26 @@ class UserUpdate(BaseModel):
     email: Optional[str] = None
     status: Optional[bool] = None
 
+class BulkFaceEmbedding(BaseModel):
+    embedding: List[float]
+    photo_filename: Optional[str] = None
+
+class BulkUserCreate(UserBase):
+    embeddings: List[BulkFaceEmbedding] = []
+
+class BulkUserResult(BaseModel):
+    index: int
+    success: bool
+    id: Optional[int] = None
+    embedding_ids: List[int] = []
+    detail: Optional[str] = None
+
+class BulkUserResponse(BaseModel):
+    created: int
+    failed: int
+    embeddings: int
+    results: List[BulkUserResult]
+
 class UserResponse(UserBase):
     id: int
     created_at: datetime
@@ -29,6 +49,10 @@ class DoorBase(BaseModel):
     location: Optional[str] = None
     device_id: str
     camera_url: Optional[str] = None
+    roi_x: Optional[float] = Field(None, ge=0, le=1)
+    roi_y: Optional[float] = Field(None, ge=0, le=1)
+    roi_width: Optional[float] = Field(None, gt=0, le=1)
+    roi_height: Optional[float] = Field(None, gt=0, le=1)
     status: bool = True
 
 class DoorCreate(DoorBase):
@@ -38,6 +62,10 @@ class DoorUpdate(BaseModel):
     name: Optional[str] = None
     location: Optional[str] = None
     camera_url: Optional[str] = None
+    roi_x: Optional[float] = Field(None, ge=0, le=1)
+    roi_y: Optional[float] = Field(None, ge=0, le=1)
+    roi_width: Optional[float] = Field(None, gt=0, le=1)
+    roi_height: Optional[float] = Field(None, gt=0, le=1)
     status: Optional[bool] = None
 
 class DoorResponse(DoorBase):
@@ -55,7 +83,8 @@ class AccessLogBase(BaseModel):
     notes: Optional[str] = None
 
 class AccessLogCreate(AccessLogBase):
-    pass
+    # Set by clients that ship events after the fact; defaults to insert time
+    timestamp: Optional[datetime] = None
 
 class AccessLogResponse(BaseModel):
     id: int
@@ -68,3 +97,108 @@ class AccessLogResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+class FaceEmbeddingCreate(BaseModel):
+    user_id: int
+    embedding: List[float]
+    photo_filename: Optional[str] = None
+
+class FaceEmbeddingResponse(BaseModel):
+    id: int
+    user_id: int
+    embedding: List[float]
+    photo_filename: Optional[str] = None
+    created_at: datetime
+
+class GalleryChangeResponse(BaseModel):
+    id: int
+    action: str
+    user_id: int
+    embedding_id: Optional[int] = None
+    embeddings: List[FaceEmbeddingResponse] = []
+
+class GalleryChangesResponse(BaseModel):
+    changes: List[GalleryChangeResponse]
+    watermark: int
+
+class BulkAccessLogResult(BaseModel):
+    index: int
+    success: bool
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+class BulkAccessLogResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkAccessLogResult]
+
+class AccessStatBucket(BaseModel):
+    bucket_start: datetime
+    door_id: Optional[int] = None
+    user_id: Optional[int] = None
+    status: Optional[str] = None
+    count: int
+
+class UserGroupCreate(BaseModel):
+    name: str
+    description: Optional[str] = None
+    user_ids: List[int] = []
+
+class UserGroupUpdate(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    user_ids: Optional[List[int]] = None
+
+class UserGroupResponse(BaseModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+    user_ids: List[int]
+    created_at: datetime
+
+class DoorGroupCreate(BaseModel):
+    name: str
+    description: Optional[str] = None
+    door_ids: List[int] = []
+
+class DoorGroupUpdate(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    door_ids: Optional[List[int]] = None
+
+class DoorGroupResponse(BaseModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+    door_ids: List[int]
+    created_at: datetime
+
+class AccessRuleBase(BaseModel):
+    name: Optional[str] = None
+    user_group_id: int
+    door_group_id: int
+    # Bitmask of weekdays the window starts on, bit 0 = Monday
+    days: int = Field(127, ge=0, le=127)
+    # Minutes after midnight; start >= end runs past midnight
+    start_minute: int = Field(0, ge=0, lt=1440)
+    end_minute: int = Field(1440, ge=0, le=1440)
+    status: bool = True
+
+class AccessRuleCreate(AccessRuleBase):
+    pass
+
+class AccessRuleUpdate(BaseModel):
+    name: Optional[str] = None
+    user_group_id: Optional[int] = None
+    door_group_id: Optional[int] = None
+    days: Optional[int] = Field(None, ge=0, le=127)
+    start_minute: Optional[int] = Field(None, ge=0, lt=1440)
+    end_minute: Optional[int] = Field(None, ge=0, le=1440)
+    status: Optional[bool] = None
+
+class AccessRuleResponse(AccessRuleBase):
+    id: int
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
@@ -0,0 +1,157 @@
+"""
+Observability pieces shared by the backend and the face service.
+
+Generic code only, with no dependency beyond prometheus_client: the face
+service, which lives in face_recognition_service/ below this directory,
+puts this directory on its import path in its metrics.py. Each service
+keeps its own histograms in its metrics.py.
+
+SamplingProfiler can be switched on in a running service. A daemon thread
+snapshots the stack of every other thread each ``interval`` seconds and
+counts identical stacks. stop() returns them in the "collapsed" format
+(``thread;file:function:line;... count``) that flamegraph.pl and speedscope
+read. Sampling stops by itself after ``max_seconds`` so a forgotten session
+cannot keep costing CPU.
+
+StatsCollector and RequestTimer feed Prometheus: gauges are read from the
+components' stats() dicts only when /metrics is scraped, and request
+latency is recorded by route template.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._counts = Counter()
+        self.interval = 0.0
+        self.samples = 0
+        self.started_at = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval=0.005, max_seconds=60.0):
+        """Start sampling; returns False when a session is already running."""
+        with self._lock:
+            if self.running:
+                return False
+            self._counts = Counter()
+            self.samples = 0
+            self.interval = interval
+            self.started_at = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(interval, max_seconds), name="sampling-profiler", daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def stop(self):
+        """Stop sampling and return the collapsed stacks of the session."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self._counts.most_common())
+
+    def _run(self, interval, max_seconds):
+        own = threading.get_ident()
+        until = time.monotonic() + max_seconds
+        while not self._stop.wait(interval) and time.monotonic() < until:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                stacks.append(";".join(reversed(stack)))
+            with self._lock:
+                self._counts.update(stacks)
+                self.samples += 1
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "started_at": self.started_at,
+        }
+
+
+profiler = SamplingProfiler()
+
+
+class StatsCollector:
+    """
+    Exposes the numeric fields of stats() dicts as gauges named
+    ``<prefix>_<field>``. ``sources`` maps a prefix to a callable returning
+    the dict, or None when the component is disabled.
+    """
+
+    def __init__(self, sources):
+        self.sources = sources
+
+    def collect(self):
+        for prefix, stats in self.sources.items():
+            values = stats()
+            for key, value in (values or {}).items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                yield GaugeMetricFamily(f"{prefix}_{key}", f"{prefix} {key.replace('_', ' ')}", value=value)
+
+
+def register_stats(sources):
+    REGISTRY.register(StatsCollector(sources))
+
+
+def render():
+    """(body, content type) for the /metrics endpoint."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+class RequestTimer:
+    """
+    ASGI middleware recording HTTP request latency by route template, so
+    /api/users/1 and /api/users/2 share one series. WebSockets pass through.
+    Subclasses set ``histogram`` to a Histogram labelled method, route, status.
+    """
+
+    histogram = None
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_and_record_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_record_status)
+        finally:
+            # The router stores the matched route in the shared scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            self.histogram.labels(scope["method"], route, status_code).observe(time.perf_counter() - started)
@@ -0,0 +1,46 @@
+"""
+Rollup upsert rows must come out in one order regardless of input order,
+so concurrent multi-row ON CONFLICT upserts lock buckets consistently.
+
+Run with: python -m pytest test_rollups.py
+"""
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+
+import rollups
+
+KEY = ("granularity", "bucket_start", "door_id", "user_id", "status")
+
+
+def sample_logs():
+    start = datetime(2024, 5, 1, 8, 0)
+    return [
+        {
+            "timestamp": start + timedelta(minutes=37 * i),
+            "door_id": i % 5 + 1,
+            "user_id": i % 7 or None,
+            "status": "failed" if i % 4 == 0 else "success",
+        }
+        for i in range(200)
+    ]
+
+
+def test_rows_sorted_by_conflict_key():
+    keys = [tuple(row[column] for column in KEY) for row in rollups.rollup_rows(sample_logs())]
+    assert keys == sorted(keys)
+    assert len(keys) == len(set(keys))
+
+
+def test_rows_independent_of_input_order():
+    logs = sample_logs()
+    assert rollups.rollup_rows(logs) == rollups.rollup_rows(list(reversed(logs)))
+    assert rollups.rollup_rows(logs) == rollups.rollup_rows(logs[1::2] + logs[::2])
+
+
+def test_counts_cover_every_log():
+    rows = rollups.rollup_rows(sample_logs())
+    for granularity in rollups.GRANULARITIES:
+        assert sum(row["count"] for row in rows if row["granularity"] == granularity) == 200
@@ -53,4 +53,11 @@ export const getTodayLogs = () =>
 export const createAccessLog = (logData) => 
   API.post('/api/access-logs', logData);
 
+// Statistics endpoints
+export const getAccessStats = (params = {}) => 
+  API.get('/api/stats/access', { params });
+
+export const getTodayStats = () => 
+  API.get('/api/stats/today');
+
 export default API;